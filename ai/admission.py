@@ -0,0 +1,151 @@
+"""
+admission.py - Bounded inference pool and per-endpoint concurrency limits
+Under overload the server answers 429 with a Retry-After hint instead of
+queueing requests until they time out:
+
+    BoundedExecutor   thread pool with a cap on running + queued tasks;
+                      submit() raises Overloaded once the cap is reached
+    EndpointLimiter   at most N requests (or open streams) per endpoint
+
+Both the WSGI app (app.py) and the ASGI entry point (asgi.py) use the same
+instances, so limits mean the same thing under either server.
+"""
+
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from rolling_window import EWMA
+
+
+class Overloaded(Exception):
+    """Request rejected by admission control; retry_after is in whole seconds"""
+    def __init__(self, reason, retry_after=1):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = int(retry_after)
+
+
+def parse_limits(spec):
+    """'analyze_transcript=64,video_feed=32' -> {'analyze_transcript': 64, 'video_feed': 32}"""
+    limits = {}
+    for item in spec.split(','):
+        name, _, value = item.partition('=')
+        if name.strip() and value.strip():
+            limits[name.strip()] = int(value)
+    return limits
+
+
+class BoundedExecutor:
+    """Thread pool that sheds work instead of growing an unbounded queue
+
+    At most `workers` tasks run at once and at most `queue_limit` more wait.
+    Retry-After is estimated from the backlog and the recent mean task time.
+    """
+    def __init__(self, workers=4, queue_limit=32, name='inference', max_retry_after=30):
+        self.workers = max(1, int(workers))
+        self.queue_limit = max(0, int(queue_limit))
+        self.max_retry_after = max_retry_after
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=name)
+        self._slots = threading.BoundedSemaphore(self.workers + self.queue_limit)
+        self._lock = threading.Lock()
+        self._durations = EWMA(alpha=0.1)
+        self.running = 0
+        self.pending = 0  # running + queued
+        self.counters = {'submitted': 0, 'completed': 0, 'rejected': 0}
+
+    def submit(self, fn, *args, **kwargs):
+        """Queue fn; returns a concurrent.futures.Future or raises Overloaded"""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.counters['rejected'] += 1
+            raise Overloaded('inference queue full', self.retry_after())
+        with self._lock:
+            self.pending += 1
+            self.counters['submitted'] += 1
+        try:
+            return self._pool.submit(self._run, fn, args, kwargs)
+        except BaseException:
+            self._finish(None)
+            raise
+
+    def _run(self, fn, args, kwargs):
+        started = time.perf_counter()
+        with self._lock:
+            self.running += 1
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            self._finish(time.perf_counter() - started)
+
+    def _finish(self, duration):
+        with self._lock:
+            self.pending -= 1
+            if duration is not None:
+                self.running -= 1
+                self.counters['completed'] += 1
+                self._durations.push(duration)
+        self._slots.release()
+
+    def queued(self):
+        return max(0, self.pending - self.running)
+
+    def retry_after(self):
+        """Seconds until the current backlog should have drained (at least 1)"""
+        mean = self._durations.mean(default=1.0)
+        estimate = math.ceil(self.pending * mean / self.workers)
+        return min(max(1, estimate), self.max_retry_after)
+
+    def shutdown(self, wait=False):
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+
+    def stats(self):
+        return {
+            'workers': self.workers,
+            'queue_limit': self.queue_limit,
+            'running': self.running,
+            'queued': self.queued(),
+            'mean_task_ms': round(self._durations.mean(default=0.0) * 1000.0, 2),
+            **self.counters
+        }
+
+
+class EndpointLimiter:
+    """Non-blocking per-endpoint concurrency caps; endpoints without a limit are not counted"""
+    def __init__(self, limits):
+        self.limits = dict(limits)
+        self._lock = threading.Lock()
+        self.in_flight = {name: 0 for name in self.limits}
+        self.rejected = {name: 0 for name in self.limits}
+
+    def acquire(self, name):
+        """Take a slot for name or raise Overloaded; returns False if name is unlimited"""
+        limit = self.limits.get(name)
+        if limit is None:
+            return False
+        with self._lock:
+            if self.in_flight[name] >= limit:
+                self.rejected[name] += 1
+                raise Overloaded(f'{name} concurrency limit reached')
+            self.in_flight[name] += 1
+        return True
+
+    def release(self, name):
+        with self._lock:
+            self.in_flight[name] -= 1
+
+    @contextmanager
+    def limit(self, name):
+        acquired = self.acquire(name)
+        try:
+            yield
+        finally:
+            if acquired:
+                self.release(name)
+
+    def stats(self):
+        with self._lock:
+            return {name: {'limit': limit, 'in_flight': self.in_flight[name], 'rejected': self.rejected[name]}
+                    for name, limit in self.limits.items()}
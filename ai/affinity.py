@@ -0,0 +1,139 @@
+"""
+affinity.py - Session-to-worker affinity for multi-process serving
+Sessions live in one worker's active_sessions, so every request for a session
+must reach the same process. Each worker owns the sessions whose id hashes to
+its index and serves them on a private loopback port; a worker receiving a
+request for another worker's session forwards it there. Forwarded requests
+carry X-Affinity-Forwarded; the header is stripped from public requests.
+"""
+
+import http.client
+import io
+import json
+import re
+import threading
+import zlib
+from urllib.parse import parse_qs
+
+from werkzeug.serving import make_server
+
+FORWARDED_HEADER = 'X-Affinity-Forwarded'
+_PATH_SESSION = re.compile(r'^/api/(?:video-feed|frames|session/events)/([^/]+)')
+_HOP_BY_HOP = {'connection', 'keep-alive', 'transfer-encoding', 'te', 'trailer', 'upgrade',
+               'proxy-authorization', 'proxy-authenticate'}
+MAX_JSON_PEEK = 1024 * 1024
+
+
+def owner_of(session_id, worker_count):
+    return zlib.crc32(session_id.encode('utf-8')) % worker_count
+
+
+def extract_session_id(environ):
+    """Find the session id in the path, query string or JSON body (body is re-wound for the app)"""
+    match = _PATH_SESSION.match(environ.get('PATH_INFO', ''))
+    if match:
+        return match.group(1)
+
+    query = parse_qs(environ.get('QUERY_STRING', ''))
+    if query.get('sessionId'):
+        return query['sessionId'][0]
+
+    if environ.get('CONTENT_TYPE', '').startswith('application/json'):
+        try:
+            length = int(environ.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            length = 0
+        if 0 < length <= MAX_JSON_PEEK:
+            body = environ['wsgi.input'].read(length)
+            environ['wsgi.input'] = io.BytesIO(body)
+            try:
+                data = json.loads(body)
+            except ValueError:
+                return None
+            if isinstance(data, dict):
+                session_id = data.get('sessionId') or data.get('interviewId')
+                return str(session_id) if session_id else None
+    return None
+
+
+class SessionAffinityMiddleware:
+    """WSGI wrapper that forwards session requests to the owning worker"""
+    def __init__(self, app, host='127.0.0.1', base_port=5101, timeout=120):
+        self.app = app
+        self.host = host
+        self.base_port = base_port
+        self.timeout = timeout
+        self.worker_index = None
+        self.worker_count = 1
+        self.forwarded = 0
+        self._server = None
+
+    def start_worker(self, index, count):
+        """Called in each worker after fork: record ownership and open the private port"""
+        self.worker_index = index
+        self.worker_count = max(1, count)
+        if self.worker_count == 1:
+            return
+        self._server = make_server(self.host, self.base_port + index, self.app, threaded=True)
+        threading.Thread(target=self._server.serve_forever, name='affinity-listener', daemon=True).start()
+
+    def __call__(self, environ, start_response):
+        # Only the public socket reaches this wrapper (the loopback listeners serve self.app directly),
+        # so a client-sent forwarded marker is never trusted
+        environ.pop('HTTP_X_AFFINITY_FORWARDED', None)
+        if self.worker_index is None or self.worker_count == 1:
+            return self.app(environ, start_response)
+
+        session_id = extract_session_id(environ)
+        if session_id is None:
+            return self.app(environ, start_response)
+
+        owner = owner_of(session_id, self.worker_count)
+        if owner == self.worker_index:
+            return self.app(environ, start_response)
+
+        self.forwarded += 1
+        return self._forward(owner, environ, start_response)
+
+    def _forward(self, owner, environ, start_response):
+        conn = http.client.HTTPConnection(self.host, self.base_port + owner, timeout=self.timeout)
+        path = environ.get('PATH_INFO', '')
+        if environ.get('QUERY_STRING'):
+            path += '?' + environ['QUERY_STRING']
+
+        headers = {FORWARDED_HEADER: '1'}
+        for key, value in environ.items():
+            if key.startswith('HTTP_'):
+                name = key[5:].replace('_', '-').title()
+                if name.lower() not in _HOP_BY_HOP:
+                    headers[name] = value
+        if environ.get('CONTENT_TYPE'):
+            headers['Content-Type'] = environ['CONTENT_TYPE']
+
+        length = environ.get('CONTENT_LENGTH')
+        body = environ['wsgi.input']
+        if length:
+            headers['Content-Length'] = length
+            conn.request(environ['REQUEST_METHOD'], path, body=body.read(int(length)), headers=headers)
+        elif environ['REQUEST_METHOD'] in ('POST', 'PUT'):
+            # Chunked upload (e.g. a frame stream): relay it as it arrives
+            chunks = iter(lambda: body.read(64 * 1024), b'')
+            conn.request(environ['REQUEST_METHOD'], path, body=chunks, headers=headers, encode_chunked=True)
+        else:
+            conn.request(environ['REQUEST_METHOD'], path, headers=headers)
+
+        response = conn.getresponse()
+        start_response(f'{response.status} {response.reason}',
+                       [(k, v) for k, v in response.getheaders() if k.lower() not in _HOP_BY_HOP])
+
+        def relay():
+            try:
+                while True:
+                    chunk = response.read1(64 * 1024)
+                    if not chunk:
+                        break
+                    yield chunk
+            finally:
+                conn.close()
+
+        return relay()
@@ -4,57 +4,305 @@ Integrates body language and voice sentiment with interview responses
 Works with Next.js frontend and Express backend
 """
 
-from flask import Flask, render_template, Response, jsonify, request
+from flask import Flask, render_template, Response, jsonify, request, g
 import cv2
 import numpy as np
-from nltk.sentiment import SentimentIntensityAnalyzer
-from transformers import AutoTokenizer, AutoModelForSequenceClassification
-from scipy.special import softmax
-import nltk
-import tensorflow as tf
 import json
+import os
+import sys
 from datetime import datetime
 import threading
 import queue
+import time
 from flask_cors import CORS
-
-# Download required NLTK data
-try:
-    nltk.download('vader_lexicon', quiet=True)
-    nltk.download('punkt', quiet=True)
-except:
-    pass
+from roberta_batcher import RobertaBatcher, BATCH_SIZE_BUCKETS, QUEUE_WAIT_BUCKETS_MS, WINDOW_BUCKETS
+from text_windows import WindowBuilder, load_sentence_splitter
+from transcript_stream import QuestionStream, TranscriptStreams
+from sentiment_cache import SentimentCache
+from frame_scheduler import BodyLanguageScheduler, preprocess_frame
+from body_roi import ROI_MODES, SubjectTracker
+from frame_sampler import FrameSampler
+from frame_buffer import FrameBuffer
+from frame_ingest import FrameIngestor, RAW_FORMATS, iter_length_prefixed, read_capped
+from model_backends import DEFAULT_TEXT_PATHS, load_body_backend, load_text_backend
+from model_loader import LazyModel, start_loading
+from session_store import create_session_store
+from rolling_window import RollingWindow, EWMA, TimeWindow
+from status_stream import status_events
+from mjpeg_stream import (MIMETYPE as FEED_MIMETYPE, DEFAULT_TIERS, FeedClient, FeedEncoder, load_jpeg_encoder,
+                          parse_tiers, tier_index)
+from metrics import REGISTRY, STAGE_SECONDS_BUCKETS, RateMeter, count_error, timed
+from profiler import SamplingProfiler
+from admission import BoundedExecutor, EndpointLimiter, Overloaded, parse_limits
+from session_lifecycle import SessionReaper, process_rss_mb, thread_cpu_seconds
 
 app = Flask(__name__)
 CORS(app, resources={r"/*": {"origins": "*"}})  # Enable CORS for Next.js
 
-# Load CNN body language model
-try:
-    body_model = tf.keras.models.load_model('best_model.h5')
-    print("✓ CNN body language model loaded successfully")
-    IMG_SIZE = (96, 96)
-except Exception as e:
-    print(f"❌ Error loading CNN model: {e}")
-    body_model = None
-    IMG_SIZE = (96, 96)
-
-# Initialize sentiment analyzers
-sia = SentimentIntensityAnalyzer()
-
-# Load RoBERTa model
-MODEL = "cardiffnlp/twitter-roberta-base-sentiment"
-try:
-    tokenizer = AutoTokenizer.from_pretrained(MODEL)
-    roberta_model = AutoModelForSequenceClassification.from_pretrained(MODEL)
-    print("✓ RoBERTa model loaded successfully")
-except Exception as e:
-    print(f"❌ Error loading RoBERTa model: {e}")
-    roberta_model = None
-    tokenizer = None
+# Start-up: 'eager' loads every model before serving, 'background' serves
+# immediately and loads in threads, 'lazy' loads each model on first use.
+# ENABLED_MODELS limits what a worker serves ('text' never imports TensorFlow).
+MODEL_LOADING = os.environ.get('MODEL_LOADING', 'eager')
+ENABLED_MODELS = {m.strip() for m in os.environ.get('ENABLED_MODELS', 'body,text').split(',') if m.strip()}
+
+# NLTK data is vendored by download_assets.py; downloading at runtime is only a local-dev fallback
+NLTK_DATA_DIR = os.environ.get('NLTK_DATA_DIR',
+                               os.path.join(os.path.dirname(os.path.abspath(__file__)), 'nltk_data'))
+ALLOW_ASSET_DOWNLOADS = os.environ.get('ALLOW_ASSET_DOWNLOADS', 'true').lower() in ('1', 'true', 'yes')
+
+# Model backends: keras | tflite | onnx for the CNN, torch | onnx for RoBERTa
+BODY_MODEL_BACKEND = os.environ.get('BODY_MODEL_BACKEND', 'keras')
+BODY_MODEL_PATH = os.environ.get('BODY_MODEL_PATH') or None
+TEXT_MODEL_BACKEND = os.environ.get('TEXT_MODEL_BACKEND', 'torch')
+TEXT_MODEL_PATH = os.environ.get('TEXT_MODEL_PATH') or None
+
+IMG_SIZE = (96, 96)
+
+# Intra-op threads per process for torch/TF/TFLite/ONNX (unset = framework default);
+# multi-process serving sets this per worker from its core budget
+INTRA_OP_THREADS = int(os.environ.get('INTRA_OP_THREADS', 0)) or None
+
+# Shared micro-batching worker for RoBERTa (one forward pass per batch across all sessions)
+ROBERTA_MAX_BATCH_SIZE = int(os.environ.get('ROBERTA_MAX_BATCH_SIZE', 16))
+ROBERTA_MAX_WAIT_MS = float(os.environ.get('ROBERTA_MAX_WAIT_MS', 10))
+# Transcripts longer than RoBERTa's 512 tokens: 'windows' scores up to ROBERTA_MAX_WINDOWS
+# sentence-aligned windows overlapping by ROBERTA_WINDOW_OVERLAP tokens (see text_windows.py),
+# 'truncate' scores only the first 512 tokens
+ROBERTA_LONG_TEXT = os.environ.get('ROBERTA_LONG_TEXT', 'windows')
+ROBERTA_MAX_WINDOWS = int(os.environ.get('ROBERTA_MAX_WINDOWS', 8))
+ROBERTA_WINDOW_OVERLAP = int(os.environ.get('ROBERTA_WINDOW_OVERLAP', 64))
+
+body_scheduler = None  # started once the CNN is loaded
+
+def ensure_nltk_resource(resource, package):
+    """Find vendored NLTK data, downloading only if ALLOW_ASSET_DOWNLOADS is set"""
+    import nltk
+    if os.path.isdir(NLTK_DATA_DIR) and NLTK_DATA_DIR not in nltk.data.path:
+        nltk.data.path.insert(0, NLTK_DATA_DIR)
+    try:
+        nltk.data.find(resource)
+    except LookupError:
+        if not ALLOW_ASSET_DOWNLOADS:
+            raise
+        nltk.download(package, quiet=True)
+
+def load_vader():
+    from nltk.sentiment import SentimentIntensityAnalyzer
+    ensure_nltk_resource('sentiment/vader_lexicon.zip', 'vader_lexicon')
+    ensure_nltk_resource('tokenizers/punkt', 'punkt')
+    return SentimentIntensityAnalyzer()
+
+def load_roberta():
+    """Load RoBERTa (cardiffnlp/twitter-roberta-base-sentiment unless TEXT_MODEL_PATH is set) behind the batcher"""
+    backend = load_text_backend(TEXT_MODEL_BACKEND, TEXT_MODEL_PATH, num_threads=INTRA_OP_THREADS)
+    print(f"✓ RoBERTa model loaded successfully ({backend.name}: {backend.path})")
+    window_builder = None
+    if ROBERTA_LONG_TEXT == 'windows' and hasattr(backend, 'predict_ids'):
+        try:
+            ensure_nltk_resource('tokenizers/punkt', 'punkt')
+        except LookupError:
+            pass  # load_sentence_splitter falls back to untrained punkt
+        window_builder = WindowBuilder(backend.tokenizer, overlap=ROBERTA_WINDOW_OVERLAP,
+                                       max_windows=ROBERTA_MAX_WINDOWS)
+    # The batcher thread starts on first submit, so it is created in the worker that uses it
+    batcher = RobertaBatcher(backend,
+                             max_batch_size=ROBERTA_MAX_BATCH_SIZE,
+                             max_wait_ms=ROBERTA_MAX_WAIT_MS,
+                             window_builder=window_builder)
+    REGISTRY.histogram('nextstep_roberta_batch_size', 'Transcripts per RoBERTa forward pass',
+                       BATCH_SIZE_BUCKETS).add(batcher.batch_sizes)
+    REGISTRY.histogram('nextstep_roberta_queue_wait_ms', 'Time transcripts wait for a RoBERTa batch (ms)',
+                       QUEUE_WAIT_BUCKETS_MS).add(batcher.queue_wait_ms)
+    if window_builder is not None:
+        REGISTRY.histogram('nextstep_roberta_windows', 'RoBERTa windows scored per transcript',
+                           WINDOW_BUCKETS).add(batcher.windows_per_text)
+    return batcher
+
+def load_body_model():
+    """Load the CNN backend and start the shared frame scheduler"""
+    global body_scheduler
+    backend = load_body_backend(BODY_MODEL_BACKEND, BODY_MODEL_PATH, img_size=IMG_SIZE,
+                                num_threads=INTRA_OP_THREADS)
+    print(f"✓ CNN body language model loaded successfully ({backend.name}: {backend.path})")
+    body_scheduler = BodyLanguageScheduler(
+        backend,
+        get_sessions=lambda: list(active_sessions.values()),
+        on_result=apply_body_prediction,
+        img_size=IMG_SIZE,
+        tick_ms=float(os.environ.get('BODY_SCORING_TICK_MS', 100)),
+        max_batch_size=int(os.environ.get('BODY_SCORING_MAX_BATCH', 32))
+    )
+    body_scheduler.start()
+    return backend
+
+# Model slots; loading starts at the bottom of this module according to MODEL_LOADING
+vader_model = LazyModel('vader', load_vader)
+# PyTorch weights can be shared copy-on-write; ONNX Runtime sessions own thread pools and can't
+roberta_model = LazyModel('roberta', load_roberta, enabled='text' in ENABLED_MODELS,
+                          fork_safe=TEXT_MODEL_BACKEND == 'torch')
+# TensorFlow's runtime does not survive fork, so the CNN is always loaded per process
+body_model = LazyModel('body_language', load_body_model, enabled='body' in ENABLED_MODELS,
+                       fork_safe=False)
+MODEL_SLOTS = [vader_model, roberta_model, body_model]
+
+# Voice tone results are cached by transcript hash + model version so the
+# transcript and question-response endpoints share one analysis per answer
+SENTIMENT_MODEL_VERSION = (
+    f"vader+{TEXT_MODEL_BACKEND}:{TEXT_MODEL_PATH or DEFAULT_TEXT_PATHS.get(TEXT_MODEL_BACKEND)}"
+    + (f"+windows{ROBERTA_MAX_WINDOWS}/{ROBERTA_WINDOW_OVERLAP}" if ROBERTA_LONG_TEXT == 'windows' else "")
+    if 'text' in ENABLED_MODELS else "vader"
+)
+sentiment_cache = SentimentCache(
+    SENTIMENT_MODEL_VERSION,
+    max_entries=int(os.environ.get('SENTIMENT_CACHE_SIZE', 1024)),
+    ttl_seconds=float(os.environ.get('SENTIMENT_CACHE_TTL', 3600)),
+    disk_path=os.environ.get('SENTIMENT_CACHE_PATH') or None
+)
+
+# Streaming transcripts (/api/analyze/transcript/stream): per-question running analyses,
+# dropped after TRANSCRIPT_STREAM_TTL seconds without a fragment
+TRANSCRIPT_STREAM_TTL = float(os.environ.get('TRANSCRIPT_STREAM_TTL', 900))
+sentence_splitter = None  # punkt, loaded with the first streamed fragment
+
+def new_question_stream():
+    global sentence_splitter
+    if sentence_splitter is None:
+        sentence_splitter = load_sentence_splitter()
+    batcher = roberta_model.get()
+    return QuestionStream(sentence_splitter, vader=vader_model.get(),
+                          submit_roberta=batcher.submit if batcher is not None else None)
+
+transcript_streams = TranscriptStreams(new_question_stream, ttl=TRANSCRIPT_STREAM_TTL)
+
+# Per-session body language sampling defaults (overridable in /api/session/start)
+BODY_ANALYSIS_FPS = float(os.environ.get('BODY_ANALYSIS_FPS', 5))
+BODY_ANALYSIS_ADAPTIVE = os.environ.get('BODY_ANALYSIS_ADAPTIVE', 'false').lower() in ('1', 'true', 'yes')
+BODY_ANALYSIS_MIN_FPS = float(os.environ.get('BODY_ANALYSIS_MIN_FPS', 1))
+BODY_ANALYSIS_MAX_FPS = float(os.environ.get('BODY_ANALYSIS_MAX_FPS', 10))
+BODY_MOTION_THRESHOLD = float(os.environ.get('BODY_MOTION_THRESHOLD', 4.0))
+
+# Where session frames come from: 'camera' (server webcam) or 'client' (pushed to /api/frames)
+FRAME_SOURCE = os.environ.get('FRAME_SOURCE', 'camera')
+FRAME_MAX_BYTES = int(os.environ.get('FRAME_MAX_BYTES', 2 * 1024 * 1024))
+frame_ingestor = FrameIngestor(workers=int(os.environ.get('FRAME_DECODE_WORKERS', 2)))
+
+# MJPEG viewers (see mjpeg_stream.py): each frame is encoded once per tier and shared by
+# every viewer on it; viewers drop to a lower tier when their connection backs up
+STREAM_TIERS = parse_tiers(os.environ.get('STREAM_TIERS', DEFAULT_TIERS))
+STREAM_ADAPTIVE = os.environ.get('STREAM_ADAPTIVE', 'true').lower() in ('1', 'true', 'yes')
+jpeg_encode = load_jpeg_encoder(os.environ.get('STREAM_JPEG_ENCODER', 'auto'))
+
+# Session scores and results: 'memory' (this process only), 'sqlite:///path' (shared
+# by the workers on one host) or 'redis://...' (shared across replicas)
+BODY_SCORE_WINDOW = 100  # Keep last 100 readings
+VOICE_SCORE_WINDOW = 50
+# Question analyses are an append-only log per session; with the memory store only the newest
+# QUESTION_LOG_MEMORY_CAP entries stay in memory and older ones spill to QUESTION_LOG_SPILL_PATH.
+# If it is unset the whole log stays in memory, since /api/session/stop needs every entry.
+QUESTION_LOG_MEMORY_CAP = int(os.environ.get('QUESTION_LOG_MEMORY_CAP', 100))
+# Status responses return question analyses in pages of QUESTION_PAGE_SIZE
+QUESTION_PAGE_SIZE = int(os.environ.get('QUESTION_PAGE_SIZE', 50))
+session_store = create_session_store(
+    os.environ.get('SESSION_STORE', 'memory'),
+    window_sizes={'body_language_scores': BODY_SCORE_WINDOW, 'voice_tone_scores': VOICE_SCORE_WINDOW},
+    question_memory_cap=QUESTION_LOG_MEMORY_CAP,
+    question_spill_path=os.environ.get('QUESTION_LOG_SPILL_PATH') or None
+)
+
+# Status push (/api/session/events): minimum time between updates, coalescing changes in between
+STATUS_PUSH_INTERVAL_MS = float(os.environ.get('STATUS_PUSH_INTERVAL_MS', 500))
+STATUS_PUSH_MIN_INTERVAL_MS = 100
+
+# Admission control (see admission.py): transcript analysis runs on a pool of
+# INFERENCE_WORKERS threads with at most INFERENCE_QUEUE_LIMIT requests waiting,
+# and ENDPOINT_LIMITS caps concurrent requests/open streams per endpoint.
+# Anything beyond either gets 429 with Retry-After.
+INFERENCE_WORKERS = int(os.environ.get('INFERENCE_WORKERS', 4))
+INFERENCE_QUEUE_LIMIT = int(os.environ.get('INFERENCE_QUEUE_LIMIT', 32))
+ENDPOINT_LIMITS = parse_limits(os.environ.get(
+    'ENDPOINT_LIMITS',
+    'analyze_transcript=64,analyze_transcript_stream=128,analyze_question_response=64,video_feed=32,'
+    'session_events=256'
+))
+inference_executor = BoundedExecutor(INFERENCE_WORKERS, INFERENCE_QUEUE_LIMIT, name='inference')
+endpoint_limiter = EndpointLimiter(ENDPOINT_LIMITS)
+
+# Session lifecycle (see session_lifecycle.py): any request naming a session
+# renews it; local sessions idle for SESSION_IDLE_TTL seconds or older than
+# SESSION_MAX_AGE are stopped every SESSION_REAP_INTERVAL seconds (0 disables a
+# TTL). Starting more than MAX_SESSIONS_PER_WORKER sessions here gets 429.
+SESSION_IDLE_TTL = float(os.environ.get('SESSION_IDLE_TTL', 600))
+SESSION_MAX_AGE = float(os.environ.get('SESSION_MAX_AGE', 4 * 3600))
+SESSION_REAP_INTERVAL = float(os.environ.get('SESSION_REAP_INTERVAL', 30))
+MAX_SESSIONS_PER_WORKER = int(os.environ.get('MAX_SESSIONS_PER_WORKER', 64))
+
+# Subject crop before the CNN (see body_roi.py): 'upper_body' scores a tracked
+# head-and-shoulders crop instead of the whole frame. Use the --roi the model
+# was trained with. BODY_ROI_CASCADE overrides OpenCV's bundled face cascade.
+BODY_ROI = os.environ.get('BODY_ROI', 'off')
+if BODY_ROI not in ROI_MODES:
+    raise ValueError(f"Unknown BODY_ROI '{BODY_ROI}' (expected one of {ROI_MODES})")
+BODY_ROI_REDETECT_EVERY = int(os.environ.get('BODY_ROI_REDETECT_EVERY', 10))
+BODY_ROI_CASCADE = os.environ.get('BODY_ROI_CASCADE') or None
+
+# Per-camera smoothing of CNN predictions: 'window' (last 30 predictions),
+# 'ewma' (exponential, BODY_SMOOTHING_ALPHA) or 'time' (last BODY_SMOOTHING_SECONDS)
+BODY_SMOOTHING = os.environ.get('BODY_SMOOTHING', 'window')
+BODY_SMOOTHING_ALPHA = float(os.environ.get('BODY_SMOOTHING_ALPHA', 0.1))
+BODY_SMOOTHING_SECONDS = float(os.environ.get('BODY_SMOOTHING_SECONDS', 6))
 
 # Global variables
 camera = None
-active_sessions = {}  # Store multiple interview sessions
+active_sessions = {}  # Sessions capturing or receiving frames in this process
+session_reaper = SessionReaper(lambda: list(active_sessions.values()),
+                               lambda session_id, reason: reap_session(session_id, reason),
+                               idle_ttl=SESSION_IDLE_TTL, max_age=SESSION_MAX_AGE, interval=SESSION_REAP_INTERVAL)
+
+# Per-process instrumentation, scraped from /metrics (see metrics.py). Stage
+# timings are recorded with timed(); everything below is read at scrape time.
+REQUEST_SECONDS = REGISTRY.histogram('nextstep_request_seconds',
+                                     'HTTP request latency (streaming responses: until the stream starts)',
+                                     STAGE_SECONDS_BUCKETS, labels=('endpoint', 'method'))
+REQUESTS = REGISTRY.counter('nextstep_requests_total', 'HTTP requests by endpoint and status',
+                            labels=('endpoint', 'status'))
+frame_rates = {kind: RateMeter(window=10) for kind in ('captured', 'scored', 'streamed')}
+for kind, meter in frame_rates.items():
+    REGISTRY.gauge_fn('nextstep_frames_per_second', 'Frames per second over the last 10 seconds',
+                      meter.rate, kind=kind)
+    REGISTRY.counter_fn('nextstep_frames_total', 'Frames captured or received, scored and streamed',
+                        lambda meter=meter: meter.total, kind=kind)
+REGISTRY.gauge_fn('nextstep_active_sessions', 'Sessions in the session store', lambda: session_store.count())
+REGISTRY.gauge_fn('nextstep_local_sessions', 'Sessions capturing or streaming in this process',
+                  lambda: len(active_sessions))
+REGISTRY.gauge_fn('nextstep_analysis_threads', 'Per-session capture threads in this process',
+                  lambda: sum(thread.name.startswith('capture-') for thread in threading.enumerate()))
+REGISTRY.gauge_fn('nextstep_threads', 'Threads in this process', threading.active_count)
+for reason in session_reaper.counters:
+    REGISTRY.counter_fn('nextstep_sessions_reaped_total', 'Local sessions stopped by the reaper, by reason',
+                        lambda reason=reason: session_reaper.counters[reason], reason=reason)
+for slot in MODEL_SLOTS:
+    REGISTRY.gauge_fn('nextstep_model_ready', '1 once the model has loaded', lambda slot=slot: slot.ready,
+                      model=slot.name)
+for name in sentiment_cache.counters:
+    REGISTRY.counter_fn('nextstep_sentiment_cache_total', 'Sentiment cache lookups and evictions',
+                        lambda name=name: sentiment_cache.counters[name], result=name)
+for name in frame_ingestor.counters:
+    REGISTRY.counter_fn('nextstep_frame_ingest_total', 'Client-pushed frames by outcome',
+                        lambda name=name: frame_ingestor.counters[name], result=name)
+REGISTRY.gauge_fn('nextstep_transcript_streams', 'Open streaming transcript analyses', lambda: len(transcript_streams))
+SHED = REGISTRY.counter('nextstep_shed_total', 'Requests rejected with 429, by endpoint',
+                        labels=('endpoint',))
+for name in ('running', 'queued'):
+    REGISTRY.gauge_fn('nextstep_inference_tasks', 'Tasks on the bounded inference pool',
+                      getattr(inference_executor, name), state=name)
+for name in ENDPOINT_LIMITS:
+    REGISTRY.gauge_fn('nextstep_endpoint_in_flight', 'Requests or open streams counted against ENDPOINT_LIMITS',
+                      lambda name=name: endpoint_limiter.in_flight[name], endpoint=name)
+
+# Sampling profiler behind /debug/profile; off unless PROFILER_ENABLED is set
+PROFILER_ENABLED = os.environ.get('PROFILER_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN') or None
+profiler = SamplingProfiler()
 
 # Helper function to convert numpy types to JSON-serializable types
 def convert_to_native(value):
@@ -67,149 +315,263 @@ def convert_to_native(value):
         return value.tolist()
     return value
 
+def new_analysis_results(frame_source):
+    return {
+        'body_language': 'Not Detected',
+        'body_confidence': 0.0,
+        'voice_tone_score': 0.0,
+        'body_language_score': 0.0,
+        'combined_score': 0.0,
+        'overall_status': 'Neutral',
+        'timestamp': '',
+        'session_active': True,
+        'frame_source': frame_source
+    }
+
+def average_score(window):
+    """O(1) mean of a rolling score window (50 = neutral when empty)"""
+    return float(window.mean(default=50.0))
+
+def calculate_combined_score(state):
+    """Calculate weighted combined score for a stored session state"""
+    body_avg = average_score(state['body_language_scores'])
+    voice_avg = average_score(state['voice_tone_scores'])
+    results = state['results']
+    
+    # Weighted: 40% body language, 60% voice tone
+    combined = (body_avg * 0.4) + (voice_avg * 0.6)
+    
+    results['body_language_score'] = float(round(body_avg, 2))
+    results['voice_tone_score'] = float(round(voice_avg, 2))
+    results['combined_score'] = float(round(combined, 2))
+    
+    # Determine status
+    if combined >= 75:
+        results['overall_status'] = 'Highly Confident'
+    elif combined >= 60:
+        results['overall_status'] = 'Confident'
+    elif combined >= 40:
+        results['overall_status'] = 'Neutral'
+    else:
+        results['overall_status'] = 'Needs Improvement'
+    
+    return float(combined)
+
 class InterviewSession:
-    """Manages analysis for a single interview session"""
-    def __init__(self, session_id):
+    """Process-local runtime for a session: camera, frame buffer and sampling
+
+    Scores and results live in session_store so any worker can serve them.
+    """
+    def __init__(self, session_id, frame_source='camera'):
         self.session_id = session_id
-        self.body_language_scores = []
-        self.voice_tone_scores = []
-        self.analysis_results = {
-            'body_language': 'Not Detected',
-            'body_confidence': 0.0,
-            'voice_tone_score': 0.0,
-            'body_language_score': 0.0,
-            'combined_score': 0.0,
-            'overall_status': 'Neutral',
-            'timestamp': '',
-            'session_active': False,
-            'question_analyses': []  # Store per-question analysis
-        }
-        self.is_recording = False
+        self.frame_source = frame_source
+        self.active = True
         self.camera = None
-        
-    def add_body_score(self, score):
-        self.body_language_scores.append(float(score))
-        if len(self.body_language_scores) > 100:  # Keep last 100 readings
-            self.body_language_scores.pop(0)
-    
-    def add_voice_score(self, score):
-        self.voice_tone_scores.append(float(score))
-        if len(self.voice_tone_scores) > 50:
-            self.voice_tone_scores.pop(0)
-    
-    def get_average_body_score(self):
-        if not self.body_language_scores:
-            return 50.0
-        return float(np.mean(self.body_language_scores))
-    
-    def get_average_voice_score(self):
-        if not self.voice_tone_scores:
-            return 50.0
-        return float(np.mean(self.voice_tone_scores))
-    
-    def calculate_combined_score(self):
-        """Calculate weighted combined score"""
-        body_avg = self.get_average_body_score()
-        voice_avg = self.get_average_voice_score()
-        
-        # Weighted: 40% body language, 60% voice tone
-        combined = (body_avg * 0.4) + (voice_avg * 0.6)
-        
-        self.analysis_results['body_language_score'] = float(round(body_avg, 2))
-        self.analysis_results['voice_tone_score'] = float(round(voice_avg, 2))
-        self.analysis_results['combined_score'] = float(round(combined, 2))
-        
-        # Determine status
-        if combined >= 75:
-            self.analysis_results['overall_status'] = 'Highly Confident'
-        elif combined >= 60:
-            self.analysis_results['overall_status'] = 'Confident'
-        elif combined >= 40:
-            self.analysis_results['overall_status'] = 'Neutral'
-        else:
-            self.analysis_results['overall_status'] = 'Needs Improvement'
-        
-        return float(combined)
+        self.sampler = FrameSampler()
+        self.frames = FrameBuffer()  # written once per captured frame, read by scheduler and streamers
+        self.feed = FeedEncoder(STREAM_TIERS, jpeg_encode)  # encoded MJPEG parts shared by viewers
+        self.last_prediction = (None, 0.0)  # most recent (label, confidence), reused by stream overlays
+        self._last_sampled_seq = 0
+        self.created_at = time.monotonic()
+        self.last_seen = self.created_at
+        self.capture_thread = None
+        self.frames_scored = 0
+        self.cnn_seconds = 0.0  # this session's share of batched CNN time
+    
+    def touch(self):
+        """Heartbeat: renew the idle TTL"""
+        self.last_seen = time.monotonic()
+    
+    def close(self, timeout=2.0):
+        """Stop capture and release the camera now rather than at garbage collection
+
+        Waits for the capture thread first so the device isn't released under a
+        read in progress; if the thread is stuck, it releases it on its way out.
+        """
+        self.active = False
+        thread = self.capture_thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+            if thread.is_alive():
+                return
+        camera = self.camera
+        if camera is not None:
+            camera.release()
+    
+    def take_latest_frame(self):
+        """Return the newest frame if the sampler wants it scored (called by the scheduler)"""
+        if self.sampler.wait_time() > 0:
+            return None
+        seq, frame = self.frames.latest()
+        if frame is None or seq == self._last_sampled_seq:
+            return None
+        self._last_sampled_seq = seq
+        if not self.sampler.should_analyze(frame):
+            return None
+        camera = self.camera
+        return camera.frame_for_model(frame) if camera is not None else frame
+
+def make_sampler(options):
+    return FrameSampler(
+        target_fps=options.get('analysisFps', BODY_ANALYSIS_FPS),
+        adaptive=options.get('adaptiveSampling', BODY_ANALYSIS_ADAPTIVE),
+        min_fps=BODY_ANALYSIS_MIN_FPS,
+        max_fps=options.get('analysisMaxFps', BODY_ANALYSIS_MAX_FPS),
+        motion_threshold=BODY_MOTION_THRESHOLD
+    )
+
+def get_local_session(session_id):
+    """This process's runtime for a session
+
+    Client-fed sessions started by another worker (or before a restart) are
+    adopted on first use; camera sessions only run where they were started.
+    """
+    session = active_sessions.get(session_id)
+    if session is not None:
+        return session
+    state = session_store.get(session_id)
+    if state is None or state['results'].get('frame_source') != 'client':
+        return None
+    session = InterviewSession(session_id, frame_source='client')
+    session.camera = VideoCamera(device=None)
+    session.sampler = make_sampler({})
+    session_reaper.ensure_running()
+    return active_sessions.setdefault(session_id, session)
+
+def touch_session(session_id):
+    """Renew a local session's idle TTL (no-op for sessions running elsewhere)"""
+    session = active_sessions.get(session_id)
+    if session is not None:
+        session.touch()
+
+def release_local_session(session_id):
+    """Stop this process's capture and streaming for a session"""
+    session = active_sessions.pop(session_id, None)
+    if session is not None:
+        session.close()
+    frame_ingestor.forget(session_id)
+
+def reap_session(session_id, reason):
+    """Expire an abandoned session: drop its stored state and stop its capture"""
+    session_store.delete(session_id)
+    release_local_session(session_id)
+    transcript_streams.discard_session(session_id)
+    print(f"⚠️ Session {session_id} expired ({reason}); capture stopped")
+
+def make_smoothing_window():
+    if BODY_SMOOTHING == 'ewma':
+        return EWMA(alpha=BODY_SMOOTHING_ALPHA)
+    if BODY_SMOOTHING == 'time':
+        return TimeWindow(BODY_SMOOTHING_SECONDS)
+    return RollingWindow(30)
 
 class VideoCamera:
-    def __init__(self):
-        self.video = cv2.VideoCapture(0)
-        self.last_predictions = []
+    def __init__(self, device=0):
+        """device=None creates a capture-less camera for sessions fed by client-pushed frames"""
+        self.video = None
+        if device is not None:
+            self.video = cv2.VideoCapture(device)
+            # Keep the driver queue short so the capture loop always gets a fresh frame
+            self.video.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        self.last_predictions = make_smoothing_window()
+        self.subject = (SubjectTracker(BODY_ROI_CASCADE, redetect_every=BODY_ROI_REDETECT_EVERY)
+                        if BODY_ROI != 'off' else None)
+    
+    def release(self):
+        """Free the capture device (idempotent); __del__ is only a fallback"""
+        video, self.video = self.video, None
+        if video is not None:
+            video.release()
         
     def __del__(self):
-        if self.video is not None:
-            self.video.release()
+        self.release()
+    
+    def record_prediction(self, prediction):
+        """Map a sigmoid output to (label, confidence) and update the smoothing window"""
+        if prediction > 0.5:
+            label = 'confident'
+            confidence = float(prediction * 100)
+        else:
+            label = 'unconfident'
+            confidence = float((1 - prediction) * 100)
+        
+        self.last_predictions.push(confidence if label == 'confident' else 100 - confidence)
+        
+        return label, confidence
     
     def predict_confidence(self, frame):
         """Predict confidence from frame using CNN model"""
-        if body_model is None:
+        backend = body_model.get()
+        if backend is None:
             return None, 0.0
         
         try:
-            img = cv2.resize(frame, IMG_SIZE)
-            img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-            img_normalized = img_rgb.astype('float32') / 255.0
-            img_input = np.expand_dims(img_normalized, axis=0)
-            
-            prediction = body_model.predict(img_input, verbose=0)[0][0]
-            
-            if prediction > 0.5:
-                label = 'confident'
-                confidence = float(prediction * 100)
-            else:
-                label = 'unconfident'
-                confidence = float((1 - prediction) * 100)
+            frame = self.frame_for_model(frame)
+            with timed('cnn_preprocess'):
+                img_rgb = preprocess_frame(frame, IMG_SIZE)
+                img_input = np.expand_dims(img_rgb, axis=0)
             
-            self.last_predictions.append(confidence if label == 'confident' else 100 - confidence)
-            if len(self.last_predictions) > 30:
-                self.last_predictions.pop(0)
-            
-            return label, confidence
+            with timed('cnn_predict'):
+                prediction = backend.predict(img_input)[0]
+            return self.record_prediction(prediction)
             
         except Exception as e:
+            count_error('cnn_predict')
             print(f"Prediction error: {e}")
             return None, 0.0
     
+    def frame_for_model(self, frame):
+        """What the CNN scores: the tracked subject crop with BODY_ROI, else the whole frame"""
+        if self.subject is None:
+            return frame
+        with timed('body_roi'):
+            return self.subject.crop(frame)
+    
     def get_average_confidence(self):
         """Get smoothed confidence score (0-100)"""
-        if not self.last_predictions:
-            return 50.0
-        return float(max(0, min(100, np.mean(self.last_predictions))))
+        return float(max(0, min(100, self.last_predictions.mean(default=50.0))))
     
-    def get_frame(self):
-        """Capture frame"""
+    def read(self):
+        """Capture a mirrored frame without running inference"""
+        if self.video is None:
+            return None
         success, image = self.video.read()
         if not success:
-            return None, None
-        
-        image = cv2.flip(image, 1)
-        prediction, confidence = self.predict_confidence(image)
-        
-        return image, (prediction, confidence)
+            return None
+        return cv2.flip(image, 1)
 
 def get_roberta_scores(text):
     """Get RoBERTa sentiment scores"""
-    if roberta_model is None or tokenizer is None:
+    batcher = roberta_model.get()
+    if batcher is None:
         return {'roberta_neg': 0, 'roberta_neu': 0, 'roberta_pos': 0}
     
     try:
-        encoded = tokenizer(text, return_tensors='pt', truncation=True, max_length=512)
-        output = roberta_model(**encoded)
-        scores = output[0][0].detach().numpy()
-        scores = softmax(scores)
-        return {
-            'roberta_neg': float(scores[0]),
-            'roberta_neu': float(scores[1]),
-            'roberta_pos': float(scores[2])
-        }
+        with timed('roberta'):  # queueing + batched tokenize/forward
+            return batcher.score(text)
     except Exception as e:
+        count_error('roberta')
         print(f"RoBERTa error: {e}")
         return {'roberta_neg': 0, 'roberta_neu': 0, 'roberta_pos': 0}
 
 def analyze_voice_tone(text):
     """Analyze voice sentiment and return 0-100 score"""
+    with timed('voice_tone'):
+        return _analyze_voice_tone(text)
+
+def _analyze_voice_tone(text):
+    with timed('sentiment_cache'):
+        cached = sentiment_cache.get(text)
+    if cached is not None:
+        return cached
+    
     # VADER sentiment
-    vader_scores = sia.polarity_scores(text)
+    sia = vader_model.get()
+    if sia is not None:
+        with timed('vader'):
+            vader_scores = sia.polarity_scores(text)
+    else:
+        vader_scores = {'neg': 0.0, 'neu': 1.0, 'pos': 0.0, 'compound': 0.0}
     compound = vader_scores.get('compound', 0)
     
     # RoBERTa sentiment
@@ -223,11 +585,18 @@ def analyze_voice_tone(text):
     # Combined voice tone score (average of both)
     voice_score = (vader_score + roberta_score) / 2
     
-    return {
+    result = {
         'voice_tone_score': round(voice_score, 2),
         'vader': vader_scores,
         'roberta': roberta_scores
     }
+    
+    # Don't cache fallbacks (model failed or not loaded) so a retry can recover
+    roberta_ok = roberta_model.state == 'disabled' or sum(roberta_scores.values()) > 0
+    if sia is not None and roberta_ok:
+        sentiment_cache.put(text, result)
+    
+    return result
 
 # ==================== API ENDPOINTS ====================
 
@@ -240,51 +609,96 @@ def start_session():
     if not session_id:
         return jsonify({'error': 'Session ID required'}), 400
     
-    if session_id in active_sessions:
+    frame_source = data.get('frameSource', FRAME_SOURCE)
+    if frame_source not in ('camera', 'client'):
+        return jsonify({'error': "frameSource must be 'camera' or 'client'"}), 400
+    
+    if MAX_SESSIONS_PER_WORKER and len(active_sessions) >= MAX_SESSIONS_PER_WORKER:
+        session_reaper.sweep()  # expired sessions make room before anyone is refused
+        if len(active_sessions) >= MAX_SESSIONS_PER_WORKER:
+            raise Overloaded('session limit reached', retry_after=session_retry_after())
+    
+    if not session_store.create(session_id, new_analysis_results(frame_source)):
         return jsonify({'error': 'Session already active'}), 400
     
-    session = InterviewSession(session_id)
-    session.analysis_results['session_active'] = True
-    session.camera = VideoCamera()
+    # In lazy mode the first session kicks off the CNN load without blocking the request
+    body_model.get(wait=False)
+    
+    session = InterviewSession(session_id, frame_source=frame_source)
+    session.sampler = make_sampler(data)
+    session.camera = VideoCamera(device=0 if frame_source == 'camera' else None)
     active_sessions[session_id] = session
+    session_reaper.ensure_running()
     
-    # Start body language analysis thread
-    thread = threading.Thread(target=analyze_body_language_continuous, args=(session_id,))
-    thread.daemon = True
-    thread.start()
+    # Start body language capture thread (client sessions are fed through /api/frames)
+    if frame_source == 'camera':
+        thread = threading.Thread(target=analyze_body_language_continuous, args=(session_id,),
+                                  name=f'capture-{session_id}')
+        thread.daemon = True
+        session.capture_thread = thread
+        thread.start()
     
     return jsonify({
         'status': 'success',
         'sessionId': session_id,
+        'frameSource': frame_source,
         'message': 'Analysis session started'
     })
 
+def session_retry_after():
+    """Retry-After for a full worker: until the next session would expire, within 1-60 s"""
+    expires_in = session_reaper.next_expiry_in()
+    return min(60, max(1, int(expires_in) + 1)) if expires_in is not None else 60
+
+@app.route('/api/session/heartbeat', methods=['POST'])
+def session_heartbeat():
+    """Keep a session alive while the client makes no other calls (any request naming it also counts)"""
+    data = request.json
+    session_id = data.get('sessionId') or data.get('interviewId')
+    
+    if not session_id or not session_store.exists(session_id):
+        return jsonify({'error': 'Session not found'}), 404
+    
+    session = get_local_session(session_id)
+    expires_in = None
+    if session is not None:
+        session.touch()
+        deadline, _ = session_reaper.expiry(session)
+        if deadline is not None:
+            expires_in = round(deadline - time.monotonic(), 1)
+    
+    return jsonify({'status': 'success', 'sessionId': session_id, 'expiresIn': expires_in})
+
 @app.route('/api/session/stop', methods=['POST'])
 def stop_session():
     """Stop interview analysis session"""
     data = request.json
     session_id = data.get('sessionId') or data.get('interviewId')
     
-    if session_id not in active_sessions:
-        return jsonify({'error': 'Session not found'}), 404
-    
-    session = active_sessions[session_id]
-    session.analysis_results['session_active'] = False
+    transcripts = None
+    if session_id and data.get('includeTranscripts'):
+        transcripts = session_transcripts(session_id, session_store.get(session_id))
     
-    if session.camera:
-        del session.camera
+    state = session_store.delete(session_id) if session_id else None
+    release_local_session(session_id)
+    transcript_streams.discard_session(session_id)
+    if state is None:
+        return jsonify({'error': 'Session not found'}), 404
     
     # Get final results - convert all numpy types
     final_results = {
         'sessionId': session_id,
-        'body_language_score': float(session.get_average_body_score()),
-        'voice_tone_score': float(session.get_average_voice_score()),
-        'combined_score': float(session.calculate_combined_score()),
-        'overall_status': session.analysis_results['overall_status'],
-        'question_analyses': session.analysis_results['question_analyses']
+        'body_language_score': average_score(state['body_language_scores']),
+        'voice_tone_score': average_score(state['voice_tone_scores']),
+        'combined_score': calculate_combined_score(state),
+        'overall_status': state['results']['overall_status'],
+        'question_analyses': state['question_analyses'],
+        'question_count': state['question_count'],
+        # Entries the store could not return (0 unless the log lost some)
+        'questions_missing': state['question_count'] - len(state['question_analyses'])
     }
-    
-    del active_sessions[session_id]
+    if transcripts is not None:
+        final_results['transcripts'] = transcripts
     
     return jsonify({
         'status': 'success',
@@ -294,37 +708,97 @@ def stop_session():
 @app.route('/api/analyze/transcript', methods=['POST'])
 def analyze_transcript():
     """Analyze transcript with voice tone analysis"""
-    data = request.json
+    payload, status = inference_executor.submit(transcript_analysis, request.json).result()
+    return jsonify(payload), status
+
+def transcript_analysis(data):
+    """Body of /api/analyze/transcript; runs on the inference pool, returns (payload, status)"""
     session_id = data.get('sessionId') or data.get('interviewId')
     transcript = data.get('transcript', '')
     question_id = data.get('questionId')
     
     if not session_id or not transcript:
-        return jsonify({'error': 'Session ID and transcript required'}), 400
+        return {'error': 'Session ID and transcript required'}, 400
     
     # Analyze voice tone
     voice_analysis = analyze_voice_tone(transcript)
+    record_voice_analysis(session_id, question_id, transcript, voice_analysis)
     
-    # If session exists, add to scores
-    if session_id in active_sessions:
-        session = active_sessions[session_id]
-        session.add_voice_score(voice_analysis['voice_tone_score'])
-        
-        # Store question-specific analysis
-        question_analysis = {
-            'questionId': question_id,
-            'transcript': transcript,
-            'voice_tone_score': voice_analysis['voice_tone_score'],
-            'body_language_score': float(session.get_average_body_score()),
-            'timestamp': datetime.now().isoformat()
-        }
-        session.analysis_results['question_analyses'].append(question_analysis)
-    
-    return jsonify({
+    return {
         'status': 'success',
         'voiceAnalysis': voice_analysis,
         'sessionId': session_id
-    })
+    }, 200
+
+def record_voice_analysis(session_id, question_id, transcript, voice_analysis):
+    """Add an answer's voice tone to its session's scores and question log (no-op for unknown sessions)"""
+    state = session_store.get(session_id)
+    if state is None:
+        return
+    session_store.append_score(session_id, 'voice_tone_scores', voice_analysis['voice_tone_score'])
+    
+    # Store question-specific analysis (the transcript is stored once and referenced by transcriptId)
+    question_analysis = {
+        'questionId': question_id,
+        'voice_tone_score': voice_analysis['voice_tone_score'],
+        'body_language_score': average_score(state['body_language_scores']),
+        'timestamp': datetime.now().isoformat()
+    }
+    session_store.append_question(session_id, question_analysis, transcript=transcript)
+
+@app.route('/api/analyze/transcript/stream', methods=['POST'])
+def analyze_transcript_stream():
+    """
+    Incremental voice tone analysis of a transcript arriving as fragments
+    Body: sessionId, questionId, fragment (text appended verbatim to the answer
+    so far, so include separating spaces) and final (true with the last
+    fragment). Completed sentences are scored as they arrive and the running
+    scores are returned; the final call runs on the inference pool, records the
+    answer like /api/analyze/transcript and returns the same voiceAnalysis.
+    """
+    data = request.json
+    session_id = data.get('sessionId') or data.get('interviewId')
+    question_id = data.get('questionId')
+    fragment = data.get('fragment', '')
+    
+    if not session_id or question_id is None:
+        return jsonify({'error': 'Session ID and question ID required'}), 400
+    
+    if not data.get('final'):
+        stream = transcript_streams.get(session_id, question_id)
+        stream.append(fragment)
+        return jsonify({
+            'status': 'success',
+            'sessionId': session_id,
+            'questionId': question_id,
+            'final': False,
+            'partialAnalysis': stream.snapshot()
+        })
+    
+    payload, status = inference_executor.submit(finish_transcript_stream, session_id, question_id,
+                                                fragment).result()
+    return jsonify(payload), status
+
+def finish_transcript_stream(session_id, question_id, fragment):
+    """Final call of /api/analyze/transcript/stream; runs on the inference pool, returns (payload, status)
+
+    The stream is only taken once admitted, so a 429 leaves it open for the retry.
+    """
+    stream = transcript_streams.pop(session_id, question_id) or new_question_stream()
+    stream.append(fragment)
+    if not stream.text.strip():
+        return {'error': 'Transcript required'}, 400
+    voice_analysis = stream.finish()
+    record_voice_analysis(session_id, question_id, stream.text, voice_analysis)
+    
+    return {
+        'status': 'success',
+        'sessionId': session_id,
+        'questionId': question_id,
+        'final': True,
+        'transcript': stream.text,
+        'voiceAnalysis': voice_analysis
+    }, 200
 
 @app.route('/api/analyze/question-response', methods=['POST'])
 def analyze_question_response():
@@ -332,14 +806,18 @@ def analyze_question_response():
     Comprehensive analysis endpoint for a single question response
     Returns combined score for response + voice + body language
     """
-    data = request.json
+    payload, status = inference_executor.submit(question_response_analysis, request.json).result()
+    return jsonify(payload), status
+
+def question_response_analysis(data):
+    """Body of /api/analyze/question-response; runs on the inference pool, returns (payload, status)"""
     session_id = data.get('sessionId') or data.get('interviewId')
     transcript = data.get('transcript', '')
     question_id = data.get('questionId')
     response_score = data.get('responseScore', 0)  # Score from LLM evaluation
     
     if not session_id:
-        return jsonify({'error': 'Session ID required'}), 400
+        return {'error': 'Session ID required'}, 400
     
     # Voice tone analysis
     voice_analysis = analyze_voice_tone(transcript)
@@ -347,10 +825,10 @@ def analyze_question_response():
     
     # Body language score
     body_score = 50.0  # Default
-    if session_id in active_sessions:
-        session = active_sessions[session_id]
-        body_score = float(session.get_average_body_score())
-        session.add_voice_score(voice_score)
+    state = session_store.get(session_id)
+    if state is not None:
+        body_score = average_score(state['body_language_scores'])
+        session_store.append_score(session_id, 'voice_tone_scores', voice_score)
     
     # Calculate final combined score
     # Weights: 50% response content, 25% voice tone, 25% body language
@@ -374,98 +852,445 @@ def analyze_question_response():
         'timestamp': datetime.now().isoformat()
     }
     
-    return jsonify(result)
+    return result, 200
+
+def build_status_results(state):
+    """Score fields shared by the status endpoint and the status stream"""
+    calculate_combined_score(state)
+    analysis_results = state['results']
+    
+    # Convert all numpy types to native Python types
+    return {
+        'body_language': analysis_results['body_language'],
+        'body_confidence': float(analysis_results.get('body_confidence', 0.0)),
+        'voice_tone_score': float(analysis_results.get('voice_tone_score', 0.0)),
+        'body_language_score': float(analysis_results.get('body_language_score', 0.0)),
+        'combined_score': float(analysis_results.get('combined_score', 0.0)),
+        'overall_status': analysis_results['overall_status'],
+        'timestamp': analysis_results['timestamp'],
+        'session_active': analysis_results['session_active']
+    }
+
+def session_transcripts(session_id, state):
+    """Transcript texts referenced by a state's page of question analyses"""
+    if state is None:
+        return {}
+    ids = {q['transcriptId'] for q in state['question_analyses'] if q.get('transcriptId')}
+    return session_store.transcripts(session_id, ids)
 
 @app.route('/api/session/status', methods=['GET'])
 def get_session_status():
-    """Get current analysis status for a session"""
+    """
+    Get current analysis status for a session
+    question_analyses are paged: ?since=<questionCursor from the previous
+    response>&limit=<n>; ?transcripts=true adds the referenced transcript texts.
+    """
     session_id = request.args.get('sessionId')
+    since = max(request.args.get('since', 0, type=int), 0)
+    limit = min(max(request.args.get('limit', QUESTION_PAGE_SIZE, type=int), 1), QUESTION_PAGE_SIZE)
     
-    if not session_id or session_id not in active_sessions:
+    state = session_store.get(session_id, questions_since=since, questions_limit=limit) if session_id else None
+    if state is None:
         return jsonify({'active': False})
     
-    session = active_sessions[session_id]
-    session.calculate_combined_score()
-    
-    # Convert all numpy types to native Python types
+    questions = state['question_analyses']
+    cursor = questions[-1]['seq'] if questions else since
+    # Sampling stats only exist on the worker running the session's capture
+    session = active_sessions.get(session_id)
     results = {
-        'body_language': session.analysis_results['body_language'],
-        'body_confidence': float(session.analysis_results.get('body_confidence', 0.0)),
-        'voice_tone_score': float(session.analysis_results.get('voice_tone_score', 0.0)),
-        'body_language_score': float(session.analysis_results.get('body_language_score', 0.0)),
-        'combined_score': float(session.analysis_results.get('combined_score', 0.0)),
-        'overall_status': session.analysis_results['overall_status'],
-        'timestamp': session.analysis_results['timestamp'],
-        'session_active': session.analysis_results['session_active'],
-        'question_analyses': session.analysis_results['question_analyses']
+        **build_status_results(state),
+        'question_analyses': questions,
+        'question_cursor': cursor,
+        'question_count': state['question_count'],
+        'has_more_questions': cursor < state['question_count'],
+        'sampling': session.sampler.stats() if session else None
     }
+    if request.args.get('transcripts', '').lower() in ('1', 'true', 'yes'):
+        results['transcripts'] = session_transcripts(session_id, state)
     
     return jsonify({
         'active': True,
         'results': results
     })
 
+@app.route('/api/session/events/<session_id>')
+def session_events(session_id):
+    """
+    Server-Sent Events stream of a session's status (see status_stream.py)
+    Pushes a snapshot, then deltas whenever scores change, at most once per
+    ?interval= milliseconds (default STATUS_PUSH_INTERVAL_MS).
+    """
+    if not session_store.exists(session_id):
+        return jsonify({'error': 'Session not found'}), 404
+    
+    interval = status_push_interval(request.args.get('interval', STATUS_PUSH_INTERVAL_MS, type=float))
+    return Response(status_events(status_fetcher(session_id), interval=interval), mimetype='text/event-stream',
+                    headers=SSE_HEADERS)
+
+SSE_HEADERS = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+
+def status_push_interval(interval_ms):
+    return max(interval_ms, STATUS_PUSH_MIN_INTERVAL_MS) / 1000
+
+def status_fetcher(session_id):
+    """fetch(questions_since) callback for status_stream's generators"""
+    def fetch(questions_since):
+        touch_session(session_id)  # an open status stream keeps its session alive
+        state = session_store.get(session_id, questions_since=questions_since, questions_limit=QUESTION_PAGE_SIZE)
+        if state is None:
+            return None
+        questions = state['question_analyses']
+        cursor = questions[-1]['seq'] if questions else questions_since
+        return build_status_results(state), questions, cursor
+    return fetch
+
+@app.route('/api/frames/<session_id>', methods=['POST'])
+def ingest_frames(session_id):
+    """
+    Accept client-pushed frames for a session
+    Body is one encoded frame (image/jpeg, image/webp, ...) or raw pixels with
+    X-Frame-Format (bgr/rgb/rgba), X-Frame-Width and X-Frame-Height headers.
+    With Content-Type application/x-frame-stream the (chunked) body is a sequence
+    of [4-byte big-endian length][frame] records sent over one request.
+    """
+    session = get_local_session(session_id)
+    if not session or not session.active:
+        return jsonify({'error': 'Session not found'}), 404
+    
+    raw_format = request.headers.get('X-Frame-Format')
+    if raw_format is not None and raw_format not in RAW_FORMATS:
+        return jsonify({'error': f'Unsupported X-Frame-Format: {raw_format}'}), 400
+    width = request.headers.get('X-Frame-Width', type=int)
+    height = request.headers.get('X-Frame-Height', type=int)
+    
+    if request.mimetype == 'application/x-frame-stream':
+        received = 0
+        dropped = 0
+        try:
+            for payload in iter_length_prefixed(request.stream, FRAME_MAX_BYTES):
+                if not session.active:
+                    break
+                dropped += frame_ingestor.submit(session_id, session.frames, payload,
+                                                 raw_format, width, height)
+                frame_rates['captured'].mark()
+                session.touch()
+                received += 1
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        return jsonify({'status': 'success', 'received': received, 'dropped': dropped})
+    
+    if request.content_length and request.content_length > FRAME_MAX_BYTES:
+        return jsonify({'error': 'Frame too large'}), 413
+    payload = read_capped(request.stream, FRAME_MAX_BYTES)
+    if payload is None:
+        return jsonify({'error': 'Frame too large'}), 413
+    if not payload:
+        return jsonify({'error': 'Frame data required'}), 400
+    
+    dropped = frame_ingestor.submit(session_id, session.frames, payload, raw_format, width, height)
+    frame_rates['captured'].mark()
+    return jsonify({'status': 'success', 'received': 1, 'dropped': int(dropped)}), 202
+
 @app.route('/api/video-feed/<session_id>')
 def video_feed(session_id):
-    """Video streaming route for specific session"""
-    if session_id not in active_sessions:
+    """
+    Video streaming route for specific session
+    ?tier=<name> picks the starting (and best) STREAM_TIERS tier; ?adaptive=false
+    keeps the viewer on it even when the connection backs up.
+    """
+    session = get_local_session(session_id)
+    if session is None:
         return jsonify({'error': 'Session not found'}), 404
     
+    client = feed_client(request.args)
+    
     def generate():
-        session = active_sessions.get(session_id)
-        if not session or not session.camera:
-            return
-        
-        while session.analysis_results['session_active']:
-            frame, analysis = session.camera.get_frame()
+        seq = 0
+        while session.active:
+            time.sleep(client.wait_time())
+            seq, frame = session.frames.wait_for(seq, timeout=1.0)
             if frame is not None:
-                # Add overlay
-                if analysis[0] is not None:
-                    prediction, confidence = analysis
-                    color = (0, 255, 0) if prediction == 'confident' else (0, 165, 255)
-                    cv2.rectangle(frame, (10, 10), (400, 80), (0, 0, 0), -1)
-                    cv2.putText(frame, f'Body Language: {prediction.upper()}', 
-                               (20, 40), cv2.FONT_HERSHEY_SIMPLEX, 0.8, color, 2)
-                    cv2.putText(frame, f'Confidence: {confidence:.1f}%', 
-                               (20, 65), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
-                
-                ret, jpeg = cv2.imencode('.jpg', frame)
-                yield (b'--frame\r\n'
-                       b'Content-Type: image/jpeg\r\n\r\n' + jpeg.tobytes() + b'\r\n')
+                part = session.feed.part(client.tier, seq, frame, session.last_prediction)
+                frame_rates['streamed'].mark()
+                session.touch()  # a watched session is not idle
+                started = time.monotonic()
+                yield part  # resumes once the server has written the chunk to the socket
+                client.sent(time.monotonic() - started)
     
     return Response(generate(),
-                    mimetype='multipart/x-mixed-replace; boundary=frame')
+                    mimetype=FEED_MIMETYPE)
+
+def feed_client(args):
+    """A viewer's tier state from its query args (?tier=, ?adaptive=)"""
+    adaptive = STREAM_ADAPTIVE and args.get('adaptive', 'true').lower() not in ('0', 'false', 'no')
+    return FeedClient(STREAM_TIERS, start=tier_index(STREAM_TIERS, args.get('tier')), adaptive=adaptive)
 
 def analyze_body_language_continuous(session_id):
-    """Continuous body language analysis in background"""
+    """Single capture loop per session: decodes each camera frame once into session.frames
+
+    Scoring is done by the shared body_scheduler and streaming by video_feed,
+    both reading from the buffer.
+    """
     session = active_sessions.get(session_id)
     if not session:
         return
     
-    while session.analysis_results['session_active']:
-        if session.camera:
-            frame, analysis = session.camera.get_frame()
-            if frame is not None and analysis[0] is not None:
-                prediction, confidence = analysis
-                score = session.camera.get_average_confidence()
-                session.add_body_score(score)
-                
-                session.analysis_results['body_language'] = prediction.capitalize()
-                session.analysis_results['body_confidence'] = float(round(confidence, 2))
-                session.analysis_results['timestamp'] = datetime.now().strftime("%H:%M:%S")
+    last_check = time.time()
+    try:
+        while session.active:
+            # The session may have been stopped through another worker
+            if time.time() - last_check >= 1.0:
+                last_check = time.time()
+                if not session_store.exists(session_id):
+                    release_local_session(session_id)
+                    break
+            
+            camera = session.camera
+            frame = camera.read() if camera else None
+            if frame is None:
+                time.sleep(0.05)  # camera unavailable; don't spin
+                continue
+            
+            session.frames.put(frame)
+            frame_rates['captured'].mark()
+    finally:
+        session.close()  # releases the camera from this thread, never under a read in progress
+
+def apply_body_prediction(session, prediction, seconds=0.0):
+    """Fan a batched CNN result back out to its session"""
+    camera = session.camera
+    if camera is None or not session.active:
+        return
+    
+    session.frames_scored += 1
+    session.cnn_seconds += seconds
+    label, confidence = camera.record_prediction(prediction)
+    session.last_prediction = (label, confidence)
+    frame_rates['scored'].mark()
+    
+    # One atomic store write per prediction: score window plus the latest label
+    stored = session_store.append_score(
+        session.session_id, 'body_language_scores', camera.get_average_confidence(),
+        results={
+            'body_language': label.capitalize(),
+            'body_confidence': float(round(confidence, 2)),
+            'timestamp': datetime.now().strftime("%H:%M:%S")
+        }
+    )
+    if not stored:
+        release_local_session(session.session_id)  # stopped through another worker
+
+def models_ready():
+    return all(slot.ready for slot in MODEL_SLOTS if slot.state != 'disabled')
 
 @app.route('/health')
 def health_check():
-    """Health check endpoint"""
+    """Health check endpoint (always 200 once the port is bound; see 'ready' for model state)"""
+    batcher = roberta_model.value if roberta_model.ready else None
     return jsonify({
         'status': 'healthy',
+        'ready': models_ready(),
         'models': {
-            'body_language': body_model is not None,
-            'roberta': roberta_model is not None
+            'body_language': body_model.ready,
+            'roberta': roberta_model.ready,
+            'backends': {
+                'body_language': BODY_MODEL_BACKEND if body_model.ready else None,
+                'roberta': TEXT_MODEL_BACKEND if roberta_model.ready else None
+            },
+            'loading': {slot.name: slot.status() for slot in MODEL_SLOTS}
+        },
+        'roberta_batching': batcher.stats() if batcher else None,
+        'sentiment_cache': sentiment_cache.stats(),
+        'body_scoring': body_scheduler.stats() if body_scheduler else None,
+        'frame_ingest': frame_ingestor.stats(),
+        'inference': inference_executor.stats(),
+        'transcript_streams': transcript_streams.stats(),
+        'endpoint_limits': endpoint_limiter.stats(),
+        'session_lifecycle': {**session_reaper.stats(), 'max_sessions_per_worker': MAX_SESSIONS_PER_WORKER},
+        'session_store': session_store.stats(),
+        'active_sessions': session_store.count(),
+        'local_sessions': len(active_sessions)
+    })
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.before_request
+def renew_session():
+    """Any request naming a session (path, ?sessionId= or JSON body) is a heartbeat for it"""
+    session_id = (request.view_args or {}).get('session_id') or request.args.get('sessionId')
+    if not session_id and request.is_json:
+        data = request.get_json(silent=True)
+        if isinstance(data, dict):
+            session_id = data.get('sessionId') or data.get('interviewId')
+    if session_id:
+        touch_session(session_id)
+
+@app.before_request
+def admit_request():
+    """Take the endpoint's ENDPOINT_LIMITS slot (raises Overloaded when it is full)"""
+    if endpoint_limiter.acquire(request.endpoint):
+        g.limit_slot = request.endpoint
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        endpoint = request.endpoint or 'unmatched'
+        REQUEST_SECONDS.labels(endpoint=endpoint, method=request.method).observe(time.perf_counter() - started)
+        REQUESTS.labels(endpoint=endpoint, status=response.status_code).inc()
+    slot = g.get('limit_slot')
+    if slot is not None and response.is_streamed:
+        # Streams hold their slot until the client goes away, not until the view returns
+        g.limit_slot = None
+        response.call_on_close(lambda: endpoint_limiter.release(slot))
+    return response
+
+@app.teardown_request
+def release_request_slot(exc):
+    slot = g.pop('limit_slot', None)
+    if slot is not None:
+        endpoint_limiter.release(slot)
+
+@app.errorhandler(Overloaded)
+def shed_request(error):
+    """429 with a Retry-After hint when admission control rejects a request"""
+    SHED.labels(endpoint=request.endpoint or 'unmatched').inc()
+    response = jsonify({'error': 'Server busy, retry later', 'reason': error.reason,
+                        'retryAfter': error.retry_after})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus text exposition of this process's metrics"""
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+def profiler_allowed():
+    if not PROFILER_ENABLED:
+        return False
+    return ADMIN_TOKEN is None or request.headers.get('X-Admin-Token') == ADMIN_TOKEN
+
+@app.route('/debug/profile', methods=['GET'])
+def profile_status():
+    """Sampling profiler state; ?stacks=<n> adds the top n collapsed stacks so far"""
+    if not profiler_allowed():
+        return jsonify({'error': 'Not found'}), 404
+    status = profiler.status()
+    limit = request.args.get('stacks', type=int)
+    if limit:
+        status['stacks'] = profiler.collapsed(limit).splitlines()
+    return jsonify(status)
+
+@app.route('/debug/profile/start', methods=['POST'])
+def profile_start():
+    """Start sampling every ?interval_ms= (default 10), for at most ?seconds= (default 60)"""
+    if not profiler_allowed():
+        return jsonify({'error': 'Not found'}), 404
+    interval_ms = request.args.get('interval_ms', 10.0, type=float)
+    seconds = min(request.args.get('seconds', 60.0, type=float), 600.0)
+    if not profiler.start(interval=interval_ms / 1000.0, duration=seconds):
+        return jsonify({'error': 'Profiler already running', **profiler.status()}), 409
+    return jsonify(profiler.status())
+
+@app.route('/debug/profile/stop', methods=['POST'])
+def profile_stop():
+    """Stop sampling; returns collapsed stacks (flamegraph.pl / speedscope input)"""
+    if not profiler_allowed():
+        return jsonify({'error': 'Not found'}), 404
+    return Response(profiler.stop(), mimetype='text/plain')
+
+def admin_allowed():
+    return ADMIN_TOKEN is not None and request.headers.get('X-Admin-Token') == ADMIN_TOKEN
+
+def session_resources(session, now):
+    """Age, expiry, CPU and memory of one local session"""
+    deadline, reason = session_reaper.expiry(session)
+    _, frame = session.frames.latest()
+    capture_cpu = thread_cpu_seconds(session.capture_thread)
+    return {
+        'session_id': session.session_id,
+        'frame_source': session.frame_source,
+        'active': session.active,
+        'age_seconds': round(now - session.created_at, 1),
+        'idle_seconds': round(now - session.last_seen, 1),
+        'expires_in_seconds': round(deadline - now, 1) if deadline is not None else None,
+        'expires_by': reason,
+        # capture: the session's own thread; decode: client frames on the ingest pool
+        'cpu_seconds': {
+            'capture': round(capture_cpu, 3) if capture_cpu is not None else None,
+            'decode': round(frame_ingestor.decode_seconds(session.session_id), 3)
         },
-        'active_sessions': len(active_sessions)
+        'cnn_seconds': round(session.cnn_seconds, 3),  # share of batched scheduler time
+        'frames_scored': session.frames_scored,
+        'memory_bytes': {
+            'frame_buffer': int(frame.nbytes) if frame is not None else 0,
+            'feed_parts': session.feed.nbytes()
+        }
+    }
+
+@app.route('/admin/sessions', methods=['GET'])
+def admin_sessions():
+    """This worker's sessions with their resource usage, busiest first (needs ADMIN_TOKEN)"""
+    if not admin_allowed():
+        return jsonify({'error': 'Not found'}), 404
+    now = time.monotonic()
+    sessions = [session_resources(session, now) for session in list(active_sessions.values())]
+    sessions.sort(key=lambda s: (s['cpu_seconds']['capture'] or 0) + s['cpu_seconds']['decode'] + s['cnn_seconds'],
+                  reverse=True)
+    rss = process_rss_mb()
+    return jsonify({
+        'pid': os.getpid(),
+        'process': {
+            'rss_mb': round(rss, 1) if rss is not None else None,
+            'cpu_seconds': round(time.process_time(), 3),
+            'threads': threading.active_count()
+        },
+        'lifecycle': {**session_reaper.stats(), 'max_sessions_per_worker': MAX_SESSIONS_PER_WORKER},
+        'sessions': sessions
     })
 
+@app.route('/admin/sessions/<session_id>/reap', methods=['POST'])
+def admin_reap_session(session_id):
+    """Stop a session now, as if it had expired"""
+    if not admin_allowed():
+        return jsonify({'error': 'Not found'}), 404
+    if session_id not in active_sessions and not session_store.exists(session_id):
+        return jsonify({'error': 'Session not found'}), 404
+    session_reaper.reap_now(session_id, 'admin')
+    return jsonify({'status': 'success', 'sessionId': session_id})
+
+@app.route('/health/live')
+def liveness_check():
+    """Liveness: the process is up and serving requests"""
+    return jsonify({'status': 'alive'})
+
+@app.route('/health/ready')
+def readiness_check():
+    """Readiness: every enabled model has loaded (503 while loading or after a failure)"""
+    ready = models_ready()
+    return jsonify({
+        'ready': ready,
+        'mode': MODEL_LOADING,
+        'models': {slot.name: slot.status() for slot in MODEL_SLOTS}
+    }), 200 if ready else 503
+
+def configure_worker(threads=None):
+    """Per-process set-up after fork: pin intra-op threads, then load models that can't be shared"""
+    global INTRA_OP_THREADS
+    if threads:
+        INTRA_OP_THREADS = threads
+        os.environ['OMP_NUM_THREADS'] = str(threads)
+        if 'torch' in sys.modules:
+            sys.modules['torch'].set_num_threads(threads)
+    start_loading([slot for slot in MODEL_SLOTS if not slot.fork_safe], 'background')
+
+# Models are loaded last so loaders can reference everything defined above
+start_loading(MODEL_SLOTS, MODEL_LOADING)
+
 if __name__ == '__main__':
     print("\n" + "="*60)
     print(" "*10 + "INTERVIEW ANALYSIS SERVER")
@@ -0,0 +1,230 @@
+"""
+asgi.py - Async serving mode: run with an ASGI server instead of gunicorn
+    uvicorn asgi:app --host 0.0.0.0 --port 5001
+
+Two long-lived streams are served natively on the event loop, so an open
+stream costs a coroutine rather than a worker thread:
+
+    /api/video-feed/<id>        MJPEG; waits on the frame buffer without a
+                                thread, shared JPEG encodes run on a small pool
+    /api/session/events/<id>    SSE; store reads run on the default executor
+
+Every other route is the unchanged Flask app mounted with asgiref's
+WsgiToAsgi, at most WSGI_THREADS requests at a time with WSGI_QUEUE_LIMIT
+more waiting before 429. ENDPOINT_LIMITS applies to the native routes exactly
+as under gunicorn. Each ASGI worker process is independent: with more than
+one, use a shared SESSION_STORE and client frame sources (camera sessions and
+their feeds live in the process that started them).
+"""
+
+import asyncio
+import os
+import time
+from urllib.parse import parse_qs
+
+from asgiref.sync import ThreadSensitiveContext
+from asgiref.wsgi import WsgiToAsgi
+
+os.environ.setdefault('MODEL_LOADING', 'background')
+
+import app as server
+from admission import BoundedExecutor, Overloaded
+from status_stream import status_events_async
+
+WSGI_THREADS = int(os.environ.get('WSGI_THREADS', 16))
+WSGI_QUEUE_LIMIT = int(os.environ.get('WSGI_QUEUE_LIMIT', 256))
+STREAM_ENCODE_WORKERS = int(os.environ.get('STREAM_ENCODE_WORKERS', 2))
+
+CORS_HEADERS = [(b'access-control-allow-origin', b'*')]  # as flask_cors adds on the Flask routes
+
+
+async def send_json(send, status, payload, headers=()):
+    # Flask's JSON provider, so responses serialise exactly as jsonify would
+    body = server.app.json.dumps(payload).encode('utf-8')
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode()),
+                    *CORS_HEADERS, *headers]
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def send_overloaded(send, endpoint, error):
+    server.SHED.labels(endpoint=endpoint).inc()
+    await send_json(send, 429, {'error': 'Server busy, retry later', 'reason': error.reason,
+                                'retryAfter': error.retry_after},
+                    headers=[(b'retry-after', str(error.retry_after).encode())])
+
+
+async def send_stream(receive, send, content_type, chunks, headers=()):
+    """Stream an async generator of bytes until it ends or the client disconnects
+
+    Each next chunk is raced against the disconnect, so an idle stream (an SSE
+    stream with nothing to report) is closed as soon as the client leaves.
+    """
+    async def watch_disconnect():
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+
+    watcher = asyncio.ensure_future(watch_disconnect())
+    try:
+        await send({'type': 'http.response.start', 'status': 200,
+                    'headers': [(b'content-type', content_type.encode()), *CORS_HEADERS, *headers]})
+        while True:
+            next_chunk = asyncio.ensure_future(chunks.__anext__())
+            await asyncio.wait({next_chunk, watcher}, return_when=asyncio.FIRST_COMPLETED)
+            if not next_chunk.done():
+                next_chunk.cancel()
+                await asyncio.wait({next_chunk})  # let the generator unwind before aclose()
+                return
+            try:
+                chunk = next_chunk.result()
+            except StopAsyncIteration:
+                break
+            await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+        await send({'type': 'http.response.body', 'body': b''})
+    except OSError:
+        pass  # client went away mid-send
+    finally:
+        watcher.cancel()
+        await chunks.aclose()
+
+
+class AsyncServer:
+    """ASGI application: native MJPEG and SSE streams, everything else through WsgiToAsgi(Flask)"""
+    def __init__(self, flask_app):
+        self.flask = WsgiToAsgi(flask_app)
+        self.flask_slots = asyncio.Semaphore(WSGI_THREADS)
+        self.flask_waiting = 0
+        self.encode_pool = BoundedExecutor(STREAM_ENCODE_WORKERS, 0, name='stream-encode')
+        # path prefix -> (endpoint name, handler); both take the session id from the rest of the path
+        self.routes = {
+            '/api/video-feed/': ('video_feed', self.video_feed),
+            '/api/session/events/': ('session_events', self.session_events),
+        }
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+        if scope['type'] != 'http':
+            return
+
+        route = self.match(scope)
+        if route is None:
+            return await self.call_flask(scope, receive, send)
+
+        endpoint, handler, session_id = route
+        started = time.perf_counter()
+        status = 500
+        try:
+            with server.endpoint_limiter.limit(endpoint):
+                status = await handler(scope, receive, send, session_id)
+        except Overloaded as e:
+            status = 429
+            await send_overloaded(send, endpoint, e)
+        finally:
+            server.REQUEST_SECONDS.labels(endpoint=endpoint, method=scope['method']).observe(
+                time.perf_counter() - started)
+            server.REQUESTS.labels(endpoint=endpoint, status=status).inc()
+
+    def match(self, scope):
+        if scope['method'] != 'GET':
+            return None
+        path = scope['path']
+        for prefix, (endpoint, handler) in self.routes.items():
+            session_id = path[len(prefix):]
+            if path.startswith(prefix) and session_id and '/' not in session_id:
+                return endpoint, handler, session_id
+        return None
+
+    async def call_flask(self, scope, receive, send):
+        if self.flask_slots.locked() and self.flask_waiting >= WSGI_QUEUE_LIMIT:
+            return await send_overloaded(send, 'wsgi', Overloaded('wsgi queue full'))
+        self.flask_waiting += 1
+        try:
+            await self.flask_slots.acquire()
+        finally:
+            self.flask_waiting -= 1
+        try:
+            # asgiref runs sync code on one shared thread unless each request has its own context
+            async with ThreadSensitiveContext():
+                await self.flask(scope, receive, send)
+        finally:
+            self.flask_slots.release()
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                for pool in (self.encode_pool, server.inference_executor):
+                    pool.shutdown()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    # ==================== NATIVE ROUTES ====================
+
+    async def video_feed(self, scope, receive, send, session_id):
+        loop = asyncio.get_running_loop()
+        session = await loop.run_in_executor(None, server.get_local_session, session_id)
+        if session is None:
+            await send_json(send, 404, {'error': 'Session not found'})
+            return 404
+
+        client = server.feed_client(query_args(scope))
+
+        async def generate():
+            seq = 0
+            while session.active:
+                await asyncio.sleep(client.wait_time())
+                seq, frame = await session.frames.wait_async(seq, timeout=1.0)
+                if frame is None:
+                    continue
+                part = session.feed.cached(client.tier, seq)
+                if part is None:
+                    try:
+                        future = self.encode_pool.submit(session.feed.part, client.tier, seq, frame,
+                                                         session.last_prediction)
+                    except Overloaded:
+                        continue  # encoders busy: skip this frame, the next one supersedes it
+                    part = await asyncio.wrap_future(future)
+                server.frame_rates['streamed'].mark()
+                session.touch()
+                started = time.monotonic()
+                yield part  # resumes after send() returns, which waits while the socket is backed up
+                client.sent(time.monotonic() - started)
+
+        await send_stream(receive, send, server.FEED_MIMETYPE, generate())
+        return 200
+
+    async def session_events(self, scope, receive, send, session_id):
+        loop = asyncio.get_running_loop()
+        if not await loop.run_in_executor(None, server.session_store.exists, session_id):
+            await send_json(send, 404, {'error': 'Session not found'})
+            return 404
+
+        try:
+            interval_ms = float(query_args(scope).get('interval', server.STATUS_PUSH_INTERVAL_MS))
+        except ValueError:
+            interval_ms = server.STATUS_PUSH_INTERVAL_MS
+        events = status_events_async(server.status_fetcher(session_id),
+                                     interval=server.status_push_interval(interval_ms))
+        headers = [(key.lower().encode(), value.encode()) for key, value in server.SSE_HEADERS.items()]
+        await send_stream(receive, send, 'text/event-stream', events, headers=headers)
+        return 200
+
+
+def query_args(scope):
+    """Last value of each query parameter"""
+    query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+    return {key: values[-1] for key, values in query.items()}
+
+
+app = AsyncServer(server.app)
+
+server.REGISTRY.gauge_fn('nextstep_pool_queued', 'Tasks waiting on the ASGI thread pools',
+                         lambda: app.flask_waiting, pool='wsgi')
+server.REGISTRY.gauge_fn('nextstep_pool_queued', 'Tasks waiting on the ASGI thread pools',
+                         app.encode_pool.queued, pool='stream_encode')
@@ -0,0 +1,383 @@
+"""
+batch_score.py - Offline scoring of recorded interviews with the live analysis models
+Re-scores archived interview videos and transcripts, e.g. after a model
+update, using the same scoring as app.py: VideoCamera.record_prediction for
+each CNN output, analyze_voice_tone for each answer and
+calculate_combined_score over the session's score windows.
+
+Usage:
+    python batch_score.py --input recordings/ --output scores.jsonl
+    python batch_score.py --manifest interviews.jsonl --output scores.jsonl --workers 8
+    python batch_score.py --input recordings/ --output scores_parquet --format parquet
+
+Inputs:
+    --input DIR       every video in DIR (recursively) is one interview; answers
+                      are read from a sibling file with the same name and a
+                      .txt (one answer per line) or .json (list of strings, or
+                      {"transcripts": [...]}) extension. Transcript files
+                      without a video are scored as text-only interviews.
+    --manifest FILE   JSONL, one interview per line:
+                      {"id": "...", "video": "path", "transcripts": ["..."]}
+                      ("transcript_file" may replace "transcripts")
+
+Videos are decoded and sampled in a process pool; CNN inference runs in this
+process in batches, and answers go through the shared RoBERTa batcher.
+Results are written as they finish. Re-running with the same output skips
+interviews already scored (failed ones are retried), so an interrupted run
+resumes where it stopped.
+
+Model configuration comes from the same environment variables as app.py
+(BODY_MODEL_BACKEND, TEXT_MODEL_BACKEND, ...). Parquet output needs pyarrow.
+"""
+
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+from body_roi import ROI_MODES, make_cropper
+from frame_scheduler import preprocess_frame
+from video_frames import STRATEGIES, extract_frames_from_video
+
+VIDEO_EXTS = ('.mp4', '.avi', '.mov', '.mkv', '.webm')
+TRANSCRIPT_EXTS = ('.json', '.txt')
+IMG_SIZE = (96, 96)
+
+
+# ==================== INPUTS ====================
+
+def read_transcripts(path):
+    """Answers from a .txt (one per line) or .json transcript file"""
+    if path is None or not os.path.exists(path):
+        return []
+    with open(path, encoding='utf-8') as f:
+        if path.endswith('.json'):
+            data = json.load(f)
+            if isinstance(data, dict):
+                data = data.get('transcripts', [])
+            return [str(text) for text in data if str(text).strip()]
+        return [line.strip() for line in f if line.strip()]
+
+
+def scan_directory(folder):
+    """Yield one job per video (or transcript-only answer file), sorted by path"""
+    by_stem = {}
+    for path in glob.glob(os.path.join(folder, '**', '*'), recursive=True):
+        stem, ext = os.path.splitext(path)
+        kind = 'video' if ext.lower() in VIDEO_EXTS else 'transcript' if ext.lower() in TRANSCRIPT_EXTS else None
+        if kind:
+            by_stem.setdefault(stem, {})[kind] = path
+
+    for stem in sorted(by_stem):
+        paths = by_stem[stem]
+        yield {
+            'id': os.path.relpath(stem, folder),
+            'video': paths.get('video'),
+            'transcript_file': paths.get('transcript')
+        }
+
+
+def scan_manifest(path):
+    base = os.path.dirname(os.path.abspath(path))
+    with open(path, encoding='utf-8') as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            job = json.loads(line)
+            job.setdefault('id', job.get('video') or f'line-{line_no}')
+            for key in ('video', 'transcript_file'):
+                if job.get(key) and not os.path.isabs(job[key]):
+                    job[key] = os.path.join(base, job[key])
+            yield job
+
+
+# ==================== DECODE (pool workers) ====================
+
+def _init_worker():
+    cv2.setNumThreads(1)  # parallelism comes from the pool
+
+
+def decode_job(job, max_frames, sampling, roi='off'):
+    """Pool worker: sample and preprocess a video's frames and read its transcripts"""
+    result = {'job': job, 'frames': None, 'transcripts': [], 'error': None}
+    try:
+        if 'transcripts' in job:
+            result['transcripts'] = [str(text) for text in job['transcripts'] if str(text).strip()]
+        else:
+            result['transcripts'] = read_transcripts(job.get('transcript_file'))
+        if job.get('video'):
+            frames = extract_frames_from_video(job['video'], max_frames=max_frames, strategy=sampling)
+            if not frames:
+                raise ValueError(f"no frames decoded from {job['video']}")
+            crop = make_cropper(roi)
+            result['frames'] = np.stack([preprocess_frame(crop(frame), IMG_SIZE) for frame in frames])
+    except Exception as e:
+        result['error'] = f'{type(e).__name__}: {e}'
+    return result
+
+
+# ==================== OUTPUT ====================
+
+class JsonlWriter:
+    """Appends one JSON line per interview, flushed as it is written"""
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def done_ids(self):
+        """Ids already scored without error; drops a partial last line left by an interrupted run"""
+        done = set()
+        if not os.path.exists(self.path):
+            return done
+        good_bytes = 0
+        with open(self.path, 'rb') as f:
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                good_bytes += len(line)
+                if record.get('error'):
+                    done.discard(record['id'])  # the latest record for an id wins
+                else:
+                    done.add(record['id'])
+        if good_bytes < os.path.getsize(self.path):
+            with open(self.path, 'r+b') as f:
+                f.truncate(good_bytes)
+        return done
+
+    def write(self, record):
+        if self._file is None:
+            self._file = open(self.path, 'a', encoding='utf-8')
+        self._file.write(json.dumps(record) + '\n')
+        self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+
+class ParquetWriter:
+    """Directory of part-NNNNN.parquet files, one per `rows_per_part` interviews (parts are never appended to)"""
+    def __init__(self, path, rows_per_part=500):
+        import pyarrow  # noqa: F401 - fail before any scoring if it is missing
+        self.path = path
+        self.rows_per_part = rows_per_part
+        self._rows = []
+        os.makedirs(path, exist_ok=True)
+
+    def _parts(self):
+        return sorted(glob.glob(os.path.join(self.path, 'part-*.parquet')))
+
+    def done_ids(self):
+        import pyarrow.parquet as pq
+        done = set()
+        for part in self._parts():
+            table = pq.read_table(part, columns=['id', 'error'])
+            for record_id, error in zip(table.column('id').to_pylist(), table.column('error').to_pylist()):
+                if error:
+                    done.discard(record_id)
+                else:
+                    done.add(record_id)
+        return done
+
+    def write(self, record):
+        row = dict(record)
+        row['questions'] = json.dumps(row['questions'])  # nested list kept as JSON text
+        self._rows.append(row)
+        if len(self._rows) >= self.rows_per_part:
+            self.flush()
+
+    def flush(self):
+        if not self._rows:
+            return
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        parts = self._parts()
+        index = int(os.path.basename(parts[-1])[5:10]) + 1 if parts else 0
+        path = os.path.join(self.path, f'part-{index:05d}.parquet')
+        pq.write_table(pa.Table.from_pylist(self._rows), path + '.tmp')
+        os.replace(path + '.tmp', path)  # atomic: an interrupted run never leaves half a part
+        self._rows = []
+
+    def close(self):
+        self.flush()
+
+
+# ==================== SCORING ====================
+
+class BatchScorer:
+    """Scores decoded interviews with app.py's models and weighting"""
+    def __init__(self, server, batch_size=64, text_threads=None):
+        self.server = server
+        self.batch_size = batch_size
+        self.backend = server.body_model.get()
+        server.vader_model.get()
+        server.roberta_model.get()
+        # analyze_voice_tone blocks on the RoBERTa batcher; concurrent callers are batched together
+        self.text_pool = ThreadPoolExecutor(max_workers=text_threads or server.ROBERTA_MAX_BATCH_SIZE,
+                                            thread_name_prefix='batch-text')
+
+    def predict_frames(self, frames):
+        """CNN sigmoid outputs for an (n, h, w, 3) uint8 RGB array, in batches"""
+        return np.concatenate([self.backend.predict(frames[i:i + self.batch_size])
+                               for i in range(0, len(frames), self.batch_size)])
+
+    def score_text(self, transcripts):
+        """Start voice tone analysis for an interview's answers; returns futures"""
+        return [self.text_pool.submit(self.server.analyze_voice_tone, text) for text in transcripts]
+
+    def score(self, decoded, text_futures):
+        """Replay the interview through the live session scoring and build its record"""
+        server = self.server
+        job = decoded['job']
+        state = {
+            'results': server.new_analysis_results('batch'),
+            'body_language_scores': server.RollingWindow(server.BODY_SCORE_WINDOW),
+            'voice_tone_scores': server.RollingWindow(server.VOICE_SCORE_WINDOW)
+        }
+        error = decoded['error']
+
+        frames = decoded['frames']
+        if frames is not None and self.backend is not None:
+            camera = server.VideoCamera(device=None)
+            label, confidence = None, 0.0
+            for prediction in self.predict_frames(frames):
+                label, confidence = camera.record_prediction(prediction)
+                state['body_language_scores'].push(camera.get_average_confidence())
+            state['results']['body_language'] = label.capitalize()
+            state['results']['body_confidence'] = float(round(confidence, 2))
+        elif frames is not None and error is None:
+            error = 'body language model unavailable'
+
+        questions = []
+        for future in text_futures:
+            analysis = future.result()
+            state['voice_tone_scores'].push(analysis['voice_tone_score'])
+            questions.append({
+                'voice_tone_score': analysis['voice_tone_score'],
+                'vader_compound': analysis['vader'].get('compound', 0.0),
+                'roberta_pos': analysis['roberta'].get('roberta_pos', 0.0)
+            })
+
+        server.calculate_combined_score(state)
+        results = state['results']
+        return {
+            'id': job['id'],
+            'video': job.get('video'),
+            'frames_scored': 0 if frames is None else int(len(frames)),
+            'questions_scored': len(questions),
+            'body_language': results['body_language'],
+            'body_confidence': results['body_confidence'],
+            'body_language_score': results['body_language_score'],
+            'voice_tone_score': results['voice_tone_score'],
+            'combined_score': results['combined_score'],
+            'overall_status': results['overall_status'],
+            'questions': questions,
+            'body_model': f'{server.BODY_MODEL_BACKEND}:{getattr(self.backend, "path", None)}',
+            'text_model': server.SENTIMENT_MODEL_VERSION,
+            'scored_at': datetime.now().isoformat(timespec='seconds'),
+            'error': error
+        }
+
+    def close(self):
+        self.text_pool.shutdown()
+
+
+def load_server():
+    """Import app.py for its models and scoring, loading models on first use"""
+    os.environ.setdefault('MODEL_LOADING', 'lazy')
+    os.environ.setdefault('SESSION_STORE', 'memory')
+    import app
+    return app
+
+
+def run(jobs, writer, workers=None, max_frames=100, sampling='uniform', batch_size=64, limit=None, roi='off'):
+    """Score every job not already in writer's output; returns (scored, failed, skipped)"""
+    done = writer.done_ids()
+    # Spawned workers: the pool must not inherit TensorFlow/torch runtime state through fork
+    workers = workers or os.cpu_count() or 1
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                               mp_context=multiprocessing.get_context('spawn'))
+    scorer = BatchScorer(load_server(), batch_size=batch_size)
+    max_in_flight = 4 * workers
+
+    scored = failed = skipped = 0
+    pending = set()
+    started = time.perf_counter()
+    jobs = iter(jobs)
+    exhausted = False
+    try:
+        while pending or not exhausted:
+            # Keep the pool fed without reading the whole input up front
+            while not exhausted and len(pending) < max_in_flight:
+                job = next(jobs, None)
+                if job is None or (limit is not None and scored + failed + len(pending) >= limit):
+                    exhausted = True
+                elif job['id'] in done:
+                    skipped += 1
+                else:
+                    pending.add(pool.submit(decode_job, job, max_frames, sampling, roi))
+            if not pending:
+                break
+
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                decoded = future.result()
+                record = scorer.score(decoded, scorer.score_text(decoded['transcripts']))
+                writer.write(record)
+                if record['error']:
+                    failed += 1
+                    print(f"❌ {record['id']}: {record['error']}")
+                else:
+                    scored += 1
+                total = scored + failed
+                if total % 50 == 0:
+                    rate = total / (time.perf_counter() - started)
+                    print(f" {total} scored ({rate:.1f}/s), {skipped} already done")
+    finally:
+        pool.shutdown(cancel_futures=True)
+        scorer.close()
+        writer.close()
+    return scored, failed, skipped
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Score recorded interviews offline')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--input', help='Directory of interview videos and transcript files')
+    source.add_argument('--manifest', help='JSONL manifest of interviews')
+    parser.add_argument('--output', required=True, help='JSONL file, or directory for --format parquet')
+    parser.add_argument('--format', choices=['jsonl', 'parquet'], default='jsonl')
+    parser.add_argument('--workers', type=int, default=None, help='Decode processes (default: all cores)')
+    parser.add_argument('--max-frames', type=int, default=100, help='Frames sampled per video')
+    parser.add_argument('--sampling', choices=STRATEGIES, default='uniform', help='Video frame sampling strategy')
+    parser.add_argument('--batch-size', type=int, default=64, help='Frames per CNN call')
+    parser.add_argument('--limit', type=int, default=None, help='Score at most this many interviews')
+    parser.add_argument('--roi', choices=ROI_MODES, default=os.environ.get('BODY_ROI', 'off'),
+                        help='Subject crop before the CNN, as the model was trained (default: BODY_ROI)')
+    args = parser.parse_args()
+
+    jobs = scan_directory(args.input) if args.input else scan_manifest(args.manifest)
+    writer = ParquetWriter(args.output) if args.format == 'parquet' else JsonlWriter(args.output)
+    started = time.perf_counter()
+    scored, failed, skipped = run(jobs, writer, workers=args.workers, max_frames=args.max_frames,
+                                  sampling=args.sampling, batch_size=args.batch_size, limit=args.limit,
+                                  roi=args.roi)
+    print(f"\n✓ {scored} interviews scored, {failed} failed, {skipped} already done "
+          f"in {time.perf_counter() - started:.1f}s -> {args.output}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
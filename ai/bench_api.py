@@ -0,0 +1,403 @@
+"""
+bench_api.py - Micro-benchmarks and load generator for the analysis API
+Measures the hot paths of app.py and end-to-end interview sessions, and
+writes a machine-readable baseline so a change can be compared with the
+previous run:
+
+    micro   analyze_voice_tone (cache miss / hit), get_roberta_scores,
+            VideoCamera.predict_confidence on synthetic frames
+    load    N concurrent sessions, each driving start, pushed frames,
+            transcript, question-response and status for every question,
+            then stop
+
+Usage:
+    python bench_api.py --stand-in --json baseline.json
+    python bench_api.py --stand-in --sessions 16 --questions 10 --compare baseline.json
+    python bench_api.py --url http://localhost:5001 --sessions 32   # load only, against a server
+
+--stand-in swaps the CNN, RoBERTa and VADER for tiny deterministic models
+(optionally with --stand-in-latency-ms of simulated compute per batch), so it
+runs offline on CI-class hardware. Without it the configured models are used
+(same environment variables as app.py). Timings are best compared between
+runs on the same machine.
+"""
+
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import threading
+import time
+import zlib
+from collections import defaultdict
+from urllib.parse import urlparse
+
+import cv2
+import numpy as np
+
+FRAME_SHAPE = (480, 640, 3)
+
+
+# ==================== STAND-IN MODELS ====================
+
+class StandInBodyBackend:
+    """Sigmoid of the mean pixel value; optional fixed latency per batch"""
+    name = 'stand-in'
+    path = 'stand-in'
+
+    def __init__(self, latency_ms=0.0):
+        self.latency = latency_ms / 1000.0
+
+    def predict(self, batch):
+        if self.latency:
+            time.sleep(self.latency)
+        means = batch.reshape(len(batch), -1).mean(axis=1) / 255.0
+        return 1.0 / (1.0 + np.exp(-(means - 0.5) * 8.0))
+
+
+class StandInTextBackend:
+    """Logits from a hash of each text; optional fixed latency per batch"""
+    name = 'stand-in'
+    path = 'stand-in'
+
+    def __init__(self, latency_ms=0.0):
+        self.latency = latency_ms / 1000.0
+
+    def predict_logits(self, texts, max_length=512):
+        if self.latency:
+            time.sleep(self.latency)
+        logits = np.empty((len(texts), 3), dtype=np.float32)
+        for i, text in enumerate(texts):
+            seed = zlib.crc32(text.encode('utf-8'))
+            logits[i] = [(seed >> shift & 0xff) / 64.0 for shift in (0, 8, 16)]
+        return logits
+
+
+class StandInVader:
+    """Compound score from a handful of words, in VADER's output shape"""
+    POSITIVE = {'great', 'good', 'love', 'enjoy', 'led', 'improved', 'confident', 'success'}
+    NEGATIVE = {'bad', 'failed', 'unsure', 'hate', 'problem', 'difficult', 'worried'}
+
+    def polarity_scores(self, text):
+        words = text.lower().split()
+        pos = sum(word.strip('.,!?') in self.POSITIVE for word in words)
+        neg = sum(word.strip('.,!?') in self.NEGATIVE for word in words)
+        total = max(1, len(words))
+        compound = max(-1.0, min(1.0, (pos - neg) / max(1, pos + neg))) if pos + neg else 0.0
+        return {'neg': neg / total, 'neu': 1 - (pos + neg) / total, 'pos': pos / total, 'compound': compound}
+
+
+def install_stand_ins(server, latency_ms=0.0):
+    """Point app.py's model loaders at the stand-ins (before any model is loaded)"""
+    from model_loader import LazyModel
+    server.load_body_backend = lambda *args, **kwargs: StandInBodyBackend(latency_ms)
+    server.load_text_backend = lambda *args, **kwargs: StandInTextBackend(latency_ms)
+    server.vader_model = server.MODEL_SLOTS[0] = LazyModel('vader', StandInVader)
+
+
+def load_server(stand_in=False, latency_ms=0.0):
+    """Import app.py with models loaded after the stand-ins (if any) are in place"""
+    # Lazy so nothing loads at import; models are loaded below, before timing starts
+    os.environ['MODEL_LOADING'] = 'lazy'
+    os.environ.setdefault('FRAME_SOURCE', 'client')
+    import app as server
+    if stand_in:
+        install_stand_ins(server, latency_ms)
+    for slot in server.MODEL_SLOTS:
+        slot.load()
+    return server
+
+
+# ==================== MEASUREMENT ====================
+
+def percentiles(latencies_ms):
+    if not latencies_ms:
+        return {'count': 0}
+    values = np.asarray(latencies_ms)
+    return {
+        'count': len(values),
+        'mean_ms': round(float(values.mean()), 3),
+        'p50_ms': round(float(np.percentile(values, 50)), 3),
+        'p95_ms': round(float(np.percentile(values, 95)), 3),
+        'p99_ms': round(float(np.percentile(values, 99)), 3),
+        'max_ms': round(float(values.max()), 3)
+    }
+
+
+def rss_mb():
+    """(current, peak) resident set size in MB"""
+    current = None
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    current = round(int(line.split()[1]) / 1024.0, 1)
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0  # KiB on Linux
+    return current, round(peak, 1)
+
+
+def time_calls(fn, args_list):
+    latencies = []
+    started = time.perf_counter()
+    for args in args_list:
+        t0 = time.perf_counter()
+        fn(*args)
+        latencies.append((time.perf_counter() - t0) * 1000.0)
+    elapsed = time.perf_counter() - started
+    return {**percentiles(latencies), 'throughput_per_s': round(len(args_list) / elapsed, 2)}
+
+
+def synthetic_frames(count, seed=0):
+    """Camera-sized frames: a blurred random background with a moving bright block"""
+    rng = np.random.default_rng(seed)
+    base = cv2.GaussianBlur(rng.integers(0, 255, FRAME_SHAPE, dtype=np.uint8), (21, 21), 0)
+    frames = []
+    for i in range(count):
+        frame = base.copy()
+        x = (i * 17) % (FRAME_SHAPE[1] - 120)
+        frame[180:300, x:x + 120] = 230
+        frames.append(frame)
+    return frames
+
+
+def synthetic_answers(count, seed=0):
+    rng = random.Random(seed)
+    openers = ['I led', 'We improved', 'I was unsure about', 'The team failed at', 'I really enjoy',
+               'It was difficult to handle', 'I am confident in', 'Honestly the problem was']
+    topics = ['the payment service migration', 'our on-call rotation', 'a tight product deadline',
+              'mentoring two junior engineers', 'the database schema redesign', 'a customer escalation']
+    return [f'{rng.choice(openers)} {rng.choice(topics)} and {rng.choice(topics)} (answer {i}).'
+            for i in range(count)]
+
+
+def run_micro(server, iterations):
+    answers = synthetic_answers(iterations, seed=1)
+    results = {}
+    results['analyze_voice_tone_miss'] = time_calls(server.analyze_voice_tone, [(a,) for a in answers])
+    results['analyze_voice_tone_hit'] = time_calls(server.analyze_voice_tone, [(a,) for a in answers])
+    results['get_roberta_scores'] = time_calls(server.get_roberta_scores,
+                                               [(a + ' (direct)',) for a in answers])
+
+    camera = server.VideoCamera(device=None)
+    frames = synthetic_frames(min(iterations, 64))
+    results['predict_confidence'] = time_calls(camera.predict_confidence,
+                                               [(frames[i % len(frames)],) for i in range(iterations)])
+    return results
+
+
+# ==================== LOAD GENERATOR ====================
+
+class InProcessClient:
+    """Flask test client with the same interface as HttpClient"""
+    def __init__(self, flask_app):
+        self._client = flask_app.test_client()
+
+    def request(self, method, path, body=None, content_type='application/json'):
+        kwargs = {}
+        if body is not None:
+            kwargs = {'json': body} if content_type == 'application/json' else \
+                {'data': body, 'content_type': content_type}
+        response = self._client.open(path, method=method, **kwargs)
+        return response.status_code
+
+
+class HttpClient:
+    """Keep-alive HTTP/1.1 connection to a running server"""
+    def __init__(self, url):
+        parsed = urlparse(url)
+        self._conn_args = (parsed.hostname, parsed.port or 80)
+        self._conn = http.client.HTTPConnection(*self._conn_args, timeout=60)
+
+    def request(self, method, path, body=None, content_type='application/json'):
+        headers = {}
+        if body is not None:
+            if content_type == 'application/json':
+                body = json.dumps(body).encode('utf-8')
+            headers['Content-Type'] = content_type
+        try:
+            self._conn.request(method, path, body=body, headers=headers)
+            response = self._conn.getresponse()
+            response.read()
+            return response.status
+        except (http.client.HTTPException, OSError):
+            self._conn.close()
+            self._conn = http.client.HTTPConnection(*self._conn_args, timeout=60)
+            return 599
+
+
+def run_session(client, index, questions, frames_per_question, jpeg_frames, answers, record):
+    """One simulated interview; record(endpoint, latency_ms, status) is called per request"""
+    session_id = f'bench-{index}-{os.getpid()}'
+
+    def call(endpoint, method, path, body=None, content_type='application/json'):
+        t0 = time.perf_counter()
+        status = client.request(method, path, body, content_type)
+        record(endpoint, (time.perf_counter() - t0) * 1000.0, status)
+        return status
+
+    call('start', 'POST', '/api/session/start', {'sessionId': session_id, 'frameSource': 'client'})
+    for q in range(questions):
+        for f in range(frames_per_question):
+            call('frames', 'POST', f'/api/frames/{session_id}', jpeg_frames[(q + f) % len(jpeg_frames)],
+                 'image/jpeg')
+        answer = answers[(index * questions + q) % len(answers)]
+        call('transcript', 'POST', '/api/analyze/transcript',
+             {'sessionId': session_id, 'questionId': q, 'transcript': answer})
+        call('question_response', 'POST', '/api/analyze/question-response',
+             {'sessionId': session_id, 'questionId': q, 'transcript': answer, 'responseScore': 70})
+        call('status', 'GET', f'/api/session/status?sessionId={session_id}')
+    call('stop', 'POST', '/api/session/stop', {'sessionId': session_id})
+
+
+def run_load(make_client, sessions, questions, frames_per_question, concurrency):
+    jpeg_frames = [cv2.imencode('.jpg', frame)[1].tobytes() for frame in synthetic_frames(8, seed=2)]
+    answers = synthetic_answers(max(64, sessions * questions), seed=3)
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    lock = threading.Lock()
+
+    def record(endpoint, latency_ms, status):
+        with lock:
+            latencies[endpoint].append(latency_ms)
+            if status >= 400:
+                errors[endpoint] += 1
+
+    next_session = iter(range(sessions))
+
+    def worker():
+        client = make_client()
+        while True:
+            with lock:
+                index = next(next_session, None)
+            if index is None:
+                return
+            run_session(client, index, questions, frames_per_question, jpeg_frames, answers, record)
+
+    threads = [threading.Thread(target=worker, name=f'bench-{i}') for i in range(min(concurrency, sessions))]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    total_requests = sum(len(values) for values in latencies.values())
+    return {
+        'sessions': sessions,
+        'concurrency': len(threads),
+        'seconds': round(elapsed, 3),
+        'requests': total_requests,
+        'requests_per_s': round(total_requests / elapsed, 2),
+        'sessions_per_s': round(sessions / elapsed, 3),
+        'errors': dict(errors),
+        'all': percentiles([v for values in latencies.values() for v in values]),
+        'endpoints': {endpoint: percentiles(values) for endpoint, values in sorted(latencies.items())}
+    }
+
+
+# ==================== REPORT ====================
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(current, baseline, path=''):
+    """Print relative changes of throughput and latency figures present in both reports"""
+    for key, value in current.items():
+        old = baseline.get(key) if isinstance(baseline, dict) else None
+        name = f'{path}.{key}' if path else key
+        if isinstance(value, dict):
+            compare(value, old or {}, name)
+        elif (key.endswith('_ms') or key.endswith('_per_s')) and isinstance(old, (int, float)) and old:
+            change = (value - old) / old * 100.0
+            better = change < 0 if key.endswith('_ms') else change > 0
+            flag = (' ' if abs(change) < 5 else '✓' if better else '❌')  # within 5% is noise
+            print(f" {flag} {name:<58} {old:>10} -> {value:>10} ({change:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the analysis API')
+    parser.add_argument('--stand-in', action='store_true', help='Use tiny deterministic stand-in models')
+    parser.add_argument('--stand-in-latency-ms', type=float, default=0.0,
+                        help='Simulated compute per stand-in model call')
+    parser.add_argument('--url', help='Load-test a running server instead of the in-process app')
+    parser.add_argument('--skip-micro', action='store_true')
+    parser.add_argument('--skip-load', action='store_true')
+    parser.add_argument('--iterations', type=int, default=200, help='Calls per micro-benchmark')
+    parser.add_argument('--sessions', type=int, default=8, help='Simulated interview sessions')
+    parser.add_argument('--concurrency', type=int, default=None, help='Sessions in flight (default: all)')
+    parser.add_argument('--questions', type=int, default=5, help='Questions per session')
+    parser.add_argument('--frames-per-question', type=int, default=5, help='Frames pushed before each answer')
+    parser.add_argument('--json', help='Write the report to this file')
+    parser.add_argument('--compare', help='Previous report to compare against')
+    args = parser.parse_args()
+
+    random.seed(0)
+    np.random.seed(0)
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'stand_in': args.stand_in,
+            'target': args.url or 'in-process',
+            'args': vars(args)
+        }
+    }
+
+    server = None
+    if not args.url:
+        server = load_server(args.stand_in, args.stand_in_latency_ms)
+
+    if server is not None and not args.skip_micro:
+        print(" Running micro-benchmarks...")
+        report['micro'] = run_micro(server, args.iterations)
+
+    if not args.skip_load:
+        print(f" Running {args.sessions} sessions x {args.questions} questions...")
+        make_client = (lambda: HttpClient(args.url)) if args.url else (lambda: InProcessClient(server.app))
+        report['load'] = run_load(make_client, args.sessions, args.questions, args.frames_per_question,
+                                  args.concurrency or args.sessions)
+
+    current, peak = rss_mb()
+    report['rss_mb'] = {'current': current, 'peak': peak}
+
+    for name, stats in report.get('micro', {}).items():
+        print(f"   {name:<26} p50 {stats['p50_ms']:>8.3f}ms  p95 {stats['p95_ms']:>8.3f}ms  "
+              f"p99 {stats['p99_ms']:>8.3f}ms  {stats['throughput_per_s']:>9.1f}/s")
+    if 'load' in report:
+        load = report['load']
+        print(f"\n   {load['requests']} requests in {load['seconds']}s ({load['requests_per_s']} req/s), "
+              f"errors: {load['errors'] or 'none'}")
+        for endpoint, stats in load['endpoints'].items():
+            print(f"   {endpoint:<18} p50 {stats['p50_ms']:>8.3f}ms  p95 {stats['p95_ms']:>8.3f}ms  "
+                  f"p99 {stats['p99_ms']:>8.3f}ms")
+    print(f"\n   RSS {current} MB (peak {peak} MB)")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"\n Compared with {args.compare} (commit {baseline.get('meta', {}).get('commit')}):")
+        compare({key: report[key] for key in ('micro', 'load') if key in report}, baseline)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✓ Report written to {args.json}")
+    return 1 if report.get('load', {}).get('errors') else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,144 @@
+"""
+bench_roi.py - Per-frame cost of the BODY_ROI subject crop against a budget
+Runs the frames the CNN would score through three preprocessing paths:
+    full      resize the whole frame (BODY_ROI=off)
+    detect    Haar face detection on every frame (what offline preprocessing does)
+    tracked   SubjectTracker: template tracking with periodic local re-detection
+and fails if the tracked path adds more than --budget-ms per frame on average.
+
+Frames come from --video, or from --images panned across a larger canvas to
+simulate a candidate moving (with a stretch where they leave the frame).
+--stride keeps every n-th frame, as the scheduler samples a 30 fps camera at
+BODY_ANALYSIS_FPS. Without input frames only the no-face (search) cost is
+measured.
+
+Usage:
+    python bench_roi.py --images headshot.jpg
+    python bench_roi.py --video interview.mp4 --frames 300 --budget-ms 2
+"""
+
+import argparse
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from body_roi import SubjectTracker, crop_subject, face_detector
+from frame_scheduler import preprocess_frame
+
+IMG_SIZE = (96, 96)
+
+
+def video_frames(path, count, stride):
+    capture = cv2.VideoCapture(path)
+    frames = []
+    index = 0
+    while len(frames) < count:
+        ok, frame = capture.read()
+        if not ok:
+            break
+        if index % stride == 0:
+            frames.append(frame)
+        index += 1
+    capture.release()
+    return frames
+
+
+def panned_frames(images, count, stride, size=(640, 480), absent=0.15):
+    """Each image centred on a larger canvas, with the 640x480 view swaying over it"""
+    width, height = size
+    frames = []
+    for n in range(count):
+        step = n * stride
+        image = images[(n * len(images)) // count]
+        canvas = np.full((height + 120, width + 240, 3), 90, dtype=np.uint8)
+        side = min(height, image.shape[0] * width // image.shape[1])
+        scaled = cv2.resize(image, (side * image.shape[1] // image.shape[0], side))
+        top = (canvas.shape[0] - scaled.shape[0]) // 2
+        left = (canvas.shape[1] - scaled.shape[1]) // 2
+        canvas[top:top + scaled.shape[0], left:left + scaled.shape[1]] = scaled
+        dx = 120 + int(80 * np.sin(step / 90.0))
+        dy = 60 + int(30 * np.sin(step / 140.0))
+        frame = canvas[dy:dy + height, dx:dx + width].copy()
+        if 0.6 * count <= n < (0.6 + absent) * count:
+            frame[:] = 90  # the candidate steps out of view
+        frames.append(frame)
+    return frames
+
+
+def run(mode, frames, redetect_every):
+    tracker = SubjectTracker(redetect_every=redetect_every)
+    times = []
+    cropped = 0
+    for frame in frames:
+        started = time.perf_counter()
+        if mode == 'full':
+            region = frame
+        elif mode == 'detect':
+            region = crop_subject(frame)
+        else:
+            region = tracker.crop(frame)
+        preprocess_frame(region, IMG_SIZE)
+        times.append((time.perf_counter() - started) * 1000.0)
+        cropped += region is not frame
+    times = np.array(times)
+    return {
+        'mode': mode,
+        'mean_ms': round(float(times.mean()), 3),
+        'p50_ms': round(float(np.percentile(times, 50)), 3),
+        'p95_ms': round(float(np.percentile(times, 95)), 3),
+        'max_ms': round(float(times.max()), 3),
+        'cropped': round(100.0 * cropped / len(frames), 1),
+        'counters': tracker.counters if mode == 'tracked' else None
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the subject crop in front of the body language CNN')
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument('--video', help='Video of a candidate')
+    source.add_argument('--images', nargs='+', help='Photos of a candidate, panned to simulate movement')
+    parser.add_argument('--frames', type=int, default=300, help='Frames scored')
+    parser.add_argument('--stride', type=int, default=6, help='Keep every n-th camera frame (30 fps -> 5 fps)')
+    parser.add_argument('--redetect-every', type=int, default=10)
+    parser.add_argument('--threads', type=int, default=1, help='OpenCV threads (the scheduler is one thread)')
+    parser.add_argument('--budget-ms', type=float, default=2.0, help='Allowed mean added cost per frame')
+    args = parser.parse_args()
+
+    cv2.setNumThreads(args.threads)
+    if face_detector() is None:
+        print("❌ This OpenCV build has no Haar face cascade (opencv-python 4.x ships one)")
+        return 1
+
+    if args.video:
+        frames = video_frames(args.video, args.frames, args.stride)
+    elif args.images:
+        images = [image for image in (cv2.imread(path) for path in args.images) if image is not None]
+        frames = panned_frames(images, args.frames, args.stride) if images else []
+    else:
+        print("⚠️ No --video or --images: measuring frames without a face (search cost only)")
+        rng = np.random.default_rng(0)
+        frames = [rng.integers(0, 255, (480, 640, 3), dtype=np.uint8) for _ in range(args.frames)]
+    if not frames:
+        print("❌ No frames decoded")
+        return 1
+
+    rows = [run(mode, frames, args.redetect_every) for mode in ('full', 'detect', 'tracked')]
+    print(f"\n {len(frames)} frames of {frames[0].shape[1]}x{frames[0].shape[0]}, stride {args.stride}")
+    print(f" {'mode':<8} {'mean ms':>8} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8} {'cropped %':>10}")
+    for row in rows:
+        print(f" {row['mode']:<8} {row['mean_ms']:>8} {row['p50_ms']:>8} {row['p95_ms']:>8} {row['max_ms']:>8}"
+              f" {row['cropped']:>10}")
+    print(f" tracker: {rows[2]['counters']}")
+
+    added = rows[2]['mean_ms'] - rows[0]['mean_ms']
+    if added > args.budget_ms:
+        print(f"\n❌ Tracked crop adds {added:.2f} ms per frame, over the {args.budget_ms} ms budget")
+        return 1
+    print(f"\n✓ Tracked crop adds {added:.2f} ms per frame (budget {args.budget_ms} ms)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,92 @@
+"""
+bench_streaming.py - MJPEG feed cost per frame as the number of viewers grows
+Compares the original per-viewer stream (copy, overlay and full-resolution
+imencode for every viewer) with the shared per-tier encoder in
+mjpeg_stream.py. Viewers are simulated in-process, so only the
+rendering/encoding cost is measured, not sockets.
+
+Usage:
+    python bench_streaming.py
+    python bench_streaming.py --viewers 1 10 50 --frames 120 --encoder opencv
+"""
+
+import argparse
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from mjpeg_stream import DEFAULT_TIERS, FeedEncoder, draw_overlay, load_jpeg_encoder, parse_tiers
+
+PREDICTION = ('confident', 87.5)
+
+
+def synthetic_frames(count, size=(640, 480)):
+    """Moving gradient with noise, so consecutive JPEGs differ"""
+    rng = np.random.default_rng(0)
+    x = np.linspace(0, 255, size[0], dtype=np.float32)
+    frames = []
+    for i in range(count):
+        base = np.roll(np.tile(x, (size[1], 1)), i * 4, axis=1)
+        noise = rng.integers(0, 24, (size[1], size[0]), dtype=np.uint8)
+        gray = (base.astype(np.uint8) + noise)
+        frames.append(cv2.merge([gray, np.flipud(gray), gray[:, ::-1]]))
+    return frames
+
+
+def per_viewer_part(frame):
+    """The original video_feed body, run once per viewer per frame"""
+    frame = frame.copy()
+    draw_overlay(frame, *PREDICTION)
+    ret, jpeg = cv2.imencode('.jpg', frame)
+    return b'--frame\r\nContent-Type: image/jpeg\r\n\r\n' + jpeg.tobytes() + b'\r\n'
+
+
+def run(mode, frames, viewers, tiers, encode):
+    feed = FeedEncoder(tiers, encode)
+    sent = 0
+    started_cpu = time.process_time()
+    started = time.perf_counter()
+    for seq, frame in enumerate(frames, start=1):
+        for viewer in range(viewers):
+            if mode == 'per-viewer':
+                part = per_viewer_part(frame)
+            else:
+                # Viewers spread over the tiers, as adaptive clients would be
+                part = feed.part(tiers[viewer % len(tiers)], seq, frame, PREDICTION)
+            sent += len(part)
+    elapsed = time.perf_counter() - started
+    cpu = time.process_time() - started_cpu
+    return {
+        'mode': mode,
+        'viewers': viewers,
+        'ms_per_frame': round(elapsed * 1000.0 / len(frames), 2),
+        'cpu_ms_per_frame': round(cpu * 1000.0 / len(frames), 2),
+        'kb_per_viewer_frame': round(sent / 1024.0 / len(frames) / viewers, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark MJPEG encoding cost per viewer count')
+    parser.add_argument('--viewers', type=int, nargs='*', default=[1, 5, 20, 50])
+    parser.add_argument('--frames', type=int, default=60)
+    parser.add_argument('--tiers', default=DEFAULT_TIERS)
+    parser.add_argument('--encoder', default='auto', choices=['auto', 'opencv', 'turbojpeg'])
+    args = parser.parse_args()
+
+    frames = synthetic_frames(args.frames)
+    tiers = parse_tiers(args.tiers)
+    encode = load_jpeg_encoder(args.encoder)
+
+    print(f"\n {'mode':<11} {'viewers':>7} {'ms/frame':>9} {'cpu ms/frame':>13} {'KB/viewer/frame':>16}")
+    for viewers in args.viewers:
+        for mode in ('per-viewer', 'shared'):
+            row = run(mode, frames, viewers, tiers, encode)
+            print(f" {row['mode']:<11} {row['viewers']:>7} {row['ms_per_frame']:>9} {row['cpu_ms_per_frame']:>13}"
+                  f" {row['kb_per_viewer_frame']:>16}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
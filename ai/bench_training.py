@@ -0,0 +1,149 @@
+"""
+bench_training.py - Steps/sec and peak memory of the CNN training input paths
+Each configuration trains build_cnn_model for a fixed number of epochs in its
+own process, so peak RSS is measured per configuration:
+
+    numpy       original path: all frames as one float32 array in memory
+    tfdata      dataset cache streamed through tf.data
+    augment     tf.data with on-the-fly augmentation
+    bf16 / fp16 tf.data with a mixed precision policy
+
+Usage:
+    python bench_training.py
+    python bench_training.py --data sorted_data --epochs 2
+    python bench_training.py --synthetic 8000 --configs numpy tfdata --json results.json
+
+Without --data a synthetic image dataset of --synthetic samples is generated
+in a temporary directory.
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+CONFIGS = {
+    'numpy': {'pipeline': 'numpy'},
+    'tfdata': {'pipeline': 'tfdata'},
+    'augment': {'pipeline': 'tfdata', 'augment': True},
+    'bf16': {'pipeline': 'tfdata', 'precision': 'mixed_bfloat16'},
+    'fp16': {'pipeline': 'tfdata', 'precision': 'mixed_float16'},
+}
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0  # KiB on Linux
+
+
+def write_synthetic_dataset(folder, samples, img_size=(160, 120)):
+    """Random JPEG frames split across the two classes"""
+    rng = np.random.default_rng(0)
+    for i in range(samples):
+        class_folder = os.path.join(folder, 'confident' if i % 2 else 'unconfident')
+        os.makedirs(class_folder, exist_ok=True)
+        img = rng.integers(0, 255, (img_size[1], img_size[0], 3), dtype=np.uint8)
+        cv2.imwrite(os.path.join(class_folder, f'{i:06d}.jpg'), img)
+    return folder
+
+
+def run_config(name, cache_dir, epochs, batch_size):
+    """Train once with the given configuration in this process; returns the measurements"""
+    import tensorflow as tf
+    from dataset_cache import CachedDataset
+    from train_model import build_cnn_model, set_precision
+
+    config = CONFIGS[name]
+    cache = CachedDataset(cache_dir)
+    indices = np.arange(len(cache))
+    labels = cache.labels
+    rss_before = peak_rss_mb()
+
+    if config['pipeline'] == 'numpy':
+        X = cache.gather(indices).astype('float32') / 255.0
+        fit_args = {'x': X, 'y': labels, 'batch_size': batch_size}
+    else:
+        set_precision(config.get('precision', 'float32'))
+        fit_args = {'x': cache.tf_dataset(indices, batch_size, shuffle=True, augment=config.get('augment', False))}
+
+    model = build_cnn_model(input_shape=(*cache.img_size[::-1], 3))
+    model.compile(optimizer=tf.keras.optimizers.Adam(learning_rate=0.001), loss='binary_crossentropy')
+
+    # One warm-up epoch (graph tracing, pipeline start-up) before timing
+    model.fit(epochs=1, verbose=0, **fit_args)
+    start = time.perf_counter()
+    model.fit(epochs=epochs, verbose=0, **fit_args)
+    elapsed = time.perf_counter() - start
+
+    steps = epochs * int(np.ceil(len(indices) / batch_size))
+    return {
+        'config': name,
+        'samples': len(indices),
+        'steps': steps,
+        'seconds': round(elapsed, 3),
+        'steps_per_sec': round(steps / elapsed, 2),
+        'samples_per_sec': round(epochs * len(indices) / elapsed, 1),
+        'rss_before_mb': round(rss_before, 1),
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark CNN training input pipelines')
+    parser.add_argument('--data', help='Dataset folder with confident/ and unconfident/ (default: synthetic)')
+    parser.add_argument('--synthetic', type=int, default=4000, help='Synthetic samples when --data is not given')
+    parser.add_argument('--cache', help='Dataset cache directory (default: a temporary one)')
+    parser.add_argument('--configs', nargs='*', choices=list(CONFIGS), default=['numpy', 'tfdata', 'augment', 'bf16'])
+    parser.add_argument('--epochs', type=int, default=1, help='Timed epochs after one warm-up epoch')
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--json', help='Also write the results to this file')
+    parser.add_argument('--run-one', choices=list(CONFIGS), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_one:
+        print(json.dumps(run_config(args.run_one, args.cache, args.epochs, args.batch_size)))
+        return 0
+
+    from dataset_cache import build_cache
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data = args.data
+        if not data:
+            print(f" Writing {args.synthetic} synthetic samples...")
+            data = write_synthetic_dataset(os.path.join(tmp, 'data'), args.synthetic)
+        cache_dir = args.cache or os.path.join(tmp, 'cache')
+        build_cache(data, cache_dir, show_progress=False)
+
+        results = []
+        for name in args.configs:
+            print(f" Running {name}...")
+            proc = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--run-one', name, '--cache', cache_dir,
+                 '--epochs', str(args.epochs), '--batch-size', str(args.batch_size)],
+                capture_output=True, text=True
+            )
+            lines = proc.stdout.strip().splitlines()
+            if proc.returncode != 0 or not lines:
+                print(f"❌ {name} failed:\n{proc.stderr[-2000:]}")
+                continue
+            results.append(json.loads(lines[-1]))
+
+    print(f"\n {'config':<8} {'steps/s':>8} {'samples/s':>10} {'peak RSS MB':>12}")
+    for row in results:
+        print(f" {row['config']:<8} {row['steps_per_sec']:>8} {row['samples_per_sec']:>10} {row['peak_rss_mb']:>12}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n✓ Results written to {args.json}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
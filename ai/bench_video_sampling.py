@@ -0,0 +1,146 @@
+"""
+bench_video_sampling.py - Time video frame sampling strategies on long recordings
+Compares the old sequential extract_frames_from_video (read every frame up to
+the last target, keeping every skip-th) with the seek-based strategies in
+video_frames.py, and checks that uniform sampling returns the same frames as
+the sequential read. They can differ only on a video whose container reports
+a wrong frame count: the old reader trusted it, video_frames.py checks it.
+
+Usage:
+    python bench_video_sampling.py
+    python bench_video_sampling.py --videos interviews/*.mp4 --max-frames 30
+    python bench_video_sampling.py --minutes 10 --json results.json
+
+Without --videos a synthetic recording (moving shapes, 640x480 @ 30 fps) is
+written to a temporary directory first.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from video_frames import STRATEGIES, extract_frames_from_video, frame_count, uniform_indices
+
+
+def sequential_extract(video_path, max_frames=30):
+    """The previous implementation (train_model.py before video_frames.py): read() every frame, keep every skip-th"""
+    cap = cv2.VideoCapture(video_path)
+    frames = []
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+
+    skip = max(1, total_frames // max_frames)
+    frame_count = 0
+
+    while cap.isOpened() and len(frames) < max_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+
+        if frame_count % skip == 0:
+            frames.append(frame)
+
+        frame_count += 1
+
+    cap.release()
+    return frames
+
+
+def write_synthetic_video(path, minutes, fps=30, size=(640, 480)):
+    """Interview-like test video: slow drift with a hard scene cut every 20 seconds"""
+    width, height = size
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, size)
+    if not writer.isOpened():
+        raise RuntimeError(f'Cannot write {path} (no mp4v encoder in this OpenCV build)')
+    rng = np.random.default_rng(0)
+    background = rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+    for i in range(int(minutes * 60 * fps)):
+        if i % (20 * fps) == 0:
+            background = rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+            background = cv2.GaussianBlur(background, (31, 31), 0)
+        frame = background.copy()
+        x = int(width / 2 + width / 4 * np.sin(i / fps))
+        cv2.circle(frame, (x, height // 2), 60, (40, 180, 220), -1)
+        cv2.putText(frame, str(i), (20, 40), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
+        writer.write(frame)
+    writer.release()
+    return path
+
+
+def time_call(fn, repeat):
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def uniform_matches_sequential(uniform, sequential):
+    """Largest mean absolute pixel difference between the two samplings (0 = identical)"""
+    if len(uniform) != len(sequential):
+        return None
+    return max((float(np.mean(cv2.absdiff(a, b))) for a, b in zip(uniform, sequential)), default=0.0)
+
+
+def bench_video(path, max_frames, repeat, strategies):
+    cap = cv2.VideoCapture(path)
+    reported = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    real = frame_count(cap)
+    cap.release()
+
+    row = {'video': os.path.basename(path), 'reported_frames': reported, 'frames': real, 'timings': {}}
+    seconds, baseline = time_call(lambda: sequential_extract(path, max_frames), repeat)
+    row['timings']['sequential'] = {'seconds': round(seconds, 4), 'frames': len(baseline)}
+    for strategy in strategies:
+        seconds, frames = time_call(lambda: extract_frames_from_video(path, max_frames, strategy), repeat)
+        row['timings'][strategy] = {'seconds': round(seconds, 4), 'frames': len(frames),
+                                    'speedup': round(row['timings']['sequential']['seconds'] / max(seconds, 1e-9), 1)}
+        if strategy == 'uniform':
+            row['uniform_max_pixel_diff'] = uniform_matches_sequential(frames, baseline)
+    row['expected_uniform_frames'] = len(uniform_indices(real, max_frames))
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark video frame sampling strategies')
+    parser.add_argument('--videos', nargs='*', help='Recordings to sample (default: a synthetic one)')
+    parser.add_argument('--minutes', type=float, default=3.0, help='Length of the synthetic recording')
+    parser.add_argument('--max-frames', type=int, default=30)
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per strategy (best time is kept)')
+    parser.add_argument('--strategies', nargs='*', choices=STRATEGIES, default=list(STRATEGIES))
+    parser.add_argument('--json', help='Also write the results to this file')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        videos = args.videos
+        if not videos:
+            print(f" Writing a {args.minutes:g} minute synthetic recording...")
+            videos = [write_synthetic_video(os.path.join(tmp, 'interview.mp4'), args.minutes)]
+
+        results = []
+        for path in videos:
+            row = bench_video(path, args.max_frames, args.repeat, args.strategies)
+            results.append(row)
+            print(f"\n {row['video']}: {row['frames']} frames (container reports {row['reported_frames']})")
+            for name, timing in row['timings'].items():
+                speedup = f"  {timing['speedup']}x" if 'speedup' in timing else ''
+                print(f"   {name:<11} {timing['seconds']:8.3f}s  {timing['frames']:3d} frames{speedup}")
+            diff = row.get('uniform_max_pixel_diff')
+            if diff is not None:
+                print(f"   {'✓' if diff < 1.0 else '❌'} uniform vs sequential max pixel diff: {diff:.3f}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n✓ Results written to {args.json}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,229 @@
+"""
+body_roi.py - Subject crop in front of the body language CNN
+The CNN sees 96x96 pixels; given the whole camera frame, most of them are
+background. With BODY_ROI=upper_body the face is found with OpenCV's Haar
+cascade on a small grayscale copy of the frame and the CNN gets a square
+head-and-shoulders crop around it instead.
+
+A full-frame detection costs 10-20 ms on one core, so SubjectTracker follows
+the face with template matching between detections, re-detects only in a
+window around it every `redetect_every` frames and smooths the box so the
+crop doesn't jitter. When the face is lost the last box is held for
+`hold_frames`, then the whole frame is used, as without a crop.
+
+Offline preprocessing (training, batch scoring) samples frames too far apart
+to track, so make_cropper() detects on every frame with the same geometry.
+"""
+
+import os
+import threading
+
+import cv2
+import numpy as np
+
+ROI_MODES = ('off', 'upper_body')
+
+_local = threading.local()
+_warned = False
+
+
+def load_face_detector(path=None):
+    """Haar frontal face cascade (OpenCV's bundled one by default), or None if unavailable"""
+    if not hasattr(cv2, 'CascadeClassifier'):  # OpenCV 5 moved the cascades to contrib
+        return None
+    if path is None:
+        if not hasattr(cv2, 'data'):
+            return None
+        path = os.path.join(cv2.data.haarcascades, 'haarcascade_frontalface_default.xml')
+    detector = cv2.CascadeClassifier(path)
+    return None if detector.empty() else detector
+
+
+def face_detector(path=None):
+    """This thread's detector for path (cascade classifiers must not be shared between threads)"""
+    global _warned
+    detectors = _local.__dict__.setdefault('detectors', {})
+    if path not in detectors:
+        detectors[path] = load_face_detector(path)
+        if detectors[path] is None and not _warned:
+            _warned = True
+            print("⚠️ No Haar face cascade available, the body language CNN gets whole frames")
+    return detectors[path]
+
+
+def small_gray(frame, width):
+    """(grayscale copy `width` pixels wide, scale factor from frame to copy)"""
+    height = frame.shape[0]
+    scale = width / float(frame.shape[1])
+    small = cv2.resize(frame, (width, max(1, int(round(height * scale)))), interpolation=cv2.INTER_AREA)
+    return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY), scale
+
+
+def detect_face(detector, gray, min_size, max_size=None, min_neighbors=4):
+    """Largest face (x, y, w, h) in gray, or None"""
+    faces = detector.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=min_neighbors,
+                                      minSize=(min_size, min_size),
+                                      maxSize=(max_size, max_size) if max_size else (0, 0))
+    if not len(faces):
+        return None
+    return tuple(int(v) for v in max(faces, key=lambda f: f[2] * f[3]))
+
+
+def subject_box(center_x, face_top, face_size, frame_shape, scale=3.5, lift=0.7):
+    """Square (left, top, side) head-and-shoulders box: scale face widths wide, starting lift above the face"""
+    height, width = frame_shape[:2]
+    side = int(min(round(face_size * scale), width, height))
+    left = int(round(center_x - side / 2.0))
+    top = int(round(face_top - lift * face_size))
+    return min(max(left, 0), width - side), min(max(top, 0), height - side), side
+
+
+def crop_box(frame, box):
+    left, top, side = box
+    return frame[top:top + side, left:left + side]
+
+
+class SubjectTracker:
+    """Per-camera face tracker producing a stable subject crop (one thread at a time)"""
+    def __init__(self, cascade_path=None, detect_width=160, redetect_every=10, search_every=15,
+                 hold_frames=15, smoothing=0.35, min_match=0.6, scale=3.5, lift=0.7):
+        self.cascade_path = cascade_path
+        self.detect_width = detect_width
+        self.redetect_every = redetect_every
+        self.search_every = search_every
+        self.hold_frames = hold_frames
+        self.smoothing = smoothing  # weight of the newest position in the box average
+        self.min_match = min_match
+        self.scale = scale
+        self.lift = lift
+        self.min_face = max(12, int(detect_width * 0.08))
+        self.counters = {'frames': 0, 'detections': 0, 'tracked': 0, 'searches': 0, 'held': 0, 'uncropped': 0}
+        self._face = None  # (x, y, w, h) in detection-image pixels
+        self._template = None
+        self._since_detect = 0
+        self._since_search = None  # None: search on the next frame
+        self._misses = 0
+        self._smoothed = None  # (center x, face top, face size) in frame pixels
+
+    def crop(self, frame):
+        """The subject crop of a BGR frame (a view), or the frame itself when no subject is found"""
+        box = self.locate(frame)
+        return frame if box is None else crop_box(frame, box)
+
+    def locate(self, frame):
+        """(left, top, side) of the subject crop in frame pixels, or None"""
+        self.counters['frames'] += 1
+        detector = face_detector(self.cascade_path)
+        if detector is None or (self._face is None and not self._search_due()):
+            self.counters['uncropped'] += 1
+            return None
+        gray, scale = small_gray(frame, self.detect_width)
+        face = self._update(detector, gray)
+        if face is None:
+            self._smoothed = None
+            self.counters['uncropped'] += 1
+            return None
+
+        x, y, w, h = (v / scale for v in face)
+        position = np.array([x + w / 2.0, y, w])
+        if self._smoothed is None or abs(position[0] - self._smoothed[0]) > self._smoothed[2]:
+            self._smoothed = position  # first sighting or a jump: don't slide across the frame
+        else:
+            self._smoothed = self.smoothing * position + (1.0 - self.smoothing) * self._smoothed
+        return subject_box(*self._smoothed, frame.shape, scale=self.scale, lift=self.lift)
+
+    def _search_due(self):
+        """While no face is known, a full-frame search runs only every search_every frames"""
+        if self._since_search is not None and self._since_search + 1 < self.search_every:
+            self._since_search += 1
+            return False
+        self._since_search = 0
+        return True
+
+    def _update(self, detector, gray):
+        if self._face is None:
+            self.counters['searches'] += 1
+            face = detect_face(detector, gray, self.min_face)
+            if face is not None:
+                self._acquire(gray, face)
+            return face
+
+        face = None
+        self._since_detect += 1
+        if self._since_detect >= self.redetect_every:
+            self._since_detect = 0
+            face = self._detect_near(detector, gray)
+            if face is not None:
+                self._acquire(gray, face)
+        if face is None:
+            face = self._match(gray)
+        if face is None:
+            self._misses += 1
+            if self._misses > self.hold_frames:
+                self._face = None
+                self._template = None
+                self._since_search = None
+                return None
+            self.counters['held'] += 1
+            return self._face
+        self._misses = 0
+        self._face = face
+        return face
+
+    def _acquire(self, gray, face):
+        x, y, w, h = face
+        self.counters['detections'] += 1
+        self._face = face
+        self._template = gray[y:y + h, x:x + w].copy()
+        self._since_detect = 0
+        self._misses = 0
+
+    def _window(self, gray, pad):
+        x, y, w, h = self._face
+        x0, y0 = max(0, x - pad), max(0, y - pad)
+        return gray[y0:y + h + pad, x0:x + w + pad], x0, y0
+
+    def _detect_near(self, detector, gray):
+        """Re-detect in a window around the current face, at similar sizes (a fraction of a full pass)"""
+        size = self._face[2]
+        window, x0, y0 = self._window(gray, size // 2 + 2)
+        face = detect_face(detector, window, max(self.min_face, int(size * 0.7)), int(size * 1.4) + 1,
+                           min_neighbors=3)
+        if face is None:
+            return None
+        return face[0] + x0, face[1] + y0, face[2], face[3]
+
+    def _match(self, gray):
+        """Follow the last detected face by normalised template matching around its position"""
+        h, w = self._template.shape
+        window, x0, y0 = self._window(gray, max(w, h) // 2 + 2)
+        if window.shape[0] < h or window.shape[1] < w:
+            return None
+        scores = cv2.matchTemplate(window, self._template, cv2.TM_CCOEFF_NORMED)
+        _, best, _, (x, y) = cv2.minMaxLoc(scores)
+        if best < self.min_match:
+            return None
+        self.counters['tracked'] += 1
+        return x + x0, y + y0, w, h
+
+
+def crop_subject(frame, cascade_path=None, detect_width=160, scale=3.5, lift=0.7):
+    """Subject crop of one independent frame (detection only, no tracking); the frame itself if none found"""
+    detector = face_detector(cascade_path)
+    if detector is None:
+        return frame
+    gray, factor = small_gray(frame, detect_width)
+    face = detect_face(detector, gray, max(12, int(detect_width * 0.08)))
+    if face is None:
+        return frame
+    x, y, w, h = (v / factor for v in face)
+    return crop_box(frame, subject_box(x + w / 2.0, y, w, frame.shape, scale=scale, lift=lift))
+
+
+def make_cropper(mode='off', cascade_path=None):
+    """frame -> frame for offline preprocessing in the given ROI mode"""
+    if mode not in ROI_MODES:
+        raise ValueError(f"Unknown BODY_ROI '{mode}' (expected one of {ROI_MODES})")
+    if mode == 'off':
+        return lambda frame: frame
+    return lambda frame: crop_subject(frame, cascade_path)
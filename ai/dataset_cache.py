@@ -0,0 +1,369 @@
+"""
+dataset_cache.py - Preprocessed, sharded training data cache for train_model.py
+Decodes every image and video once, in a process pool, into uint8 .npy shards
+that training memory-maps and streams through tf.data. A manifest keyed by
+file size/mtime and content hash means later runs only decode new or changed
+files.
+
+Usage:
+    python dataset_cache.py
+    python dataset_cache.py --data sorted_data --cache dataset_cache --workers 8
+
+Layout of the cache directory:
+    manifest.json       per-file entry: label, kind, sha256, mtime, shard, offset, count
+    shard-00000.npy     (rows, height, width, 3) uint8 RGB frames
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+from body_roi import ROI_MODES, make_cropper
+from video_frames import STRATEGIES, extract_frames_from_video
+
+MANIFEST_VERSION = 2  # 2: uniform video sampling back on the original skip-based frames
+IMAGE_EXTS = ['*.jpg', '*.jpeg', '*.png', '*.bmp', '*.JPG', '*.JPEG', '*.PNG']
+VIDEO_EXTS = ['*.mp4', '*.avi', '*.mov', '*.mkv', '*.MP4', '*.AVI', '*.MOV']
+LABEL_MAP = {'confident': 1, 'unconfident': 0}
+
+
+def to_model_input(frame, img_size):
+    """BGR frame -> resized RGB uint8, as the CNN is trained and served"""
+    return cv2.cvtColor(cv2.resize(frame, img_size), cv2.COLOR_BGR2RGB)
+
+
+def decode_media(path, kind, img_size=(96, 96), max_frames=30, sampling='uniform', roi='off'):
+    """Decode one image or video into a (n, height, width, 3) uint8 array (n = 0 on failure)
+
+    roi='upper_body' crops each frame to the subject first, as BODY_ROI does when serving.
+    """
+    if kind == 'image':
+        img = cv2.imread(path)
+        frames = [img] if img is not None else []
+    else:
+        frames = extract_frames_from_video(path, max_frames=max_frames, strategy=sampling)
+    if not frames:
+        return np.empty((0, img_size[1], img_size[0], 3), dtype=np.uint8)
+    crop = make_cropper(roi)
+    return np.stack([to_model_input(crop(frame), img_size) for frame in frames])
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def scan_media(data_folder):
+    """(relative path, absolute path, label, kind) for every image and video, sorted"""
+    found = []
+    for class_name, label in LABEL_MAP.items():
+        class_folder = os.path.join(data_folder, class_name)
+        if not os.path.exists(class_folder):
+            print(f" Warning: {class_folder} not found!")
+            continue
+        for kind, patterns in (('image', IMAGE_EXTS), ('video', VIDEO_EXTS)):
+            for pattern in patterns:
+                for path in glob.glob(os.path.join(class_folder, pattern)):
+                    found.append((os.path.relpath(path, data_folder), path, label, kind))
+    return sorted(set(found))
+
+
+def _init_worker():
+    cv2.setNumThreads(1)  # parallelism comes from the pool; avoid oversubscribing cores
+
+
+def _process_file(task):
+    """Pool worker: hash the file and decode it unless the hash matches the cached entry"""
+    rel, path, kind, known_sha, img_size, max_frames, sampling, roi = task
+    sha = file_sha256(path)
+    if sha == known_sha:
+        return rel, sha, None  # touched but unchanged
+    try:
+        frames = decode_media(path, kind, img_size, max_frames, sampling, roi)
+    except Exception as e:
+        print(f" Warning: failed to decode {rel}: {e}")
+        frames = None
+    return rel, sha, frames
+
+
+class ShardWriter:
+    """Appends frames to shard-NNNNN.npy files of up to shard_size rows"""
+    def __init__(self, cache_dir, first_index, shard_size):
+        self.cache_dir = cache_dir
+        self.index = first_index
+        self.shard_size = shard_size
+        self.written = []
+        self._buffer = []
+        self._rows = 0
+
+    @property
+    def name(self):
+        return f'shard-{self.index:05d}.npy'
+
+    def add(self, frames):
+        """Buffer frames; returns (shard name, offset) where they will be stored"""
+        if self._rows and self._rows + len(frames) > self.shard_size:
+            self.flush()
+        location = (self.name, self._rows)
+        self._buffer.append(frames)
+        self._rows += len(frames)
+        return location
+
+    def flush(self):
+        if not self._rows:
+            return
+        np.save(os.path.join(self.cache_dir, self.name), np.concatenate(self._buffer))
+        self.written.append((self.name, self._rows))
+        self.index += 1
+        self._buffer = []
+        self._rows = 0
+
+
+def load_manifest(cache_dir):
+    path = os.path.join(cache_dir, 'manifest.json')
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_manifest(cache_dir, manifest):
+    path = os.path.join(cache_dir, 'manifest.json')
+    with open(path + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(path + '.tmp', path)  # atomic: an interrupted run keeps the previous manifest
+
+
+def discard_cache(cache_dir, manifest):
+    """Delete a manifest and the shards it lists (manifest first, so no reader sees missing shards)"""
+    os.remove(os.path.join(cache_dir, 'manifest.json'))
+    for name in manifest['shards']:
+        path = os.path.join(cache_dir, name)
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def build_cache(data_folder='sorted_data', cache_dir='dataset_cache', img_size=(96, 96), max_frames=30,
+                sampling='uniform', workers=None, shard_size=2048, show_progress=True, roi='off'):
+    """Bring the cache up to date with data_folder; returns the manifest"""
+    os.makedirs(cache_dir, exist_ok=True)
+    manifest = load_manifest(cache_dir)
+    settings = {'version': MANIFEST_VERSION, 'img_size': list(img_size), 'max_frames': max_frames,
+                'sampling': sampling, 'roi': roi}
+    if manifest is not None:
+        manifest.setdefault('roi', 'off')  # caches built before subject cropping existed
+    if manifest is None or any(manifest.get(key) != value for key, value in settings.items()):
+        if manifest is not None:
+            print(" Preprocessing settings changed, rebuilding the cache")
+            discard_cache(cache_dir, manifest)
+        manifest = {**settings, 'files': {}, 'shards': {}}
+
+    old_files = manifest['files']
+    files = {}
+    tasks = []
+    for rel, path, label, kind in scan_media(data_folder):
+        stat = os.stat(path)
+        entry = old_files.get(rel)
+        if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+            files[rel] = entry
+            continue
+        files[rel] = {'label': label, 'kind': kind, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+        tasks.append((rel, path, kind, entry['sha256'] if entry else None, tuple(img_size), max_frames, sampling,
+                      roi))
+
+    print(f" Dataset cache: {len(files) - len(tasks)} files cached, {len(tasks)} to check, "
+          f"{len(set(old_files) - set(files))} removed")
+
+    next_index = 1 + max((int(name[6:11]) for name in manifest['shards']), default=-1)
+    writer = ShardWriter(cache_dir, next_index, shard_size)
+    if tasks:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            results = pool.map(_process_file, tasks, chunksize=4)
+            if show_progress:
+                try:
+                    from tqdm import tqdm
+                    results = tqdm(results, total=len(tasks), desc='decoding')
+                except ImportError:
+                    pass
+            for rel, sha, frames in results:
+                entry = files[rel]
+                entry['sha256'] = sha
+                if frames is None and old_files.get(rel, {}).get('sha256') == sha:
+                    # Same content, new mtime: keep the cached frames
+                    files[rel] = {**old_files[rel], 'size': entry['size'], 'mtime_ns': entry['mtime_ns']}
+                    continue
+                if frames is None or not len(frames):
+                    entry.update(shard=None, offset=0, count=0)  # recorded so it isn't retried until it changes
+                    continue
+                shard, offset = writer.add(frames)
+                entry.update(shard=shard, offset=offset, count=len(frames))
+    writer.flush()
+
+    shards = dict(manifest['shards'])
+    shards.update(dict(writer.written))
+    live = {entry['shard'] for entry in files.values() if entry.get('count')}
+    for name in set(shards) - live:
+        # Every file in this shard was changed or removed
+        path = os.path.join(cache_dir, name)
+        if os.path.exists(path):
+            os.remove(path)
+        del shards[name]
+
+    manifest['files'] = files
+    manifest['shards'] = shards
+    save_manifest(cache_dir, manifest)
+    return manifest
+
+
+class CachedDataset:
+    """Memory-mapped view of a built cache: one sample per cached frame"""
+    def __init__(self, cache_dir):
+        manifest = load_manifest(cache_dir)
+        if manifest is None:
+            raise FileNotFoundError(f"No dataset cache in '{cache_dir}' (run build_cache first)")
+        self.img_size = tuple(manifest['img_size'])
+        self.manifest = manifest
+        names = sorted(manifest['shards'])
+        self._shards = [np.load(os.path.join(cache_dir, name), mmap_mode='r') for name in names]
+        shard_ids = {name: i for i, name in enumerate(names)}
+
+        shard_of, row_of, labels = [], [], []
+        for rel in sorted(manifest['files']):
+            entry = manifest['files'][rel]
+            if not entry.get('count'):
+                continue
+            shard_of.append(np.full(entry['count'], shard_ids[entry['shard']], dtype=np.int32))
+            row_of.append(np.arange(entry['offset'], entry['offset'] + entry['count'], dtype=np.int64))
+            labels.append(np.full(entry['count'], entry['label'], dtype=np.int64))
+        self.shard_of = np.concatenate(shard_of) if shard_of else np.empty(0, dtype=np.int32)
+        self.row_of = np.concatenate(row_of) if row_of else np.empty(0, dtype=np.int64)
+        self.labels = np.concatenate(labels) if labels else np.empty(0, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.labels)
+
+    def gather(self, indices):
+        """uint8 frames for sample indices, reading only those rows from each shard"""
+        indices = np.asarray(indices)
+        width, height = self.img_size
+        out = np.empty((len(indices), height, width, 3), dtype=np.uint8)
+        shard_of = self.shard_of[indices]
+        for shard in np.unique(shard_of):
+            mask = shard_of == shard
+            rows = self.row_of[indices[mask]]
+            order = np.argsort(rows)  # sequential reads from the memory map
+            block = np.empty((len(rows), height, width, 3), dtype=np.uint8)
+            block[order] = self._shards[shard][rows[order]]
+            out[mask] = block
+        return out
+
+    def stats(self):
+        """Per-class counts in the same shape as train_model.load_dataset"""
+        stats = {name: {'images': 0, 'videos': 0, 'frames': 0, 'failed': 0} for name in LABEL_MAP}
+        names = {label: name for name, label in LABEL_MAP.items()}
+        for entry in self.manifest['files'].values():
+            s = stats[names[entry['label']]]
+            if not entry.get('count'):
+                s['failed'] += 1
+            elif entry['kind'] == 'image':
+                s['images'] += 1
+            else:
+                s['videos'] += 1
+                s['frames'] += entry['count']
+        return stats
+
+    def tf_dataset(self, indices, batch_size=32, shuffle=False, seed=42, augment=False, deterministic=True):
+        """tf.data pipeline over the given samples: batched memmap reads, normalised to [0, 1] on the fly
+
+        batch_size is the global batch (split across MirroredStrategy replicas).
+        With augment, every batch gets random flips, crops and colour jitter from
+        a seeded per-batch stream, so runs are reproducible and each epoch differs.
+        """
+        import tensorflow as tf
+
+        indices = np.asarray(indices, dtype=np.int64)
+        width, height = self.img_size
+        ds = tf.data.Dataset.from_tensor_slices((indices, self.labels[indices]))
+        if shuffle:
+            ds = ds.shuffle(len(indices), seed=seed, reshuffle_each_iteration=True)
+        ds = ds.batch(batch_size)
+
+        def load(batch_indices, batch_labels):
+            frames = tf.numpy_function(self.gather, [batch_indices], tf.uint8)
+            frames = tf.ensure_shape(frames, [None, height, width, 3])
+            return tf.cast(frames, tf.float32) / 255.0, batch_labels
+
+        ds = ds.map(load, num_parallel_calls=tf.data.AUTOTUNE, deterministic=deterministic)
+        if augment:
+            seeds = tf.data.Dataset.random(seed=seed, rerandomize_each_iteration=True)
+            ds = tf.data.Dataset.zip((ds, seeds)).map(
+                lambda batch, batch_seed: (augment_batch(batch[0], batch_seed), batch[1]),
+                num_parallel_calls=tf.data.AUTOTUNE, deterministic=deterministic)
+
+        options = tf.data.Options()
+        options.deterministic = deterministic
+        # Samples come from an in-memory index, not files: shard elements across workers/replicas
+        options.experimental_distribute.auto_shard_policy = tf.data.experimental.AutoShardPolicy.DATA
+        return ds.with_options(options).prefetch(tf.data.AUTOTUNE)
+
+
+def augment_batch(images, seed, max_zoom=0.15, max_brightness=0.1, contrast_range=(0.8, 1.2)):
+    """Per-image random horizontal flip, zoom crop, brightness and contrast for a [0, 1] float batch"""
+    import tensorflow as tf
+
+    n = tf.shape(images)[0]
+    size = tf.shape(images)[1:3]
+    seeds = tf.random.experimental.stateless_split(tf.stack([seed, 0]), 5)
+    uniform = lambda i, low, high: tf.random.stateless_uniform([n], seeds[i], low, high)
+
+    flip = uniform(0, 0.0, 1.0) < 0.5
+    images = tf.where(flip[:, None, None, None], tf.reverse(images, axis=[2]), images)
+
+    # Zoom: crop a random box covering (1 - zoom) of each side and resize back
+    scale = 1.0 - uniform(1, 0.0, max_zoom)
+    top = uniform(2, 0.0, 1.0) * (1.0 - scale)
+    left = uniform(3, 0.0, 1.0) * (1.0 - scale)
+    boxes = tf.stack([top, left, top + scale, left + scale], axis=1)
+    images = tf.image.crop_and_resize(images, boxes, tf.range(n), size)
+
+    jitter = tf.random.stateless_uniform([n, 2], seeds[4])
+    brightness = (jitter[:, 0] * 2.0 - 1.0) * max_brightness
+    contrast = contrast_range[0] + jitter[:, 1] * (contrast_range[1] - contrast_range[0])
+    mean = tf.reduce_mean(images, axis=[1, 2, 3], keepdims=True)
+    images = (images - mean) * contrast[:, None, None, None] + mean + brightness[:, None, None, None]
+    return tf.clip_by_value(images, 0.0, 1.0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build or update the preprocessed training data cache')
+    parser.add_argument('--data', default='sorted_data', help='Dataset folder with confident/ and unconfident/')
+    parser.add_argument('--cache', default='dataset_cache', help='Cache directory')
+    parser.add_argument('--workers', type=int, default=None, help='Decode processes (default: all cores)')
+    parser.add_argument('--shard-size', type=int, default=2048, help='Frames per shard file')
+    parser.add_argument('--max-frames', type=int, default=30, help='Frames sampled per video')
+    parser.add_argument('--sampling', choices=STRATEGIES, default='uniform', help='Video frame sampling strategy')
+    parser.add_argument('--roi', choices=ROI_MODES, default='off', help='Crop frames to the subject (see body_roi.py)')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.data):
+        print(f"\n Error: '{args.data}' folder not found!")
+        return 1
+    build_cache(args.data, args.cache, max_frames=args.max_frames, sampling=args.sampling,
+                workers=args.workers, shard_size=args.shard_size, roi=args.roi)
+    dataset = CachedDataset(args.cache)
+    print(f"✓ {len(dataset)} samples in {len(dataset.manifest['shards'])} shards -> {args.cache}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
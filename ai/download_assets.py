@@ -0,0 +1,65 @@
+"""
+download_assets.py - Vendor NLTK data and the Hugging Face RoBERTa model to local disk
+Run once at image build time so the server never downloads anything at runtime.
+
+Usage:
+    python download_assets.py
+    python download_assets.py --nltk-dir nltk_data --hf-dir hf_models
+
+Then run the server with NLTK_DATA_DIR=<nltk-dir>, ALLOW_ASSET_DOWNLOADS=false,
+HF_HUB_OFFLINE=1 and TEXT_MODEL_PATH=<hf-dir>/twitter-roberta-base-sentiment.
+"""
+
+import argparse
+import os
+import sys
+
+from model_backends import DEFAULT_TEXT_PATHS
+
+NLTK_PACKAGES = ['vader_lexicon', 'punkt']
+
+
+def download_nltk(target_dir):
+    import nltk
+
+    os.makedirs(target_dir, exist_ok=True)
+    ok = True
+    for package in NLTK_PACKAGES:
+        if nltk.download(package, download_dir=target_dir, quiet=True):
+            print(f"✓ NLTK {package} -> {target_dir}")
+        else:
+            print(f"❌ Failed to download NLTK {package}")
+            ok = False
+    return ok
+
+
+def download_hf_model(model_name, target_root):
+    from transformers import AutoTokenizer, AutoModelForSequenceClassification
+
+    target_dir = os.path.join(target_root, model_name.split('/')[-1])
+    try:
+        AutoTokenizer.from_pretrained(model_name).save_pretrained(target_dir)
+        AutoModelForSequenceClassification.from_pretrained(model_name).save_pretrained(target_dir)
+    except Exception as e:
+        print(f"❌ Failed to download {model_name}: {e}")
+        return False
+    print(f"✓ {model_name} -> {target_dir}")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Vendor model assets for offline start-up')
+    parser.add_argument('--nltk-dir', default='nltk_data')
+    parser.add_argument('--hf-dir', default='hf_models')
+    parser.add_argument('--text-model', default=DEFAULT_TEXT_PATHS['torch'])
+    parser.add_argument('--skip-hf', action='store_true', help='Only vendor NLTK data')
+    args = parser.parse_args()
+
+    ok = download_nltk(args.nltk_dir)
+    if not args.skip_hf:
+        ok = download_hf_model(args.text_model, args.hf_dir) and ok
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
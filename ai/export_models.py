@@ -0,0 +1,261 @@
+"""
+export_models.py - Export the analysis models to lighter CPU runtimes
+Produces TFLite (FP16/INT8) and ONNX builds of the body language CNN and ONNX
+(FP32 + dynamic INT8) builds of the RoBERTa sentiment model, then checks each
+export against the original model through the model_backends loaders.
+
+Usage:
+    python export_models.py
+    python export_models.py --only body --calibration-dir sorted_data
+    python export_models.py --only text --out exported
+
+Optional packages: tf2onnx (CNN -> ONNX), onnx + onnxruntime (ONNX exports
+and parity checks).
+"""
+
+import argparse
+import glob
+import inspect
+import os
+import sys
+
+import cv2
+import numpy as np
+from scipy.special import softmax
+
+from body_roi import ROI_MODES, make_cropper
+from model_backends import DEFAULT_TEXT_PATHS, load_body_backend, load_text_backend
+
+IMG_SIZE = (96, 96)
+
+PARITY_SENTENCES = [
+    "I led the migration of our payment service and cut latency in half.",
+    "Honestly I'm not sure, I haven't worked with that framework before.",
+    "I really enjoy collaborating with designers and getting feedback early.",
+    "That project failed and it was frustrating, but I learned a lot from it.",
+    "My biggest strength is staying calm when production is on fire.",
+    "Um, I think, maybe, I would probably try to ask someone for help?",
+    "I disagree with that approach because it doesn't scale past one region.",
+    "We shipped on time and the customer was thrilled with the result."
+]
+
+
+def load_calibration_frames(data_folder, img_size=IMG_SIZE, limit=200, roi='off'):
+    """RGB uint8 frames for INT8 calibration and parity checks (random if no data is available)"""
+    paths = []
+    for ext in ('*.jpg', '*.jpeg', '*.png', '*.bmp', '*.JPG', '*.JPEG', '*.PNG'):
+        paths.extend(glob.glob(os.path.join(data_folder, '*', ext)))
+    paths = sorted(paths)[:limit]
+
+    crop = make_cropper(roi)
+    frames = []
+    for path in paths:
+        img = cv2.imread(path)
+        if img is not None:
+            frames.append(cv2.cvtColor(cv2.resize(crop(img), img_size), cv2.COLOR_BGR2RGB))
+
+    if not frames:
+        print(f" Warning: no images under '{data_folder}', using random frames "
+              "(INT8 calibration will be poor; pass --calibration-dir)")
+        rng = np.random.default_rng(42)
+        return rng.integers(0, 256, size=(32, img_size[1], img_size[0], 3), dtype=np.uint8)
+
+    return np.stack(frames)
+
+
+def file_size_mb(path):
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path)) / 1e6
+    return os.path.getsize(path) / 1e6
+
+
+# ==================== BODY LANGUAGE CNN ====================
+
+def export_body_tflite(model, out_path, mode, calibration):
+    import tensorflow as tf
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if mode == 'fp16':
+        converter.target_spec.supported_types = [tf.float16]
+    else:
+        # Full-integer weights and activations; input/output stay float32 so
+        # the backend can feed the same normalised frames as the Keras model
+        def representative_dataset():
+            for frame in calibration:
+                yield [frame[np.newaxis].astype(np.float32) / 255.0]
+        converter.representative_dataset = representative_dataset
+
+    with open(out_path, 'wb') as f:
+        f.write(converter.convert())
+    print(f"  ✓ {out_path} ({file_size_mb(out_path):.2f} MB)")
+
+
+def export_body_onnx(model, out_path):
+    import tensorflow as tf
+    import tf2onnx
+
+    width, height = IMG_SIZE
+    spec = (tf.TensorSpec((None, height, width, 3), tf.float32, name='input'),)
+    # Trace a plain tf.function rather than using from_keras, which only supports Keras 2 models
+    forward = tf.function(lambda x: model(x, training=False), input_signature=spec)
+    tf2onnx.convert.from_function(forward, input_signature=spec, opset=13, output_path=out_path)
+    print(f"  ✓ {out_path} ({file_size_mb(out_path):.2f} MB)")
+
+
+def check_body_parity(reference, backend, frames, tolerance):
+    expected = reference.predict(frames)
+    actual = backend.predict(frames)
+    max_diff = float(np.max(np.abs(expected - actual)))
+    agreement = float(np.mean((expected > 0.5) == (actual > 0.5)))
+    ok = max_diff <= tolerance
+    print(f"    parity [{backend.name}] max |Δp| = {max_diff:.4f}, label agreement = {agreement*100:.1f}% "
+          f"{'✓' if ok else '❌'}")
+    return ok
+
+
+def export_body(args):
+    import tensorflow as tf
+
+    print(f"\n{'='*60}\nBody language CNN: {args.body_model}\n{'='*60}")
+    model = tf.keras.models.load_model(args.body_model)
+    reference = load_body_backend('keras', args.body_model, img_size=IMG_SIZE)
+    frames = load_calibration_frames(args.calibration_dir, roi=args.roi)
+    results = []
+
+    for mode in ('fp16', 'int8'):
+        out_path = os.path.join(args.out, f'body_{mode}.tflite')
+        try:
+            export_body_tflite(model, out_path, mode, frames)
+            tolerance = args.body_tolerance if mode == 'fp16' else args.body_tolerance_int8
+            results.append(check_body_parity(reference, load_body_backend('tflite', out_path), frames, tolerance))
+        except Exception as e:
+            print(f"  ❌ TFLite {mode} export failed: {e}")
+            results.append(False)
+
+    out_path = os.path.join(args.out, 'body.onnx')
+    try:
+        export_body_onnx(model, out_path)
+        results.append(check_body_parity(reference, load_body_backend('onnx', out_path), frames,
+                                         args.body_tolerance))
+    except ImportError as e:
+        print(f"  - Skipping ONNX export ({e}); pip install tf2onnx onnxruntime")
+    except Exception as e:
+        print(f"  ❌ ONNX export failed: {e}")
+        results.append(False)
+
+    return all(results)
+
+
+# ==================== ROBERTA SENTIMENT ====================
+
+def export_roberta_onnx(reference, out_dir):
+    import torch
+
+    class LogitsOnly(torch.nn.Module):
+        """Wrap the HF model so the exported graph has a single 'logits' output"""
+        def __init__(self, inner):
+            super().__init__()
+            self.inner = inner
+
+        def forward(self, input_ids, attention_mask):
+            return self.inner(input_ids=input_ids, attention_mask=attention_mask).logits
+
+    os.makedirs(out_dir, exist_ok=True)
+    out_path = os.path.join(out_dir, 'model.onnx')
+    encoded = reference.tokenizer(PARITY_SENTENCES[:2], return_tensors='pt', padding=True)
+
+    kwargs = {}
+    if 'dynamo' in inspect.signature(torch.onnx.export).parameters:
+        kwargs['dynamo'] = False  # TorchScript exporter handles the dynamic axes below
+    torch.onnx.export(
+        LogitsOnly(reference.model),
+        (encoded['input_ids'], encoded['attention_mask']),
+        out_path,
+        input_names=['input_ids', 'attention_mask'],
+        output_names=['logits'],
+        dynamic_axes={
+            'input_ids': {0: 'batch', 1: 'sequence'},
+            'attention_mask': {0: 'batch', 1: 'sequence'},
+            'logits': {0: 'batch'}
+        },
+        opset_version=14,
+        **kwargs
+    )
+    reference.tokenizer.save_pretrained(out_dir)
+    print(f"  ✓ {out_dir} ({file_size_mb(out_dir):.1f} MB)")
+
+
+def quantize_roberta_onnx(fp32_dir, int8_dir, tokenizer):
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    os.makedirs(int8_dir, exist_ok=True)
+    quantize_dynamic(os.path.join(fp32_dir, 'model.onnx'), os.path.join(int8_dir, 'model.onnx'),
+                     weight_type=QuantType.QInt8)
+    tokenizer.save_pretrained(int8_dir)
+    print(f"  ✓ {int8_dir} ({file_size_mb(int8_dir):.1f} MB)")
+
+
+def check_text_parity(reference, backend, tolerance):
+    expected = softmax(reference.predict_logits(PARITY_SENTENCES), axis=1)
+    actual = softmax(backend.predict_logits(PARITY_SENTENCES), axis=1)
+    max_diff = float(np.max(np.abs(expected - actual)))
+    agreement = float(np.mean(expected.argmax(axis=1) == actual.argmax(axis=1)))
+    ok = max_diff <= tolerance
+    print(f"    parity [{backend.path}] max |Δp| = {max_diff:.4f}, label agreement = {agreement*100:.1f}% "
+          f"{'✓' if ok else '❌'}")
+    return ok
+
+
+def export_text(args):
+    print(f"\n{'='*60}\nRoBERTa sentiment: {args.text_model}\n{'='*60}")
+    reference = load_text_backend('torch', args.text_model)
+    fp32_dir = os.path.join(args.out, 'roberta')
+    int8_dir = os.path.join(args.out, 'roberta_int8')
+    results = []
+
+    try:
+        export_roberta_onnx(reference, fp32_dir)
+        results.append(check_text_parity(reference, load_text_backend('onnx', fp32_dir), args.text_tolerance))
+        quantize_roberta_onnx(fp32_dir, int8_dir, reference.tokenizer)
+        results.append(check_text_parity(reference, load_text_backend('onnx', int8_dir),
+                                         args.text_tolerance_int8))
+    except ImportError as e:
+        print(f"  - Skipping ONNX export ({e}); pip install onnx onnxruntime")
+    except Exception as e:
+        print(f"  ❌ RoBERTa export failed: {e}")
+        results.append(False)
+
+    return all(results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export analysis models for TFLite / ONNX Runtime')
+    parser.add_argument('--only', choices=['body', 'text'], help='Export just one model')
+    parser.add_argument('--out', default='exported', help='Output directory')
+    parser.add_argument('--body-model', default='best_model.h5')
+    parser.add_argument('--text-model', default=DEFAULT_TEXT_PATHS['torch'])
+    parser.add_argument('--calibration-dir', default='sorted_data',
+                        help='Dataset folder (same layout as train_model.py) used for INT8 calibration')
+    parser.add_argument('--roi', choices=ROI_MODES, default='off', help='Subject crop the model was trained with')
+    parser.add_argument('--body-tolerance', type=float, default=0.02)
+    parser.add_argument('--body-tolerance-int8', type=float, default=0.1)
+    parser.add_argument('--text-tolerance', type=float, default=0.01)
+    parser.add_argument('--text-tolerance-int8', type=float, default=0.1)
+    args = parser.parse_args()
+
+    os.makedirs(args.out, exist_ok=True)
+    ok = True
+    if args.only in (None, 'body'):
+        ok = export_body(args) and ok
+    if args.only in (None, 'text'):
+        ok = export_text(args) and ok
+
+    print("\n" + "="*60)
+    print("EXPORT COMPLETE" if ok else "EXPORT FINISHED WITH PARITY FAILURES")
+    print("="*60)
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
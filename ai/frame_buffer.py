@@ -0,0 +1,81 @@
+"""
+frame_buffer.py - Latest-frame slot shared by a session's frame consumers
+One producer (the capture thread) writes, any number of readers (CNN
+scheduler, MJPEG streamers) read the newest frame independently
+"""
+
+import asyncio
+import threading
+import time
+
+
+def _wake(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class FrameBuffer:
+    """Single-slot buffer holding the most recent frame and its sequence number
+
+    Writes swap one tuple reference, so readers never take a lock to peek at
+    the latest frame; the condition is only used to wake blocked streamers.
+    """
+    def __init__(self):
+        self._latest = (0, None, 0.0)  # (seq, frame, captured_at)
+        self._cond = threading.Condition()
+        self._async_waiters = []  # (loop, future) parked by wait_async
+
+    def put(self, frame):
+        seq = self._latest[0] + 1  # single producer, so no lock needed for the counter
+        self._latest = (seq, frame, time.time())
+        with self._cond:
+            self._cond.notify_all()
+            waiters, self._async_waiters = self._async_waiters, []
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_wake, future)
+        return seq
+
+    def latest(self):
+        """Return (seq, frame); frame is None until the first put"""
+        seq, frame, _ = self._latest
+        return seq, frame
+
+    def wait_for(self, after_seq, timeout=1.0):
+        """Block until a frame newer than after_seq arrives; returns (seq, frame) or (after_seq, None)"""
+        seq, frame, _ = self._latest
+        if seq > after_seq:
+            return seq, frame
+        with self._cond:
+            self._cond.wait_for(lambda: self._latest[0] > after_seq, timeout)
+        seq, frame, _ = self._latest
+        if seq > after_seq:
+            return seq, frame
+        return after_seq, None
+
+    async def wait_async(self, after_seq, timeout=1.0):
+        """wait_for for asyncio streamers: parks a future on the event loop instead of a thread"""
+        seq, frame, _ = self._latest
+        if seq > after_seq:
+            return seq, frame
+        loop = asyncio.get_running_loop()
+        waiter = (loop, loop.create_future())
+        with self._cond:
+            if self._latest[0] <= after_seq:
+                self._async_waiters.append(waiter)
+            else:
+                waiter[1].set_result(None)
+        try:
+            await asyncio.wait_for(waiter[1], timeout)
+        except asyncio.TimeoutError:
+            with self._cond:
+                if waiter in self._async_waiters:
+                    self._async_waiters.remove(waiter)
+        seq, frame, _ = self._latest
+        if seq > after_seq:
+            return seq, frame
+        return after_seq, None
+
+    def age(self):
+        """Seconds since the last frame was written (None if never)"""
+        seq, _, captured_at = self._latest
+        return time.time() - captured_at if seq else None
@@ -0,0 +1,135 @@
+"""
+frame_ingest.py - Decode client-pushed frames into session frame buffers
+Used when the browser streams its own camera to the server (containerised
+deployments have no local webcam)
+"""
+
+import struct
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from metrics import count_error, timed
+
+RAW_FORMATS = {'bgr': 3, 'rgb': 3, 'rgba': 4}
+
+
+def decode_frame(payload, raw_format=None, width=None, height=None):
+    """Turn an encoded image (JPEG/WebP/PNG) or raw pixel bytes into a BGR uint8 frame
+
+    Bytes are wrapped with np.frombuffer, so nothing is copied before
+    cv2.imdecode (or the colour conversion for raw RGB/RGBA input).
+    """
+    buf = np.frombuffer(payload, dtype=np.uint8)
+
+    if raw_format is None:
+        return cv2.imdecode(buf, cv2.IMREAD_COLOR)
+
+    channels = RAW_FORMATS[raw_format]
+    if not width or not height or buf.size != width * height * channels:
+        return None
+    pixels = buf.reshape(height, width, channels)
+    if raw_format == 'rgb':
+        return cv2.cvtColor(pixels, cv2.COLOR_RGB2BGR)
+    if raw_format == 'rgba':
+        return cv2.cvtColor(pixels, cv2.COLOR_RGBA2BGR)
+    return pixels
+
+
+def iter_length_prefixed(stream, max_frame_bytes):
+    """Yield payloads from a chunked body of [4-byte big-endian length][frame bytes] records"""
+    while True:
+        header = stream.read(4)
+        if len(header) < 4:
+            return
+        (length,) = struct.unpack('>I', header)
+        if length == 0 or length > max_frame_bytes:
+            raise ValueError(f'invalid frame length {length}')
+        payload = stream.read(length)
+        if len(payload) < length:
+            return
+        yield payload
+
+
+def read_capped(stream, max_bytes, chunk_size=64 * 1024):
+    """Whole body of stream, or None once it exceeds max_bytes (chunked bodies have no Content-Length)"""
+    body = bytearray()
+    while True:
+        chunk = stream.read(min(chunk_size, max_bytes + 1 - len(body)))
+        if not chunk:
+            return bytes(body)
+        body += chunk
+        if len(body) > max_bytes:
+            return None
+
+
+class FrameIngestor:
+    """Decodes pushed frames on a small worker pool with latest-wins backpressure
+
+    Each session has at most one decode running and one payload waiting. A new
+    payload replaces the waiting one, so a slow server drops stale frames
+    instead of queueing them and building up latency.
+    """
+    def __init__(self, workers=2):
+        self._pool = ThreadPoolExecutor(max_workers=max(1, int(workers)),
+                                        thread_name_prefix='frame-decode')
+        self._lock = threading.Lock()
+        self._pending = {}  # session_id -> (sink, payload, raw_format, width, height)
+        self._busy = set()
+        self._decode_seconds = {}  # session_id -> decode CPU time, for per-session accounting
+        self.counters = {'received': 0, 'decoded': 0, 'dropped': 0, 'failed': 0}
+
+    def submit(self, session_id, sink, payload, raw_format=None, width=None, height=None):
+        """Queue a payload for decoding into sink (a FrameBuffer); returns True if it replaced a stale one"""
+        with self._lock:
+            self.counters['received'] += 1
+            self._decode_seconds.setdefault(session_id, 0.0)  # registered until forget()
+            replaced = session_id in self._pending
+            if replaced:
+                self.counters['dropped'] += 1
+            self._pending[session_id] = (sink, payload, raw_format, width, height)
+            if session_id in self._busy:
+                return replaced
+            self._busy.add(session_id)
+        self._pool.submit(self._drain, session_id)
+        return replaced
+
+    def stats(self):
+        with self._lock:
+            return {**self.counters, 'sessions_decoding': len(self._busy)}
+
+    def decode_seconds(self, session_id):
+        """CPU time spent decoding this session's frames"""
+        return self._decode_seconds.get(session_id, 0.0)
+
+    def forget(self, session_id):
+        """Drop a finished session's pending payload and accounting"""
+        with self._lock:
+            self._pending.pop(session_id, None)
+            self._decode_seconds.pop(session_id, None)
+
+    def _drain(self, session_id):
+        while True:
+            with self._lock:
+                item = self._pending.pop(session_id, None)
+                if item is None:
+                    self._busy.discard(session_id)
+                    return
+            sink, payload, raw_format, width, height = item
+            cpu_started = time.thread_time()
+            try:
+                with timed('frame_decode'):
+                    frame = decode_frame(payload, raw_format, width, height)
+            except Exception as e:
+                count_error('frame_decode')
+                print(f"Frame decode error: {e}")
+                frame = None
+            with self._lock:
+                self.counters['decoded' if frame is not None else 'failed'] += 1
+                if session_id in self._decode_seconds:  # not if forget() ran during the decode
+                    self._decode_seconds[session_id] += time.thread_time() - cpu_started
+            if frame is not None:
+                sink.put(frame)
@@ -0,0 +1,88 @@
+"""
+frame_sampler.py - Per-session analysis rate limiting and adaptive sampling
+Decides which captured frames are worth sending to the body language CNN
+"""
+
+import time
+from collections import deque
+
+import cv2
+
+THUMB_SIZE = (32, 24)
+FPS_WINDOW_SECONDS = 10.0
+
+
+class FrameSampler:
+    """Rate limiter with an optional motion-driven adaptive mode
+
+    Fixed mode samples at target_fps. Adaptive mode compares a tiny grayscale
+    thumbnail against the last analysed frame: unchanged scenes are skipped and
+    sampled at min_fps, motion raises sampling to max_fps.
+    """
+    def __init__(self, target_fps=5.0, adaptive=False, min_fps=1.0, max_fps=10.0,
+                 motion_threshold=4.0):
+        self.target_fps = max(0.1, float(target_fps))
+        self.adaptive = bool(adaptive)
+        self.min_fps = max(0.1, float(min_fps))
+        self.max_fps = max(self.min_fps, float(max_fps))
+        self.motion_threshold = float(motion_threshold)
+
+        self._interval = 1.0 / self.target_fps
+        self._next_due = 0.0
+        self._last_thumb = None
+        self._analyzed_at = deque()
+        self._first_sample_at = None
+        self.sampled = 0
+        self.analyzed = 0
+        self.skipped = 0
+
+    def wait_time(self, now=None):
+        """Seconds until the next frame should be sampled"""
+        now = time.monotonic() if now is None else now
+        return max(0.0, self._next_due - now)
+
+    def should_analyze(self, frame, now=None):
+        """Record a sampled frame and return True if it should be scored"""
+        now = time.monotonic() if now is None else now
+        self.sampled += 1
+        if self._first_sample_at is None:
+            self._first_sample_at = now
+
+        if self.adaptive:
+            thumb = cv2.resize(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), THUMB_SIZE,
+                               interpolation=cv2.INTER_AREA)
+            changed = (self._last_thumb is None or
+                       float(cv2.absdiff(thumb, self._last_thumb).mean()) >= self.motion_threshold)
+            if not changed:
+                self.skipped += 1
+                self._interval = 1.0 / self.min_fps
+                self._next_due = now + self._interval
+                return False
+            self._last_thumb = thumb
+            self._interval = 1.0 / self.max_fps
+
+        self._next_due = now + self._interval
+        self.analyzed += 1
+        self._analyzed_at.append(now)
+        while now - self._analyzed_at[0] > FPS_WINDOW_SECONDS:
+            self._analyzed_at.popleft()
+        return True
+
+    def effective_fps(self, now=None):
+        """Analysed frames per second over the last FPS_WINDOW_SECONDS"""
+        now = time.monotonic() if now is None else now
+        if self._first_sample_at is None:
+            return 0.0
+        span = min(FPS_WINDOW_SECONDS, now - self._first_sample_at)
+        recent = sum(1 for t in list(self._analyzed_at) if now - t <= FPS_WINDOW_SECONDS)
+        return recent / span if span > 0 else 0.0
+
+    def stats(self):
+        return {
+            'mode': 'adaptive' if self.adaptive else 'fixed',
+            'target_fps': self.max_fps if self.adaptive else self.target_fps,
+            'effective_fps': round(self.effective_fps(), 2),
+            'skip_ratio': round(self.skipped / self.sampled, 3) if self.sampled else 0.0,
+            'frames_sampled': self.sampled,
+            'frames_analyzed': self.analyzed
+        }
@@ -0,0 +1,111 @@
+"""
+frame_scheduler.py - Shared body language scoring across all active sessions
+One thread takes the latest frame from every session each tick, stacks them
+into a single NHWC batch and runs one backend call (see model_backends.py)
+"""
+
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from metrics import STAGE_SECONDS, count_error, timed
+
+
+def preprocess_frame(frame, img_size):
+    """Resize a BGR camera frame to the CNN input size and convert to RGB (uint8)"""
+    img = cv2.resize(frame, img_size)
+    return cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+
+
+class BodyLanguageScheduler:
+    """Batches frames from all sessions into one model call per tick
+
+    on_result(session, probability, seconds) gets each prediction along with
+    the session's share of the batch's wall time.
+    """
+    def __init__(self, backend, get_sessions, on_result, img_size=(96, 96),
+                 tick_ms=100.0, max_batch_size=32):
+        self.backend = backend
+        self.get_sessions = get_sessions
+        self.on_result = on_result
+        self.img_size = img_size
+        self.tick_seconds = max(0.0, float(tick_ms)) / 1000.0
+        self.max_batch_size = max(1, int(max_batch_size))
+
+        width, height = img_size
+        self._batch = np.empty((self.max_batch_size, height, width, 3), dtype=np.uint8)
+
+        self.ticks = 0
+        self.frames_scored = 0
+        self._cursor = 0  # rotates the start session so large fleets are served fairly
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='body-language-scheduler', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def stats(self):
+        return {
+            'tick_ms': self.tick_seconds * 1000.0,
+            'max_batch_size': self.max_batch_size,
+            'ticks': self.ticks,
+            'frames_scored': self.frames_scored,
+            'mean_batch_size': round(self.frames_scored / self.ticks, 2) if self.ticks else 0.0
+        }
+
+    def _run(self):
+        while not self._stop.is_set():
+            started = time.perf_counter()
+            try:
+                self.tick()
+            except Exception as e:
+                count_error('body_scheduler')
+                print(f"Body language scheduler error: {e}")
+            elapsed = time.perf_counter() - started
+            self._stop.wait(max(0.0, self.tick_seconds - elapsed))
+
+    def tick(self):
+        """Score the latest pending frame of every session in one batch"""
+        sessions = list(self.get_sessions())
+        if not sessions:
+            return
+        offset = self._cursor % len(sessions)
+        sessions = sessions[offset:] + sessions[:offset]
+
+        pending = []
+        started = time.perf_counter()
+        for session in sessions:
+            if len(pending) >= self.max_batch_size:
+                break
+            frame = session.take_latest_frame()
+            if frame is None:
+                continue
+            self._batch[len(pending)] = preprocess_frame(frame, self.img_size)
+            pending.append(session)
+
+        if not pending:
+            return
+        STAGE_SECONDS.labels(stage='cnn_preprocess').observe(time.perf_counter() - started)
+
+        with timed('cnn_predict'):
+            probabilities = self.backend.predict(self._batch[:len(pending)])
+        self.ticks += 1
+        self.frames_scored += len(pending)
+        self._cursor += len(pending)
+
+        # Each session is charged an equal share of the batch's preprocess + predict time
+        share = (time.perf_counter() - started) / len(pending)
+        for session, probability in zip(pending, probabilities):
+            self.on_result(session, float(probability), share)
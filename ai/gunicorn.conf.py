@@ -0,0 +1,35 @@
+"""
+gunicorn.conf.py - Multi-process serving for the analysis server
+Run with: gunicorn -c gunicorn.conf.py wsgi:app
+"""
+
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5001')}"
+# One worker until a multi-core comparison shows more help (see 'Comparing throughput' in DOCKER.md)
+workers = int(os.environ.get('WEB_CONCURRENCY', 1))
+worker_class = 'gthread'
+threads = int(os.environ.get('WORKER_THREADS', 8))
+preload_app = True  # load shareable weights once, before fork
+timeout = 120
+graceful_timeout = 30
+
+
+def pre_fork(server, worker):
+    """Give each worker a stable affinity index (reused when a worker is replaced)"""
+    used = {getattr(w, 'affinity_index', None) for w in server.WORKERS.values()}
+    worker.affinity_index = min(i for i in range(server.num_workers + 1) if i not in used)
+
+
+def post_fork(server, worker):
+    import app as analysis_app
+    import wsgi
+
+    # Split the machine's cores between workers unless INTRA_OP_THREADS is set
+    threads_per_worker = int(os.environ.get('INTRA_OP_THREADS', 0)) or \
+        max(1, multiprocessing.cpu_count() // server.num_workers)
+    analysis_app.configure_worker(threads_per_worker)
+    wsgi.app.start_worker(worker.affinity_index, server.num_workers)
+    server.log.info(f"Worker {worker.pid}: affinity index {worker.affinity_index}, "
+                    f"{threads_per_worker} intra-op threads")
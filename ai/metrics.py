@@ -0,0 +1,259 @@
+"""
+metrics.py - Lightweight in-process metrics for the analysis server
+Histograms, counters and gauges used to tune batching and queueing under
+load, plus a registry that renders them in the Prometheus text format for
+/metrics.
+
+Stage timings share one histogram labelled by stage:
+    with timed('vader'):
+        scores = sia.polarity_scores(text)
+"""
+
+import bisect
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Seconds; from sub-millisecond tokenisation up to multi-second model calls
+STAGE_SECONDS_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Fixed-bucket histogram (cumulative, Prometheus-style upper bounds)"""
+    def __init__(self, buckets):
+        self.buckets = sorted(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[idx] += 1
+            self.count += 1
+            self.sum += value
+
+    @contextmanager
+    def timer(self):
+        """Observe the wall time of the with-block in seconds"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+    def _read(self):
+        with self._lock:
+            return list(self.counts), self.count, self.sum
+
+    def snapshot(self):
+        """Return cumulative bucket counts plus count/sum/mean"""
+        counts, count, total = self._read()
+
+        cumulative = {}
+        running = 0
+        for bound, c in zip(self.buckets, counts):
+            running += c
+            cumulative[str(bound)] = running
+        cumulative['+Inf'] = count
+
+        return {
+            'buckets': cumulative,
+            'count': count,
+            'sum': round(total, 3),
+            'mean': round(total / count, 3) if count else 0.0
+        }
+
+    def samples(self, name, labels):
+        counts, count, total = self._read()
+        running = 0
+        for bound, c in zip(self.buckets, counts):
+            running += c
+            yield f'{name}_bucket', {**labels, 'le': _format_value(bound)}, running
+        yield f'{name}_bucket', {**labels, 'le': '+Inf'}, count
+        yield f'{name}_sum', labels, total
+        yield f'{name}_count', labels, count
+
+
+class Counter:
+    """Monotonic count"""
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def samples(self, name, labels):
+        yield name, labels, self.value
+
+
+class Gauge:
+    """Value that goes up and down; with fn, read from a callback when rendered"""
+    def __init__(self, fn=None):
+        self.value = 0.0
+        self.fn = fn
+
+    def set(self, value):
+        self.value = value
+
+    def get(self):
+        return self.fn() if self.fn is not None else self.value
+
+    def samples(self, name, labels):
+        yield name, labels, self.get()
+
+
+class RateMeter:
+    """Events per second over the last `window` seconds, bucketed by whole second"""
+    def __init__(self, window=10, clock=time.monotonic):
+        self.window = int(window)
+        self._clock = clock
+        self._seconds = deque()  # [second, count], oldest first
+        self.total = 0
+        self._lock = threading.Lock()
+
+    def mark(self, count=1):
+        second = int(self._clock())
+        with self._lock:
+            self.total += count
+            if self._seconds and self._seconds[-1][0] == second:
+                self._seconds[-1][1] += count
+            else:
+                self._seconds.append([second, count])
+                self._expire(second)
+
+    def _expire(self, now):
+        while self._seconds and self._seconds[0][0] <= now - self.window:
+            self._seconds.popleft()
+
+    def rate(self):
+        now = int(self._clock())
+        with self._lock:
+            self._expire(now)
+            # The current second is still filling, so it is left out
+            return sum(count for second, count in self._seconds if second < now) / self.window
+
+
+class MetricFamily:
+    """One metric name with HELP/TYPE and a child metric per label combination"""
+    def __init__(self, name, help_text, kind, label_names=(), factory=None):
+        self.name = name
+        self.help = help_text
+        self.kind = kind
+        self.label_names = tuple(label_names)
+        self._factory = factory
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, **labels):
+        key = tuple(str(labels[name]) for name in self.label_names)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._factory())
+        return child
+
+    def add(self, child, **labels):
+        """Attach an existing metric (e.g. a component's own Histogram)"""
+        key = tuple(str(labels[name]) for name in self.label_names)
+        with self._lock:
+            self._children[key] = child
+        return child
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+        with self._lock:
+            children = sorted(self._children.items())
+        for key, child in children:
+            labels = dict(zip(self.label_names, key))
+            try:
+                samples = list(child.samples(self.name, labels))
+            except Exception:
+                continue  # a failing gauge callback must not break the whole scrape
+            for name, sample_labels, value in samples:
+                lines.append(f'{name}{_format_labels(sample_labels)} {_format_value(value)}')
+        return lines
+
+
+class Registry:
+    """Named metric families, rendered together for /metrics"""
+    def __init__(self):
+        self._families = {}
+        self._lock = threading.Lock()
+
+    def _family(self, name, help_text, kind, labels, factory):
+        with self._lock:
+            family = self._families.get(name)
+            if family is None:
+                family = self._families[name] = MetricFamily(name, help_text, kind, labels, factory)
+            return family
+
+    def counter(self, name, help_text, labels=()):
+        return self._family(name, help_text, 'counter', labels, Counter)
+
+    def gauge(self, name, help_text, labels=()):
+        return self._family(name, help_text, 'gauge', labels, Gauge)
+
+    def histogram(self, name, help_text, buckets, labels=()):
+        return self._family(name, help_text, 'histogram', labels, lambda: Histogram(buckets))
+
+    def gauge_fn(self, name, help_text, fn, **labels):
+        """Gauge read from fn() at scrape time"""
+        family = self.gauge(name, help_text, labels=tuple(labels))
+        return family.add(Gauge(fn), **labels)
+
+    def counter_fn(self, name, help_text, fn, **labels):
+        """Counter read from fn() at scrape time, for components that keep their own counts"""
+        family = self.counter(name, help_text, labels=tuple(labels))
+        return family.add(Gauge(fn), **labels)
+
+    def render(self):
+        with self._lock:
+            families = sorted(self._families.values(), key=lambda family: family.name)
+        lines = []
+        for family in families:
+            lines.extend(family.render())
+        return '\n'.join(lines) + '\n'
+
+
+def _format_value(value):
+    if value is None:
+        return 'NaN'
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if isinstance(value, int):
+        return str(value)
+    if value != value:
+        return 'NaN'
+    if value in (float('inf'), float('-inf')):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(float(value))
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+               for value in labels.values())
+    return '{' + ','.join(f'{name}="{value}"' for name, value in zip(labels, escaped)) + '}'
+
+
+# ==================== SHARED INSTRUMENTS ====================
+
+REGISTRY = Registry()
+STAGE_SECONDS = REGISTRY.histogram('nextstep_stage_seconds', 'Wall time of each analysis stage',
+                                   STAGE_SECONDS_BUCKETS, labels=('stage',))
+ERRORS = REGISTRY.counter('nextstep_errors_total', 'Errors caught and logged, by stage', labels=('stage',))
+
+
+def timed(stage):
+    """Context manager timing one analysis stage into STAGE_SECONDS"""
+    return STAGE_SECONDS.labels(stage=stage).timer()
+
+
+def count_error(stage):
+    ERRORS.labels(stage=stage).inc()
@@ -0,0 +1,191 @@
+"""
+mjpeg_stream.py - Shared-encode, tiered MJPEG feed for session viewers
+Each frame is resized, overlaid and JPEG-encoded at most once per tier, then
+the same bytes go to every viewer on that tier, so streaming cost grows with
+frames x tiers in use instead of frames x viewers.
+
+Tiers are (name, max width, JPEG quality, max fps), best first:
+    STREAM_TIERS=high:640:80:15,medium:480:65:10,low:320:50:5
+
+Each viewer starts on the requested (or best) tier and drops a tier when its
+socket backs up (a chunk takes longer to write than the frame budget allows),
+then climbs back after a run of fast writes.
+"""
+
+import threading
+import time
+from collections import namedtuple
+
+import cv2
+
+from metrics import REGISTRY, timed
+
+StreamTier = namedtuple('StreamTier', 'name max_width quality fps')
+
+DEFAULT_TIERS = 'high:640:80:15,medium:480:65:10,low:320:50:5'
+BOUNDARY = b'frame'
+MIMETYPE = 'multipart/x-mixed-replace; boundary=frame'
+
+ENCODES = REGISTRY.counter('nextstep_feed_encodes_total', 'MJPEG frames encoded, by tier', labels=('tier',))
+SHARED = REGISTRY.counter('nextstep_feed_shared_total', 'MJPEG frames sent from an already encoded part, by tier',
+                          labels=('tier',))
+TIER_CHANGES = REGISTRY.counter('nextstep_feed_tier_changes_total', 'Viewer tier switches', labels=('direction',))
+
+
+def parse_tiers(spec):
+    """'high:640:80:15,low:320:50:5' -> [StreamTier, ...] ordered as given (best first)"""
+    tiers = []
+    for item in spec.split(','):
+        if not item.strip():
+            continue
+        name, width, quality, fps = item.strip().split(':')
+        tiers.append(StreamTier(name, int(width), int(quality), float(fps)))
+    if not tiers:
+        raise ValueError('STREAM_TIERS needs at least one tier')
+    return tiers
+
+
+def load_jpeg_encoder(kind='auto'):
+    """encode(bgr_frame, quality) -> JPEG bytes
+
+    'turbojpeg' uses PyTurboJPEG (libjpeg-turbo's TurboJPEG API with fast DCT);
+    'auto' uses it when installed and OpenCV otherwise. OpenCV's wheels are
+    themselves built against libjpeg-turbo, so the gap is the per-call overhead.
+    """
+    if kind in ('auto', 'turbojpeg'):
+        try:
+            from turbojpeg import TurboJPEG, TJFLAG_FASTDCT
+            jpeg = TurboJPEG()
+            return lambda frame, quality: jpeg.encode(frame, quality=quality, flags=TJFLAG_FASTDCT)
+        except (ImportError, RuntimeError, OSError):
+            if kind == 'turbojpeg':
+                raise
+    if kind not in ('auto', 'turbojpeg', 'opencv'):
+        raise ValueError(f"Unknown STREAM_JPEG_ENCODER '{kind}' (expected auto, opencv or turbojpeg)")
+    return lambda frame, quality: cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])[1].tobytes()
+
+
+def draw_overlay(frame, prediction, confidence):
+    """Latest scheduler result in the top-left corner, scaled to the frame width"""
+    scale = min(1.0, frame.shape[1] / 640.0)
+    color = (0, 255, 0) if prediction == 'confident' else (0, 165, 255)
+    cv2.rectangle(frame, (int(10 * scale), int(10 * scale)), (int(400 * scale), int(80 * scale)), (0, 0, 0), -1)
+    cv2.putText(frame, f'Body Language: {prediction.upper()}',
+                (int(20 * scale), int(40 * scale)), cv2.FONT_HERSHEY_SIMPLEX, 0.8 * scale, color, 2)
+    cv2.putText(frame, f'Confidence: {confidence:.1f}%',
+                (int(20 * scale), int(65 * scale)), cv2.FONT_HERSHEY_SIMPLEX, 0.6 * scale, (255, 255, 255), 2)
+
+
+class FeedEncoder:
+    """Per-session cache of the newest encoded multipart chunk for each tier"""
+    def __init__(self, tiers, encode):
+        self.tiers = list(tiers)
+        self._encode = encode
+        self._parts = {tier.name: (0, None) for tier in self.tiers}  # name -> (seq, part bytes)
+        self._locks = {tier.name: threading.Lock() for tier in self.tiers}
+
+    def cached(self, tier, seq):
+        """The chunk for frame `seq` (or newer) on `tier` if a viewer already encoded it, else None"""
+        cached_seq, part = self._parts[tier.name]
+        if cached_seq >= seq:
+            SHARED.labels(tier=tier.name).inc()
+            return part
+        return None
+
+    def part(self, tier, seq, frame, prediction=(None, 0.0)):
+        """Multipart chunk for frame `seq` on `tier`, encoding it only if no viewer has yet"""
+        part = self.cached(tier, seq)
+        if part is not None:
+            return part
+        with self._locks[tier.name]:
+            cached_seq, part = self._parts[tier.name]
+            if cached_seq >= seq:  # another viewer encoded it while we waited
+                SHARED.labels(tier=tier.name).inc()
+                return part
+            part = self._render(tier, frame, prediction)
+            self._parts[tier.name] = (seq, part)
+        ENCODES.labels(tier=tier.name).inc()
+        return part
+
+    def nbytes(self):
+        """Bytes held by the cached parts"""
+        return sum(len(part) for _, part in self._parts.values() if part is not None)
+
+    def _render(self, tier, frame, prediction):
+        height, width = frame.shape[:2]
+        if width > tier.max_width:
+            frame = cv2.resize(frame, (tier.max_width, round(height * tier.max_width / width)),
+                               interpolation=cv2.INTER_AREA)
+        else:
+            # Draw on a copy: the buffered frame is shared with the scheduler and other viewers
+            frame = frame.copy()
+
+        label, confidence = prediction
+        if label is not None:
+            with timed('stream_overlay'):
+                draw_overlay(frame, label, confidence)
+
+        with timed('jpeg_encode'):
+            jpeg = self._encode(frame, tier.quality)
+        return b'--' + BOUNDARY + b'\r\nContent-Type: image/jpeg\r\n\r\n' + jpeg + b'\r\n'
+
+
+class FeedClient:
+    """One viewer's tier and pacing
+
+    A write slower than `backlog_fraction` of the tier's frame interval means
+    the client's socket is full; `downgrade_after` of those in a row drop a
+    tier, `upgrade_after` fast writes in a row climb one (never above the
+    tier the client asked for).
+    """
+    def __init__(self, tiers, start=0, adaptive=True, backlog_fraction=0.5, downgrade_after=2, upgrade_after=50,
+                 clock=time.monotonic):
+        self.tiers = tiers
+        self.ceiling = start
+        self.level = start
+        self.adaptive = adaptive
+        self.backlog_fraction = backlog_fraction
+        self.downgrade_after = downgrade_after
+        self.upgrade_after = upgrade_after
+        self._clock = clock
+        self._slow = 0
+        self._fast = 0
+        self._last_sent = None
+
+    @property
+    def tier(self):
+        return self.tiers[self.level]
+
+    def wait_time(self):
+        """Seconds until the tier's fps allows the next frame"""
+        if self._last_sent is None:
+            return 0.0
+        return max(0.0, self._last_sent + 1.0 / self.tier.fps - self._clock())
+
+    def sent(self, write_seconds):
+        """Record how long the last chunk took to write and adapt the tier"""
+        self._last_sent = self._clock() - write_seconds  # pace from the start of the write
+        if not self.adaptive:
+            return
+        if write_seconds > self.backlog_fraction / self.tier.fps:
+            self._fast = 0
+            self._slow += 1
+            if self._slow >= self.downgrade_after and self.level < len(self.tiers) - 1:
+                self.level += 1
+                self._slow = 0
+                TIER_CHANGES.labels(direction='down').inc()
+        else:
+            self._slow = 0
+            self._fast += 1
+            if self._fast >= self.upgrade_after and self.level > self.ceiling:
+                self.level -= 1
+                self._fast = 0
+                TIER_CHANGES.labels(direction='up').inc()
+
+
+def tier_index(tiers, name):
+    """Index of the tier called `name`, or 0 (best) for None/unknown names"""
+    for i, tier in enumerate(tiers):
+        if tier.name == name:
+            return i
+    return 0
@@ -0,0 +1,202 @@
+"""
+model_backends.py - Pluggable inference backends for the analysis models
+Body language CNN: Keras (.h5), TFLite (FP16/INT8) or ONNX Runtime
+RoBERTa sentiment: PyTorch (Transformers) or ONNX Runtime (FP32/INT8)
+
+Framework imports happen inside each backend so a server only loads the
+runtime it is configured to use. Exports are produced by export_models.py.
+"""
+
+import os
+import threading
+
+import numpy as np
+
+from metrics import timed
+
+DEFAULT_BODY_PATHS = {
+    'keras': 'best_model.h5',
+    'tflite': 'exported/body_fp16.tflite',
+    'onnx': 'exported/body.onnx'
+}
+DEFAULT_TEXT_PATHS = {
+    'torch': 'cardiffnlp/twitter-roberta-base-sentiment',
+    'onnx': 'exported/roberta_int8'
+}
+
+
+# ==================== BODY LANGUAGE CNN ====================
+
+class KerasBodyBackend:
+    """Original .h5 model through TensorFlow, compiled once with a dynamic batch dimension"""
+    name = 'keras'
+
+    def __init__(self, path, img_size=(96, 96), num_threads=None):
+        import tensorflow as tf
+        if num_threads:
+            # Must happen before TensorFlow initialises its runtime
+            tf.config.threading.set_intra_op_parallelism_threads(num_threads)
+        self.path = path
+        self.model = tf.keras.models.load_model(path)
+        width, height = img_size
+        self._tf = tf
+        self._infer = tf.function(
+            self._forward,
+            input_signature=[tf.TensorSpec([None, height, width, 3], tf.uint8)]
+        )
+
+    def _forward(self, x):
+        # Normalisation happens inside the graph so the host only ships uint8
+        x = self._tf.cast(x, self._tf.float32) / 255.0
+        return self.model(x, training=False)
+
+    def predict(self, batch):
+        """uint8 RGB NHWC batch -> (N,) confident probabilities"""
+        return self._infer(batch).numpy().reshape(-1)
+
+
+class TFLiteBodyBackend:
+    """TFLite export (FP16 or INT8); uses tflite_runtime when installed, else TensorFlow's interpreter"""
+    name = 'tflite'
+
+    def __init__(self, path, num_threads=None):
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            import tensorflow as tf
+            Interpreter = tf.lite.Interpreter
+        self.path = path
+        self.interpreter = Interpreter(model_path=path, num_threads=num_threads)
+        self.interpreter.allocate_tensors()
+        self._input = self.interpreter.get_input_details()[0]
+        self._output = self.interpreter.get_output_details()[0]
+        self._batch_size = int(self._input['shape'][0])
+        self._lock = threading.Lock()  # interpreters are not thread-safe
+
+    def predict(self, batch):
+        x = batch.astype(np.float32) / 255.0
+        dtype = self._input['dtype']
+        if dtype != np.float32:
+            scale, zero_point = self._input['quantization']
+            x = np.clip(np.round(x / scale + zero_point), np.iinfo(dtype).min, np.iinfo(dtype).max).astype(dtype)
+
+        with self._lock:
+            if len(x) != self._batch_size:
+                self.interpreter.resize_tensor_input(self._input['index'], [len(x), *x.shape[1:]])
+                self.interpreter.allocate_tensors()
+                self._input = self.interpreter.get_input_details()[0]
+                self._output = self.interpreter.get_output_details()[0]
+                self._batch_size = len(x)
+            self.interpreter.set_tensor(self._input['index'], x)
+            self.interpreter.invoke()
+            out = self.interpreter.get_tensor(self._output['index'])
+
+        if self._output['dtype'] != np.float32:
+            scale, zero_point = self._output['quantization']
+            out = (out.astype(np.float32) - zero_point) * scale
+        return out.reshape(-1)
+
+
+class OnnxBodyBackend:
+    """ONNX Runtime export of the CNN (float input in NHWC, as produced by tf2onnx)"""
+    name = 'onnx'
+
+    def __init__(self, path, num_threads=None):
+        import onnxruntime as ort
+        options = ort.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.path = path
+        self.session = ort.InferenceSession(path, options, providers=['CPUExecutionProvider'])
+        self._input_name = self.session.get_inputs()[0].name
+
+    def predict(self, batch):
+        x = batch.astype(np.float32) / 255.0
+        return self.session.run(None, {self._input_name: x})[0].reshape(-1)
+
+
+BODY_BACKENDS = {
+    'keras': KerasBodyBackend,
+    'tflite': TFLiteBodyBackend,
+    'onnx': OnnxBodyBackend
+}
+
+
+def load_body_backend(kind='keras', path=None, img_size=(96, 96), num_threads=None):
+    if kind not in BODY_BACKENDS:
+        raise ValueError(f"Unknown body model backend '{kind}' (expected one of {sorted(BODY_BACKENDS)})")
+    path = path or DEFAULT_BODY_PATHS[kind]
+    if kind == 'keras':
+        return KerasBodyBackend(path, img_size=img_size, num_threads=num_threads)
+    return BODY_BACKENDS[kind](path, num_threads=num_threads)
+
+
+# ==================== ROBERTA SENTIMENT ====================
+
+class TorchTextBackend:
+    """Hugging Face model through PyTorch"""
+    name = 'torch'
+
+    def __init__(self, model_name, num_threads=None):
+        import torch
+        from transformers import AutoTokenizer, AutoModelForSequenceClassification
+        if num_threads:
+            torch.set_num_threads(num_threads)
+        self.path = model_name
+        self._torch = torch
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        self.model = AutoModelForSequenceClassification.from_pretrained(model_name)
+        self.model.eval()
+
+    def predict_logits(self, texts, max_length=512):
+        """List of texts -> (N, 3) logits; one padded forward pass"""
+        with timed('roberta_tokenize'):
+            encoded = self.tokenizer(texts, return_tensors='pt', truncation=True,
+                                     max_length=max_length, padding=True)
+        with timed('roberta_forward'), self._torch.inference_mode():
+            return self.model(**encoded)[0].numpy()
+
+    def predict_ids(self, rows):
+        """Already tokenised inputs (lists of ids with special tokens) -> (N, 3) logits"""
+        encoded = self.tokenizer.pad({'input_ids': rows}, return_tensors='pt')
+        with timed('roberta_forward'), self._torch.inference_mode():
+            return self.model(**encoded)[0].numpy()
+
+
+class OnnxTextBackend:
+    """ONNX Runtime export directory containing model.onnx and the saved tokenizer"""
+    name = 'onnx'
+
+    def __init__(self, path, num_threads=None):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+        options = ort.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.path = path
+        self.tokenizer = AutoTokenizer.from_pretrained(path)
+        self.session = ort.InferenceSession(os.path.join(path, 'model.onnx'), options,
+                                            providers=['CPUExecutionProvider'])
+        self._input_names = [i.name for i in self.session.get_inputs()]
+
+    def predict_logits(self, texts, max_length=512):
+        with timed('roberta_tokenize'):
+            encoded = self.tokenizer(texts, return_tensors='np', truncation=True,
+                                     max_length=max_length, padding=True)
+        feeds = {name: encoded[name].astype(np.int64) for name in self._input_names}
+        with timed('roberta_forward'):
+            return self.session.run(None, feeds)[0]
+
+    def predict_ids(self, rows):
+        encoded = self.tokenizer.pad({'input_ids': rows}, return_tensors='np')
+        feeds = {name: encoded[name].astype(np.int64) for name in self._input_names}
+        with timed('roberta_forward'):
+            return self.session.run(None, feeds)[0]
+
+
+def load_text_backend(kind='torch', path=None, num_threads=None):
+    if kind == 'torch':
+        return TorchTextBackend(path or DEFAULT_TEXT_PATHS['torch'], num_threads=num_threads)
+    if kind == 'onnx':
+        return OnnxTextBackend(path or DEFAULT_TEXT_PATHS['onnx'], num_threads=num_threads)
+    raise ValueError(f"Unknown text model backend '{kind}' (expected 'torch' or 'onnx')")
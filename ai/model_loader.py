@@ -0,0 +1,99 @@
+"""
+model_loader.py - Deferred model loading for fast server start-up
+Each model sits in a LazyModel slot that loads it eagerly, in the background
+or on first use, and records its state and load time for readiness checks
+"""
+
+import threading
+import time
+
+LOADING_MODES = ('eager', 'background', 'lazy', 'prefork')
+
+
+class LazyModel:
+    """Loads a model at most once and reports its readiness
+
+    fork_safe marks models whose weights can be loaded in a pre-fork master and
+    shared copy-on-write with the workers.
+    """
+    def __init__(self, name, loader, enabled=True, fork_safe=True):
+        self.name = name
+        self._loader = loader
+        self.fork_safe = fork_safe
+        self.state = 'pending' if enabled else 'disabled'  # pending | loading | ready | failed | disabled
+        self.value = None
+        self.error = None
+        self.load_seconds = None
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        if not enabled:
+            self._done.set()
+
+    def load(self):
+        """Load synchronously (no-op if already loaded or disabled); returns the model or None"""
+        with self._lock:
+            if self.state != 'pending':
+                claimed = False
+            else:
+                self.state = 'loading'
+                claimed = True
+
+        if not claimed:
+            self._done.wait()
+            return self.value
+
+        started = time.perf_counter()
+        try:
+            self.value = self._loader()
+            self.state = 'ready'
+        except Exception as e:
+            print(f"❌ Error loading {self.name} model: {e}")
+            self.error = str(e)
+            self.state = 'failed'
+        finally:
+            self.load_seconds = round(time.perf_counter() - started, 3)
+            self._done.set()
+        return self.value
+
+    def load_in_background(self):
+        if self.state == 'pending':
+            threading.Thread(target=self.load, name=f'load-{self.name}', daemon=True).start()
+
+    def get(self, wait=True):
+        """Return the model, loading it on first use
+
+        With wait=False a pending load is started in the background and None is
+        returned until it is ready.
+        """
+        if self.state == 'ready':
+            return self.value
+        if wait:
+            return self.load()
+        self.load_in_background()
+        return None
+
+    @property
+    def ready(self):
+        return self.state == 'ready'
+
+    def status(self):
+        return {
+            'state': self.state,
+            'load_seconds': self.load_seconds,
+            'error': self.error
+        }
+
+
+def start_loading(models, mode):
+    """Apply the configured loading mode to a list of LazyModel slots
+
+    'prefork' loads only fork-safe models now; the rest are loaded by each
+    worker after fork.
+    """
+    if mode not in LOADING_MODES:
+        raise ValueError(f"Unknown MODEL_LOADING mode '{mode}' (expected one of {LOADING_MODES})")
+    for model in models:
+        if mode == 'eager' or (mode == 'prefork' and model.fork_safe):
+            model.load()
+        elif mode == 'background':
+            model.load_in_background()
@@ -0,0 +1,100 @@
+"""
+profiler.py - On-demand sampling profiler for a running server
+A background thread snapshots every thread's Python stack at a fixed
+interval and counts identical stacks. Output is in the collapsed-stack
+format ("frame;frame;frame count") read by flamegraph.pl and speedscope.
+
+Started and stopped at runtime through /debug/profile (see app.py), so a
+slow production worker can be profiled without a redeploy. Nothing runs
+while it is stopped.
+"""
+
+import sys
+import threading
+import time
+from collections import Counter
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f'{code.co_name} ({code.co_filename.rsplit("/", 1)[-1]}:{frame.f_lineno})'
+
+
+class SamplingProfiler:
+    """Samples all threads' stacks every `interval` seconds while running"""
+    def __init__(self, max_stack_depth=64):
+        self.max_stack_depth = max_stack_depth
+        self.interval = 0.01
+        self.samples = 0
+        self.started_at = None
+        self.stopped_at = None
+        self._stacks = Counter()
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._stacks_lock = threading.Lock()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval=0.01, duration=None):
+        """Start sampling (resetting previous results); stops itself after duration seconds if given"""
+        with self._lock:
+            if self.running:
+                return False
+            self.interval = max(0.001, float(interval))
+            self.samples = 0
+            self._stacks = Counter()
+            self.started_at = time.time()
+            self.stopped_at = None
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, args=(duration,), name='sampling-profiler',
+                                            daemon=True)
+            self._thread.start()
+            return True
+
+    def stop(self):
+        self._stop.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(5.0)
+        return self.collapsed()
+
+    def _run(self, duration):
+        own_id = threading.get_ident()
+        deadline = time.monotonic() + duration if duration else None
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            sampled = []
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < self.max_stack_depth:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                sampled.append(';'.join(reversed(stack)))
+            with self._stacks_lock:
+                self._stacks.update(sampled)
+                self.samples += 1
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+        self.stopped_at = time.time()
+
+    def collapsed(self, limit=None):
+        """Collapsed stacks, most frequent first"""
+        with self._stacks_lock:
+            stacks = self._stacks.most_common(limit)
+        return ''.join(f'{stack} {count}\n' for stack, count in stacks)
+
+    def status(self):
+        return {
+            'running': self.running,
+            'interval_ms': self.interval * 1000.0,
+            'samples': self.samples,
+            'distinct_stacks': len(self._stacks),
+            'started_at': self.started_at,
+            'stopped_at': self.stopped_at
+        }
@@ -0,0 +1,185 @@
+"""
+question_log.py - Append-only per-session log of question analyses
+Entries are numbered by seq (1, 2, ...) so readers page with a `since`
+cursor. Transcripts are stored once per session under a content id and
+entries reference them by transcriptId instead of carrying the text.
+
+QuestionLog keeps the newest `memory_cap` entries in memory and spills older
+ones to a SQLite file (QuestionSpill). The final report needs every entry, so
+without a spill file (or when a spill write fails) nothing is evicted. The
+SQL helpers are shared with SQLiteSessionStore, which keeps the whole log in
+its database.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+from collections import deque
+
+from sentiment_cache import normalize_transcript
+
+
+def transcript_id(text):
+    return hashlib.sha256(normalize_transcript(text).encode('utf-8')).hexdigest()[:16]
+
+
+def make_entry(seq, analysis, transcript=None):
+    entry = {'seq': seq, **analysis}
+    entry['transcriptId'] = transcript_id(transcript) if transcript else None
+    return entry
+
+
+# ==================== SQL ====================
+
+def create_log_tables(db):
+    db.execute(
+        'CREATE TABLE IF NOT EXISTS question_log ('
+        'session_id TEXT NOT NULL, seq INTEGER NOT NULL, analysis TEXT NOT NULL, '
+        'PRIMARY KEY (session_id, seq)) WITHOUT ROWID'
+    )
+    db.execute(
+        'CREATE TABLE IF NOT EXISTS transcripts ('
+        'session_id TEXT NOT NULL, transcript_id TEXT NOT NULL, text TEXT NOT NULL, '
+        'PRIMARY KEY (session_id, transcript_id)) WITHOUT ROWID'
+    )
+
+
+def insert_entry(db, session_id, entry, transcript=None):
+    db.execute('INSERT OR REPLACE INTO question_log VALUES (?, ?, ?)',
+               (session_id, entry['seq'], json.dumps(entry)))
+    if transcript:
+        db.execute('INSERT OR IGNORE INTO transcripts VALUES (?, ?, ?)',
+                   (session_id, entry['transcriptId'], transcript))
+
+
+def last_seq(db, session_id):
+    return db.execute('SELECT COALESCE(MAX(seq), 0) FROM question_log WHERE session_id = ?',
+                      (session_id,)).fetchone()[0]
+
+
+def select_entries(db, session_id, since=0, limit=None):
+    rows = db.execute('SELECT analysis FROM question_log WHERE session_id = ? AND seq > ? ORDER BY seq LIMIT ?',
+                      (session_id, since, -1 if limit is None else limit)).fetchall()
+    return [json.loads(row[0]) for row in rows]
+
+
+def select_transcripts(db, session_id, ids):
+    ids = list(ids)
+    if not ids:
+        return {}
+    placeholders = ','.join('?' * len(ids))
+    rows = db.execute(f'SELECT transcript_id, text FROM transcripts WHERE session_id = ? '
+                      f'AND transcript_id IN ({placeholders})', (session_id, *ids)).fetchall()
+    return dict(rows)
+
+
+def delete_log(db, session_id):
+    db.execute('DELETE FROM question_log WHERE session_id = ?', (session_id,))
+    db.execute('DELETE FROM transcripts WHERE session_id = ?', (session_id,))
+
+
+class QuestionSpill:
+    """SQLite file holding question log entries evicted from memory (shared by all sessions)"""
+    def __init__(self, path):
+        self.path = path
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._db.execute('PRAGMA journal_mode=WAL')
+        create_log_tables(self._db)
+        self._db.commit()
+
+    def put(self, session_id, entry, transcript=None):
+        with self._lock:
+            insert_entry(self._db, session_id, entry, transcript)
+            self._db.commit()
+
+    def entries(self, session_id, since=0, limit=None):
+        with self._lock:
+            return select_entries(self._db, session_id, since, limit)
+
+    def transcripts(self, session_id, ids):
+        with self._lock:
+            return select_transcripts(self._db, session_id, ids)
+
+    def delete(self, session_id):
+        with self._lock:
+            delete_log(self._db, session_id)
+            self._db.commit()
+
+
+# ==================== IN MEMORY ====================
+
+class QuestionLog:
+    """One session's log: newest memory_cap entries in memory, older ones spilled (never dropped)"""
+    def __init__(self, session_id, memory_cap=100, spill=None):
+        self.session_id = session_id
+        self.memory_cap = max(1, int(memory_cap))
+        self.spill = spill
+        self.count = 0  # seq of the newest entry
+        self.spilled = 0
+        self.spill_errors = 0
+        self._entries = deque()
+        self._transcripts = {}  # transcript id -> [text, number of in-memory entries using it]
+
+    def append(self, analysis, transcript=None):
+        self.count += 1
+        entry = make_entry(self.count, analysis, transcript)
+        if transcript:
+            held = self._transcripts.setdefault(entry['transcriptId'], [transcript, 0])
+            held[1] += 1
+        self._entries.append(entry)
+        while self.spill is not None and len(self._entries) > self.memory_cap and self._evict():
+            pass
+        return entry
+
+    def _evict(self):
+        """Move the oldest entry to the spill file; False (entry kept in memory) if the write fails"""
+        entry = self._entries[0]
+        text = self._transcripts[entry['transcriptId']][0] if entry['transcriptId'] else None
+        try:
+            self.spill.put(self.session_id, entry, text)
+        except sqlite3.Error as e:
+            self.spill_errors += 1
+            print(f"⚠️ Question log spill failed, keeping entry in memory: {e}")
+            return False
+        self._entries.popleft()
+        if entry['transcriptId']:
+            held = self._transcripts[entry['transcriptId']]
+            held[1] -= 1
+            if not held[1]:
+                del self._transcripts[entry['transcriptId']]
+        self.spilled += 1
+        return True
+
+    def page(self, since=0, limit=None):
+        """Entries with seq > since, oldest first, at most limit of them"""
+        page = []
+        oldest_in_memory = self._entries[0]['seq'] if self._entries else self.count + 1
+        if since + 1 < oldest_in_memory and self.spill is not None and self.spilled:
+            page = self.spill.entries(self.session_id, since, limit)
+            if page:
+                since = page[-1]['seq']
+        for entry in self._entries:
+            if limit is not None and len(page) >= limit:
+                break
+            if entry['seq'] > since:
+                page.append(entry)
+        return page
+
+    def transcripts(self, ids):
+        found = {tid: self._transcripts[tid][0] for tid in ids if tid in self._transcripts}
+        missing = [tid for tid in ids if tid not in found]
+        if missing and self.spill is not None and self.spilled:
+            found.update(self.spill.transcripts(self.session_id, missing))
+        return found
+
+    def clear(self):
+        if self.spill is not None and self.spilled:
+            self.spill.delete(self.session_id)
+        self._entries.clear()
+        self._transcripts.clear()
+
+    def stats(self):
+        return {'count': self.count, 'in_memory': len(self._entries),
+                'spilled': self.spilled, 'spill_errors': self.spill_errors}
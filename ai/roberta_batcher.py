@@ -0,0 +1,175 @@
+"""
+roberta_batcher.py - Micro-batched RoBERTa inference worker
+Collects transcripts from all sessions into dynamic batches, pads once and
+runs a single forward pass per batch on a dedicated thread (the text backend
+from model_backends.py does the tokenisation and inference)
+
+With a window_builder (text_windows.py) every transcript is split into
+sentence-aligned windows instead of being truncated; all windows of a batch go
+through one forward pass and are averaged back per transcript.
+"""
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+from scipy.special import softmax
+
+from metrics import Histogram, timed
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+WINDOW_BUCKETS = (1, 2, 3, 4, 6, 8, 12, 16)
+QUEUE_WAIT_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+
+class _Request:
+    __slots__ = ('text', 'future', 'enqueued_at')
+
+    def __init__(self, text):
+        self.text = text
+        self.future = Future()
+        self.enqueued_at = time.perf_counter()
+
+
+class RobertaBatcher:
+    """Shared inference worker that resolves one future per transcript"""
+    def __init__(self, backend, max_batch_size=16, max_wait_ms=10.0, max_length=512, window_builder=None):
+        self.backend = backend
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait_ms = max(0.0, float(max_wait_ms))
+        self.max_length = max_length
+        self.window_builder = window_builder
+
+        self.batch_sizes = Histogram(BATCH_SIZE_BUCKETS)
+        self.queue_wait_ms = Histogram(QUEUE_WAIT_BUCKETS_MS)
+        self.windows_per_text = Histogram(WINDOW_BUCKETS)
+
+        self._queue = queue.Queue()
+        self._stop = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='roberta-batcher', daemon=True)
+            self._thread.start()
+
+    def _ensure_running(self):
+        if self._pid != os.getpid():
+            # Loaded before a fork (gunicorn preload): threads and lock state don't survive it
+            self._queue = queue.Queue()
+            self._stop = threading.Event()
+            self._start_lock = threading.Lock()
+            self._thread = None
+            self._pid = os.getpid()
+        if self._thread is None or not self._thread.is_alive():
+            self.start()
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def submit(self, text):
+        """Queue a transcript and return a Future resolving to its softmax scores"""
+        self._ensure_running()
+        request = _Request(text)
+        self._queue.put(request)
+        return request.future
+
+    def score(self, text, timeout=30.0):
+        """Blocking helper used by request handlers"""
+        return self.submit(text).result(timeout=timeout)
+
+    def stats(self):
+        return {
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait_ms,
+            'queue_depth': self._queue.qsize(),
+            'batch_size': self.batch_sizes.snapshot(),
+            'queue_wait_ms': self.queue_wait_ms.snapshot(),
+            'windows_per_text': self.windows_per_text.snapshot() if self.window_builder else None
+        }
+
+    def _collect_batch(self):
+        """Block for the first request, then gather more until full or max wait elapses"""
+        try:
+            first = self._queue.get(timeout=0.1)
+        except queue.Empty:
+            return []
+
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait_ms / 1000.0
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = self._collect_batch()
+            if batch:
+                self._run_batch(batch)
+
+        # Fail anything still waiting so callers do not hang on shutdown
+        while True:
+            try:
+                request = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            request.future.set_exception(RuntimeError('RoBERTa batcher stopped'))
+
+    def _run_batch(self, batch):
+        started = time.perf_counter()
+        for request in batch:
+            self.queue_wait_ms.observe((started - request.enqueued_at) * 1000.0)
+        self.batch_sizes.observe(len(batch))
+
+        try:
+            if self.window_builder is not None:
+                scores = self._score_windows([request.text for request in batch])
+            else:
+                texts = [request.text for request in batch]
+                logits = self.backend.predict_logits(texts, max_length=self.max_length)
+                scores = softmax(logits, axis=1)
+        except Exception as e:
+            for request in batch:
+                request.future.set_exception(e)
+            return
+
+        for request, row in zip(batch, scores):
+            request.future.set_result({
+                'roberta_neg': float(row[0]),
+                'roberta_neu': float(row[1]),
+                'roberta_pos': float(row[2])
+            })
+
+    def _score_windows(self, texts):
+        """One forward pass over every window of every text; length-weighted mean per text"""
+        rows, owners, weights = [], [], []
+        with timed('roberta_tokenize'):
+            for i, text in enumerate(texts):
+                windows, lengths = self.window_builder.token_windows(text)
+                self.windows_per_text.observe(len(windows))
+                rows.extend(windows)
+                owners.extend([i] * len(windows))
+                weights.extend(lengths)
+
+        probs = softmax(self.backend.predict_ids(rows), axis=1)
+        owners = np.asarray(owners)
+        weights = np.asarray(weights, dtype=np.float64)
+        return [np.average(probs[owners == i], axis=0, weights=weights[owners == i]) for i in range(len(texts))]
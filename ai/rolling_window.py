@@ -0,0 +1,243 @@
+"""
+rolling_window.py - Constant-time rolling statistics for score smoothing
+RollingWindow keeps the last N values in a preallocated ring buffer with
+running sums, so push, mean and variance are O(1). EWMA and TimeWindow are
+drop-in alternatives (same push/mean/variance interface) for exponential and
+time-based smoothing.
+"""
+
+import math
+import struct
+import time
+from array import array
+
+# Serialised RollingWindow: this header, then `capacity` float32 slots in ring order. The running
+# sums travel with the samples, so push_bytes() updates a stored window in O(1).
+_HEADER = struct.Struct('<4sIIIdd')  # magic, head, count, pushes since re-sum, sum, sum of squares
+_MAGIC = b'RW2\x00'
+_SLOT = struct.Struct('<f')
+
+
+class RollingWindow:
+    """Last `capacity` values in a float64 ring buffer with running sum and sum of squares"""
+    __slots__ = ('capacity', '_values', '_head', '_count', '_sum', '_sumsq', '_since_resum')
+
+    def __init__(self, capacity):
+        if capacity < 1:
+            raise ValueError('capacity must be >= 1')
+        self.capacity = int(capacity)
+        self._values = array('d', bytes(8 * self.capacity))
+        self._head = 0  # next slot to write
+        self._count = 0
+        self._sum = 0.0
+        self._sumsq = 0.0
+        self._since_resum = 0
+
+    def push(self, value):
+        value = float(value)
+        if self._count == self.capacity:
+            old = self._values[self._head]
+            self._sum -= old
+            self._sumsq -= old * old
+        else:
+            self._count += 1
+        self._values[self._head] = value
+        self._head = (self._head + 1) % self.capacity
+        self._sum += value
+        self._sumsq += value * value
+
+        # Subtracting evicted values accumulates rounding error; re-sum occasionally
+        self._since_resum += 1
+        if self._since_resum >= 64 * self.capacity:
+            self._resum()
+
+    def _resum(self):
+        values = self.values()
+        self._sum = math.fsum(values)
+        self._sumsq = math.fsum(v * v for v in values)
+        self._since_resum = 0
+
+    def mean(self, default=None):
+        return self._sum / self._count if self._count else default
+
+    def variance(self, default=None):
+        """Population variance of the values in the window"""
+        if not self._count:
+            return default
+        mean = self._sum / self._count
+        return max(0.0, self._sumsq / self._count - mean * mean)
+
+    def last(self, default=None):
+        return self._values[self._head - 1] if self._count else default
+
+    def values(self):
+        """Values oldest first"""
+        if self._count < self.capacity:
+            return self._values[:self._count]
+        return self._values[self._head:] + self._values[:self._head]
+
+    def __len__(self):
+        return self._count
+
+    def copy(self):
+        clone = RollingWindow.__new__(RollingWindow)
+        for slot in self.__slots__:
+            setattr(clone, slot, getattr(self, slot))
+        clone._values = self._values[:]
+        return clone
+
+    def to_bytes(self):
+        """Header with the running sums followed by the ring as little-endian float32"""
+        header = _HEADER.pack(_MAGIC, self._head, self._count, self._since_resum, self._sum, self._sumsq)
+        return header + array('f', self._values).tobytes()
+
+    @staticmethod
+    def _is_ring(blob, capacity):
+        return len(blob) == _HEADER.size + 4 * capacity and bytes(blob[:4]) == _MAGIC
+
+    @classmethod
+    def from_bytes(cls, blob, capacity):
+        """Inverse of to_bytes; also reads the older headerless form (values oldest first)"""
+        window = cls(capacity)
+        if not blob:
+            return window
+        if cls._is_ring(blob, window.capacity):
+            _, window._head, window._count, window._since_resum, window._sum, window._sumsq = \
+                _HEADER.unpack_from(blob)
+            window._values = array('d', memoryview(bytes(blob))[_HEADER.size:].cast('f'))
+            return window
+        packed = array('f')
+        if bytes(blob[:4]) == _MAGIC:  # ring of another capacity
+            _, head, count, _, _, _ = _HEADER.unpack_from(blob)
+            packed.frombytes(bytes(blob[_HEADER.size:]))
+            packed = packed[head:] + packed[:head] if count == len(packed) else packed[:count]
+        else:
+            packed.frombytes(bytes(blob))
+        values = packed[-window.capacity:]
+        window._values[:len(values)] = array('d', values)
+        window._count = len(values)
+        window._head = len(values) % window.capacity
+        window._resum()
+        return window
+
+    @classmethod
+    def push_bytes(cls, blob, value, capacity):
+        """push() applied to a serialised window without deserialising it; returns the new bytes"""
+        if not blob or not cls._is_ring(blob, capacity):
+            window = cls.from_bytes(blob, capacity)
+            window.push(value)
+            return window.to_bytes()
+        data = bytearray(blob)
+        _, head, count, since_resum, total, sumsq = _HEADER.unpack_from(data)
+        offset = _HEADER.size + 4 * head
+        if count == capacity:
+            old = _SLOT.unpack_from(data, offset)[0]
+            total -= old
+            sumsq -= old * old
+        else:
+            count += 1
+        _SLOT.pack_into(data, offset, value)
+        value = _SLOT.unpack_from(data, offset)[0]  # the float32 that was stored
+        total += value
+        sumsq += value * value
+        since_resum += 1
+        if since_resum >= 64 * capacity:
+            values = memoryview(data)[_HEADER.size:].cast('f')[:count]
+            total = math.fsum(values)
+            sumsq = math.fsum(v * v for v in values)
+            since_resum = 0
+        _HEADER.pack_into(data, 0, _MAGIC, (head + 1) % capacity, count, since_resum, total, sumsq)
+        return bytes(data)
+
+
+class EWMA:
+    """Exponentially weighted mean and variance; alpha is the weight of the newest value"""
+    __slots__ = ('alpha', '_mean', '_var', '_count')
+
+    def __init__(self, alpha=None, halflife=None):
+        if halflife is not None:
+            alpha = 1.0 - 0.5 ** (1.0 / halflife)
+        if alpha is None or not 0.0 < alpha <= 1.0:
+            raise ValueError('EWMA needs 0 < alpha <= 1 (or a halflife in samples)')
+        self.alpha = float(alpha)
+        self._mean = 0.0
+        self._var = 0.0
+        self._count = 0
+
+    def push(self, value):
+        value = float(value)
+        if not self._count:
+            self._mean = value
+        else:
+            diff = value - self._mean
+            increment = self.alpha * diff
+            self._mean += increment
+            self._var = (1.0 - self.alpha) * (self._var + diff * increment)
+        self._count += 1
+
+    def mean(self, default=None):
+        return self._mean if self._count else default
+
+    def variance(self, default=None):
+        return self._var if self._count else default
+
+    def __len__(self):
+        return self._count
+
+
+class TimeWindow:
+    """Values pushed in the last `seconds`, in a ring buffer of at most `capacity` entries"""
+    __slots__ = ('seconds', 'capacity', '_clock', '_values', '_times', '_head', '_count', '_sum', '_sumsq')
+
+    def __init__(self, seconds, capacity=1024, clock=time.monotonic):
+        self.seconds = float(seconds)
+        self.capacity = int(capacity)
+        self._clock = clock
+        self._values = array('d', bytes(8 * self.capacity))
+        self._times = array('d', bytes(8 * self.capacity))
+        self._head = 0  # oldest entry
+        self._count = 0
+        self._sum = 0.0
+        self._sumsq = 0.0
+
+    def _drop_oldest(self):
+        old = self._values[self._head]
+        self._sum -= old
+        self._sumsq -= old * old
+        self._head = (self._head + 1) % self.capacity
+        self._count -= 1
+        if not self._count:
+            self._sum = self._sumsq = 0.0  # reset drift whenever the window empties
+
+    def _expire(self, now):
+        cutoff = now - self.seconds
+        while self._count and self._times[self._head] < cutoff:
+            self._drop_oldest()
+
+    def push(self, value, now=None):
+        now = self._clock() if now is None else now
+        self._expire(now)
+        if self._count == self.capacity:
+            self._drop_oldest()
+        value = float(value)
+        tail = (self._head + self._count) % self.capacity
+        self._values[tail] = value
+        self._times[tail] = now
+        self._count += 1
+        self._sum += value
+        self._sumsq += value * value
+
+    def mean(self, default=None):
+        self._expire(self._clock())
+        return self._sum / self._count if self._count else default
+
+    def variance(self, default=None):
+        self._expire(self._clock())
+        if not self._count:
+            return default
+        mean = self._sum / self._count
+        return max(0.0, self._sumsq / self._count - mean * mean)
+
+    def __len__(self):
+        self._expire(self._clock())
+        return self._count
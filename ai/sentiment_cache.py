@@ -0,0 +1,137 @@
+"""
+sentiment_cache.py - Content-addressed cache for voice tone analysis
+Bounded in-memory LRU/TTL tier with an optional SQLite spill tier that
+survives restarts
+"""
+
+import copy
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_transcript(text):
+    """Collapse whitespace; case is kept because both VADER and RoBERTa are case sensitive"""
+    return _WHITESPACE.sub(' ', text or '').strip()
+
+
+def cache_key(text, model_version):
+    payload = f"{model_version}\x00{normalize_transcript(text)}".encode('utf-8')
+    return hashlib.sha256(payload).hexdigest()
+
+
+class SentimentCache:
+    """LRU/TTL cache of analyze_voice_tone results keyed by transcript hash
+
+    get() returns a copy, so callers may modify results. SQLite is only
+    touched outside the in-memory tier's lock (under its own lock).
+    """
+    def __init__(self, model_version, max_entries=1024, ttl_seconds=3600, disk_path=None):
+        self.model_version = model_version
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_seconds = float(ttl_seconds)
+        self.disk_path = disk_path
+
+        self._entries = OrderedDict()  # key -> (stored_at, value)
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self.counters = {'hits': 0, 'misses': 0, 'evictions': 0, 'expired': 0, 'disk_hits': 0}
+
+        self._db = None
+        if disk_path:
+            self._db = sqlite3.connect(disk_path, check_same_thread=False)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS sentiment_cache ('
+                'key TEXT PRIMARY KEY, stored_at REAL NOT NULL, value TEXT NOT NULL)'
+            )
+            self._db.execute('DELETE FROM sentiment_cache WHERE stored_at < ?',
+                             (time.time() - self.ttl_seconds,))
+            self._db.commit()
+
+    def key_for(self, text):
+        return cache_key(text, self.model_version)
+
+    def get(self, text):
+        key = self.key_for(text)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_at, value = entry
+                if now - stored_at <= self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    self.counters['hits'] += 1
+                    return copy.deepcopy(value)
+                del self._entries[key]
+                self.counters['expired'] += 1
+
+        row = self._disk_get(key, now)
+        with self._lock:
+            if row is None:
+                self.counters['misses'] += 1
+                return None
+            stored_at, value = row
+            self.counters['hits'] += 1
+            self.counters['disk_hits'] += 1
+            self._insert(key, stored_at, value)
+        return copy.deepcopy(value)
+
+    def put(self, text, value):
+        key = self.key_for(text)
+        now = time.time()
+        value = copy.deepcopy(value)  # the caller keeps its own dict
+        with self._lock:
+            self._insert(key, now, value)
+        self._disk_put(key, now, value)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.counters['hits'] + self.counters['misses']
+            return {
+                **self.counters,
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'hit_ratio': round(self.counters['hits'] / lookups, 4) if lookups else 0.0,
+                'disk_tier': self._db is not None
+            }
+
+    def _insert(self, key, stored_at, value):
+        self._entries[key] = (stored_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.counters['evictions'] += 1
+
+    def _disk_get(self, key, now):
+        if self._db is None:
+            return None
+        try:
+            with self._db_lock:
+                row = self._db.execute('SELECT stored_at, value FROM sentiment_cache WHERE key = ?',
+                                       (key,)).fetchone()
+        except sqlite3.Error as e:
+            print(f"Sentiment cache disk read error: {e}")
+            return None
+        if row is None or now - row[0] > self.ttl_seconds:
+            return None
+        return row[0], json.loads(row[1])
+
+    def _disk_put(self, key, stored_at, value):
+        if self._db is None:
+            return
+        payload = json.dumps(value)
+        try:
+            with self._db_lock:
+                self._db.execute('INSERT OR REPLACE INTO sentiment_cache (key, stored_at, value) VALUES (?, ?, ?)',
+                                 (key, stored_at, payload))
+                self._db.commit()
+        except sqlite3.Error as e:
+            print(f"Sentiment cache disk write error: {e}")
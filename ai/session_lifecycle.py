@@ -0,0 +1,135 @@
+"""
+session_lifecycle.py - Expiry and resource accounting for process-local sessions
+A client that never calls /api/session/stop would otherwise leave its capture
+thread and camera running forever. Sessions carry created_at/last_seen
+(renewed by every API call that names them, see app.py) and a reaper thread
+stops those idle for longer than idle_ttl or older than max_age.
+
+Per-session CPU time is read from the capture thread's CPU clock; shared work
+(batched CNN passes) is attributed by the caller.
+"""
+
+import os
+import threading
+import time
+
+from metrics import count_error
+
+_CLOCK_TICKS = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+
+
+def thread_cpu_seconds(thread):
+    """CPU time used so far by a live thread, or None if it has exited or the platform can't tell"""
+    if thread is None or not thread.is_alive():
+        return None
+    try:
+        return time.clock_gettime(time.pthread_getcpuclockid(thread.ident))
+    except (AttributeError, OSError):
+        pass
+    try:
+        with open(f'/proc/self/task/{thread.native_id}/stat') as f:
+            fields = f.read().rsplit(')', 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / _CLOCK_TICKS  # utime + stime
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def process_rss_mb():
+    """Resident set size of this process (Linux), or None"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class SessionReaper:
+    """Background sweep that expires sessions past their idle or absolute TTL
+
+    get_sessions() returns objects with session_id, created_at and last_seen
+    (time.monotonic values); reap(session_id, reason) stops one. A TTL of 0
+    disables that check.
+    """
+    def __init__(self, get_sessions, reap, idle_ttl=600.0, max_age=14400.0, interval=30.0):
+        self.get_sessions = get_sessions
+        self.reap = reap
+        self.idle_ttl = idle_ttl
+        self.max_age = max_age
+        self.interval = interval
+        self.counters = {'idle': 0, 'max_age': 0, 'admin': 0}
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._sweep_lock = threading.Lock()  # the thread and start-time sweeps may overlap
+        self._pid = os.getpid()
+
+    def expiry(self, session):
+        """(monotonic deadline, reason) of the first TTL the session will hit, or (None, None)"""
+        deadlines = []
+        if self.idle_ttl:
+            deadlines.append((session.last_seen + self.idle_ttl, 'idle'))
+        if self.max_age:
+            deadlines.append((session.created_at + self.max_age, 'max_age'))
+        return min(deadlines) if deadlines else (None, None)
+
+    def sweep(self):
+        """Reap every expired session now; returns how many were reaped"""
+        with self._sweep_lock:
+            now = time.monotonic()
+            reaped = 0
+            for session in list(self.get_sessions()):
+                deadline, reason = self.expiry(session)
+                if deadline is not None and now >= deadline:
+                    self.reap(session.session_id, reason)
+                    self.counters[reason] += 1
+                    reaped += 1
+            return reaped
+
+    def reap_now(self, session_id, reason='admin'):
+        """Stop one session regardless of its TTLs"""
+        with self._sweep_lock:
+            self.reap(session_id, reason)
+            self.counters[reason] += 1
+
+    def next_expiry_in(self):
+        """Seconds until the next session expires (None without TTLs or sessions)"""
+        deadlines = [self.expiry(session)[0] for session in list(self.get_sessions())]
+        deadlines = [deadline for deadline in deadlines if deadline is not None]
+        return max(0.0, min(deadlines) - time.monotonic()) if deadlines else None
+
+    def ensure_running(self):
+        """Start the sweep thread in this process (again after a fork)"""
+        with self._lock:
+            if self._pid != os.getpid():
+                self._thread = None
+                self._stop = threading.Event()
+                self._pid = os.getpid()
+            if self._thread is not None and self._thread.is_alive():
+                return
+            if not (self.idle_ttl or self.max_age):
+                return
+            self._thread = threading.Thread(target=self._run, name='session-reaper', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.sweep()
+            except Exception as e:
+                count_error('session_reaper')
+                print(f"Session reaper error: {e}")
+
+    def stats(self):
+        return {
+            'idle_ttl_seconds': self.idle_ttl,
+            'max_age_seconds': self.max_age,
+            'interval_seconds': self.interval,
+            'running': self._thread is not None and self._thread.is_alive(),
+            'reaped': dict(self.counters)
+        }
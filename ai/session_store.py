@@ -0,0 +1,434 @@
+"""
+session_store.py - Pluggable storage for interview session state
+Scores, analysis results and per-question analyses live here rather than in
+a worker's memory, so with a shared backend any worker or replica can serve a
+session and state survives restarts. Question analyses are an append-only log
+read in pages (see question_log.py).
+
+Backends (SESSION_STORE):
+    memory                  process-local dict (default)
+    sqlite:///path/to.db    SQLite in WAL mode, shared by processes on one host
+    redis://host:6379/0     Redis (or any Redis-compatible server), shared across nodes
+"""
+
+import json
+import sqlite3
+import threading
+import time
+
+from question_log import (QuestionLog, QuestionSpill, create_log_tables, delete_log, insert_entry,
+                          last_seq, make_entry, select_entries, select_transcripts)
+from rolling_window import RollingWindow
+
+# Rolling score windows and their capacities (number of readings kept)
+DEFAULT_WINDOW_SIZES = {'body_language_scores': 100, 'voice_tone_scores': 50}
+
+
+def _append_window(blob, value, capacity):
+    """Append to a serialised window in O(1): the running sums are stored with the samples"""
+    return RollingWindow.push_bytes(blob, value, capacity)
+
+
+class MemorySessionStore:
+    """Session state in this process only (the original single-worker behaviour)"""
+    name = 'memory'
+
+    def __init__(self, window_sizes=None, question_memory_cap=100, question_spill_path=None):
+        self.window_sizes = dict(window_sizes or DEFAULT_WINDOW_SIZES)
+        self.question_memory_cap = question_memory_cap
+        self._spill = QuestionSpill(question_spill_path) if question_spill_path else None
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def create(self, session_id, results):
+        """Insert a new session; returns False if the id is already active"""
+        with self._lock:
+            if session_id in self._sessions:
+                return False
+            self._sessions[session_id] = {
+                'results': dict(results),
+                'question_log': QuestionLog(session_id, self.question_memory_cap, self._spill),
+                **{window: RollingWindow(size) for window, size in self.window_sizes.items()}
+            }
+            return True
+
+    def get(self, session_id, questions_since=0, questions_limit=None):
+        """Copy of a session's state with one page of question analyses (seq > questions_since)"""
+        with self._lock:
+            state = self._sessions.get(session_id)
+            if state is None:
+                return None
+            log = state['question_log']
+            copy = {key: value.copy() for key, value in state.items() if key != 'question_log'}
+            copy['question_analyses'] = log.page(questions_since, questions_limit)
+            copy['question_count'] = log.count
+            return copy
+
+    def exists(self, session_id):
+        return session_id in self._sessions
+
+    def delete(self, session_id):
+        """Remove a session and return its final state with every question analysis (None if unknown)"""
+        with self._lock:
+            state = self._sessions.pop(session_id, None)
+            if state is None:
+                return None
+            log = state.pop('question_log')
+            state['question_analyses'] = log.page()
+            state['question_count'] = log.count
+            log.clear()
+            return state
+
+    def update_results(self, session_id, fields):
+        with self._lock:
+            state = self._sessions.get(session_id)
+            if state is None:
+                return False
+            state['results'].update(fields)
+            return True
+
+    def append_score(self, session_id, window, value, results=None):
+        """Push onto a rolling score window and optionally merge result fields"""
+        with self._lock:
+            state = self._sessions.get(session_id)
+            if state is None:
+                return False
+            state[window].push(value)
+            if results:
+                state['results'].update(results)
+            return True
+
+    def append_question(self, session_id, analysis, transcript=None):
+        """Append to the session's question log; returns the stored entry (None if unknown)"""
+        with self._lock:
+            state = self._sessions.get(session_id)
+            if state is None:
+                return None
+            return state['question_log'].append(analysis, transcript)
+
+    def transcripts(self, session_id, ids):
+        with self._lock:
+            state = self._sessions.get(session_id)
+            return state['question_log'].transcripts(ids) if state else {}
+
+    def count(self):
+        return len(self._sessions)
+
+    def stats(self):
+        with self._lock:
+            logs = [state['question_log'].stats() for state in self._sessions.values()]
+        return {
+            'backend': self.name,
+            'sessions': len(logs),
+            'question_memory_cap': self.question_memory_cap,
+            'questions_in_memory': sum(log['in_memory'] for log in logs),
+            'questions_spilled': sum(log['spilled'] for log in logs),
+            'question_spill_errors': sum(log['spill_errors'] for log in logs),
+            'question_spill': self._spill.path if self._spill else None
+        }
+
+
+class SQLiteSessionStore:
+    """Session state in a SQLite database in WAL mode, shared by every process on the host
+
+    Read-modify-write operations run in BEGIN IMMEDIATE transactions, so
+    concurrent appends from different workers are serialised by SQLite.
+    """
+    name = 'sqlite'
+
+    def __init__(self, path, window_sizes=None, busy_timeout=5.0):
+        self.path = path
+        self.window_sizes = dict(window_sizes or DEFAULT_WINDOW_SIZES)
+        self._db = sqlite3.connect(path, timeout=busy_timeout, isolation_level=None,
+                                   check_same_thread=False)
+        self._lock = threading.Lock()
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS sessions ('
+            'session_id TEXT PRIMARY KEY, created_at REAL NOT NULL, updated_at REAL NOT NULL, '
+            'results TEXT NOT NULL, body_language_scores BLOB NOT NULL, voice_tone_scores BLOB NOT NULL)'
+        )
+        create_log_tables(self._db)
+
+    def _transaction(self, operation, begin='BEGIN IMMEDIATE'):
+        with self._lock:
+            self._db.execute(begin)
+            try:
+                result = operation(self._db)
+            except BaseException:
+                self._db.execute('ROLLBACK')
+                raise
+            self._db.execute('COMMIT')
+            return result
+
+    def create(self, session_id, results):
+        now = time.time()
+
+        def insert(db):
+            cursor = db.execute(
+                'INSERT OR IGNORE INTO sessions VALUES (?, ?, ?, ?, ?, ?)',
+                (session_id, now, now, json.dumps(results), b'', b'')
+            )
+            if cursor.rowcount:
+                delete_log(db, session_id)  # left over from a session that was never stopped
+            return cursor.rowcount == 1
+        return self._transaction(insert)
+
+    def _read(self, db, session_id, questions_since=0, questions_limit=None):
+        row = db.execute(
+            'SELECT results, body_language_scores, voice_tone_scores FROM sessions WHERE session_id = ?',
+            (session_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {
+            'results': json.loads(row[0]),
+            'body_language_scores': RollingWindow.from_bytes(row[1], self.window_sizes['body_language_scores']),
+            'voice_tone_scores': RollingWindow.from_bytes(row[2], self.window_sizes['voice_tone_scores']),
+            'question_analyses': select_entries(db, session_id, questions_since, questions_limit),
+            'question_count': last_seq(db, session_id)
+        }
+
+    def get(self, session_id, questions_since=0, questions_limit=None):
+        def read(db):
+            return self._read(db, session_id, questions_since, questions_limit)
+        return self._transaction(read, 'BEGIN')  # one snapshot for the page and the count
+
+    def exists(self, session_id):
+        with self._lock:
+            return self._db.execute('SELECT 1 FROM sessions WHERE session_id = ?',
+                                    (session_id,)).fetchone() is not None
+
+    def delete(self, session_id):
+        def remove(db):
+            state = self._read(db, session_id)
+            db.execute('DELETE FROM sessions WHERE session_id = ?', (session_id,))
+            delete_log(db, session_id)
+            return state
+        return self._transaction(remove)
+
+    def update_results(self, session_id, fields):
+        def merge(db):
+            row = db.execute('SELECT results FROM sessions WHERE session_id = ?', (session_id,)).fetchone()
+            if row is None:
+                return False
+            results = json.loads(row[0])
+            results.update(fields)
+            db.execute('UPDATE sessions SET results = ?, updated_at = ? WHERE session_id = ?',
+                       (json.dumps(results), time.time(), session_id))
+            return True
+        return self._transaction(merge)
+
+    def append_score(self, session_id, window, value, results=None):
+        if window not in self.window_sizes:
+            raise ValueError(f"Unknown score window '{window}'")
+        capacity = self.window_sizes[window]
+
+        def append(db):
+            row = db.execute(f'SELECT {window}, results FROM sessions WHERE session_id = ?',
+                             (session_id,)).fetchone()
+            if row is None:
+                return False
+            if results:
+                merged = json.loads(row[1])
+                merged.update(results)
+                db.execute(f'UPDATE sessions SET {window} = ?, results = ?, updated_at = ? WHERE session_id = ?',
+                           (_append_window(row[0], value, capacity), json.dumps(merged), time.time(), session_id))
+            else:
+                db.execute(f'UPDATE sessions SET {window} = ?, updated_at = ? WHERE session_id = ?',
+                           (_append_window(row[0], value, capacity), time.time(), session_id))
+            return True
+        return self._transaction(append)
+
+    def append_question(self, session_id, analysis, transcript=None):
+        def insert(db):
+            if db.execute('SELECT 1 FROM sessions WHERE session_id = ?', (session_id,)).fetchone() is None:
+                return None
+            entry = make_entry(last_seq(db, session_id) + 1, analysis, transcript)
+            insert_entry(db, session_id, entry, transcript)
+            return entry
+        return self._transaction(insert)
+
+    def transcripts(self, session_id, ids):
+        with self._lock:
+            return select_transcripts(self._db, session_id, ids)
+
+    def count(self):
+        with self._lock:
+            return self._db.execute('SELECT COUNT(*) FROM sessions').fetchone()[0]
+
+    def stats(self):
+        return {'backend': self.name, 'path': self.path, 'sessions': self.count()}
+
+
+class RedisSessionStore:
+    """Session state in Redis: one hash per session, a list of question analyses and a transcript hash
+
+    Read-modify-write operations use WATCH/MULTI transactions, so they are
+    atomic across workers and nodes. Works with any client exposing the
+    redis-py API (including fakeredis).
+    """
+    name = 'redis'
+
+    def __init__(self, client, window_sizes=None, prefix='nextstep:session:'):
+        self.client = client
+        self.window_sizes = dict(window_sizes or DEFAULT_WINDOW_SIZES)
+        self.prefix = prefix
+        self._index = prefix + 'index'
+
+    @classmethod
+    def from_url(cls, url, **kwargs):
+        import redis
+        return cls(redis.Redis.from_url(url), **kwargs)
+
+    def _key(self, session_id):
+        return self.prefix + session_id
+
+    def _questions_key(self, session_id):
+        return self.prefix + session_id + ':questions'
+
+    def _transcripts_key(self, session_id):
+        return self.prefix + session_id + ':transcripts'
+
+    def create(self, session_id, results):
+        key = self._key(session_id)
+        outcome = {'created': False}
+
+        def transaction(pipe):
+            # Every field is written in one MULTI/EXEC, so readers never see a half-created session
+            outcome['created'] = False
+            if pipe.exists(key):
+                return
+            pipe.multi()
+            pipe.hset(key, mapping={
+                'created_at': time.time(),
+                'results': json.dumps(results),
+                'body_language_scores': b'',
+                'voice_tone_scores': b''
+            })
+            pipe.delete(self._questions_key(session_id), self._transcripts_key(session_id))
+            pipe.sadd(self._index, session_id)
+            outcome['created'] = True
+
+        self.client.transaction(transaction, key)
+        return outcome['created']
+
+    def _decode(self, fields, questions, question_count):
+        if not fields or b'results' not in fields:
+            return None
+        return {
+            'results': json.loads(fields[b'results']),
+            'body_language_scores': RollingWindow.from_bytes(fields.get(b'body_language_scores'),
+                                                             self.window_sizes['body_language_scores']),
+            'voice_tone_scores': RollingWindow.from_bytes(fields.get(b'voice_tone_scores'),
+                                                          self.window_sizes['voice_tone_scores']),
+            'question_analyses': [json.loads(q) for q in questions],
+            'question_count': question_count
+        }
+
+    def get(self, session_id, questions_since=0, questions_limit=None):
+        # Entry seq n is list index n - 1, so entries after `since` start at index `since`
+        end = -1 if questions_limit is None else questions_since + questions_limit - 1
+        pipe = self.client.pipeline()  # MULTI/EXEC so the page and count agree
+        pipe.hgetall(self._key(session_id))
+        pipe.lrange(self._questions_key(session_id), questions_since, end)
+        pipe.llen(self._questions_key(session_id))
+        return self._decode(*pipe.execute())
+
+    def exists(self, session_id):
+        return bool(self.client.exists(self._key(session_id)))
+
+    def delete(self, session_id):
+        pipe = self.client.pipeline()  # MULTI/EXEC
+        pipe.hgetall(self._key(session_id))
+        pipe.lrange(self._questions_key(session_id), 0, -1)
+        pipe.delete(self._key(session_id), self._questions_key(session_id), self._transcripts_key(session_id))
+        pipe.srem(self._index, session_id)
+        fields, questions, _, _ = pipe.execute()
+        return self._decode(fields, questions, len(questions))
+
+    def _read_modify_write(self, session_id, fields, modify):
+        """Run modify(current values) -> new values under WATCH; False if the session is gone"""
+        key = self._key(session_id)
+        outcome = {'found': False}
+
+        def transaction(pipe):
+            current = pipe.hmget(key, fields)
+            outcome['found'] = current[0] is not None
+            if not outcome['found']:
+                return
+            updates = modify(dict(zip(fields, current)))
+            pipe.multi()
+            pipe.hset(key, mapping=updates)
+
+        self.client.transaction(transaction, key)
+        return outcome['found']
+
+    def update_results(self, session_id, fields):
+        def merge(current):
+            results = json.loads(current['results'])
+            results.update(fields)
+            return {'results': json.dumps(results)}
+        return self._read_modify_write(session_id, ['results'], merge)
+
+    def append_score(self, session_id, window, value, results=None):
+        if window not in self.window_sizes:
+            raise ValueError(f"Unknown score window '{window}'")
+        capacity = self.window_sizes[window]
+
+        def append(current):
+            updates = {window: _append_window(current[window], value, capacity)}
+            if results:
+                merged = json.loads(current['results'])
+                merged.update(results)
+                updates['results'] = json.dumps(merged)
+            return updates
+        return self._read_modify_write(session_id, ['results', window], append)
+
+    def append_question(self, session_id, analysis, transcript=None):
+        key = self._key(session_id)
+        questions_key = self._questions_key(session_id)
+        outcome = {'entry': None}
+
+        def transaction(pipe):
+            outcome['entry'] = None
+            if not pipe.exists(key):
+                return
+            entry = make_entry(pipe.llen(questions_key) + 1, analysis, transcript)
+            pipe.multi()
+            pipe.rpush(questions_key, json.dumps(entry))
+            if transcript:
+                pipe.hsetnx(self._transcripts_key(session_id), entry['transcriptId'], transcript)
+            outcome['entry'] = entry
+
+        self.client.transaction(transaction, key, questions_key)
+        return outcome['entry']
+
+    def transcripts(self, session_id, ids):
+        ids = list(ids)
+        if not ids:
+            return {}
+        texts = self.client.hmget(self._transcripts_key(session_id), ids)
+        return {tid: text.decode('utf-8') for tid, text in zip(ids, texts) if text is not None}
+
+    def count(self):
+        return self.client.scard(self._index)
+
+    def stats(self):
+        return {'backend': self.name, 'sessions': self.count()}
+
+
+def create_session_store(url='memory', window_sizes=None, question_memory_cap=100, question_spill_path=None):
+    """Build a store from a SESSION_STORE value (see module docstring)
+
+    The question memory cap and spill file only apply to the memory backend;
+    the shared backends keep question logs outside the process.
+    """
+    if not url or url == 'memory':
+        return MemorySessionStore(window_sizes, question_memory_cap, question_spill_path)
+    if url.startswith('sqlite:///'):
+        return SQLiteSessionStore(url[len('sqlite:///'):], window_sizes)
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisSessionStore.from_url(url, window_sizes=window_sizes)
+    raise ValueError(f"Unknown SESSION_STORE '{url}' (expected memory, sqlite:///path or redis://...)")
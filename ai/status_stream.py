@@ -0,0 +1,99 @@
+"""
+status_stream.py - Server-Sent Events stream of a session's analysis status
+Sends one full snapshot, then only the fields that changed and any new
+question analyses, at most once per interval. Replaces polling
+/api/session/status, whose every response rebuilds the full history.
+
+Events:
+    snapshot  {"results": {...}, "question_analyses": [...]}
+    update    {"changed": {...}, "question_analyses": [...new only]}
+    end       {} once the session has been stopped
+"""
+
+import asyncio
+import json
+import time
+
+KEEPALIVE = b': keepalive\n\n'
+
+
+def format_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n".encode('utf-8')
+
+
+def changed_fields(previous, current):
+    return {key: value for key, value in current.items() if previous.get(key) != value}
+
+
+class StatusDiff:
+    """Coalescing state of one status stream, shared by the blocking and asyncio generators"""
+    def __init__(self, heartbeat=15.0):
+        self.heartbeat = heartbeat
+        self.results = None
+        self.cursor = 0
+        self.done = False
+        self.last_sent = 0.0
+
+    def start(self, snapshot):
+        """Chunks for the first fetch: retry hint and snapshot, or end"""
+        if snapshot is None:
+            self.done = True
+            return [format_event('end', {})]
+        self.results, questions, self.cursor = snapshot
+        self.last_sent = time.monotonic()
+        return [b'retry: 3000\n', format_event('snapshot', {'results': self.results, 'question_analyses': questions})]
+
+    def step(self, update):
+        """Chunk for a later fetch (update, keep-alive or end), or None if nothing is due"""
+        if update is None:
+            self.done = True
+            return format_event('end', {})
+
+        current, new_questions, self.cursor = update
+        changed = changed_fields(self.results, current)
+        now = time.monotonic()
+        if changed or new_questions:
+            payload = {}
+            if changed:
+                payload['changed'] = changed
+            if new_questions:
+                payload['question_analyses'] = new_questions
+            self.results = current
+            self.last_sent = now
+            return format_event('update', payload)
+        if now - self.last_sent >= self.heartbeat:
+            self.last_sent = now
+            return KEEPALIVE
+        return None
+
+
+def status_events(fetch, interval=0.5, heartbeat=15.0):
+    """Generate SSE bytes for a session
+
+    fetch(questions_since) returns (results, new_question_analyses, cursor), where
+    cursor is the seq of the last analysis returned, or None once the session
+    is gone. A long backlog arrives over several updates, one page per tick.
+    Changes within one interval are coalesced into a single update; idle
+    streams get a keep-alive comment every `heartbeat` seconds so proxies and
+    dead clients are detected.
+    """
+    diff = StatusDiff(heartbeat)
+    yield from diff.start(fetch(0))
+    while not diff.done:
+        time.sleep(interval)
+        chunk = diff.step(fetch(diff.cursor))
+        if chunk is not None:
+            yield chunk
+
+
+async def status_events_async(fetch, interval=0.5, heartbeat=15.0):
+    """status_events for asyncio servers; fetch runs on the loop's default executor as stores may block"""
+    loop = asyncio.get_running_loop()
+    diff = StatusDiff(heartbeat)
+    for chunk in diff.start(await loop.run_in_executor(None, fetch, 0)):
+        yield chunk
+    while not diff.done:
+        await asyncio.sleep(interval)
+        chunk = diff.step(await loop.run_in_executor(None, fetch, diff.cursor))
+        if chunk is not None:
+            yield chunk
@@ -0,0 +1,115 @@
+"""
+text_windows.py - Sentence-aligned token windows for long transcripts
+RoBERTa reads at most 512 tokens, so truncation silently drops the end of a
+long answer. Instead the transcript is tokenised once and cut into windows
+that end on sentence boundaries (NLTK punkt) and overlap by up to `overlap`
+tokens of trailing sentences. The batcher scores every window of a batch in
+one forward pass and averages them weighted by window length.
+
+At most `max_windows` windows are scored per transcript; beyond that they are
+sampled evenly (always keeping the first and last), so latency is bounded.
+"""
+
+import bisect
+
+import numpy as np
+
+
+def load_sentence_splitter():
+    """Punkt sentence splitter with span_tokenize(); untrained Punkt if the data is missing"""
+    import nltk
+    from nltk.tokenize.punkt import PunktSentenceTokenizer
+    try:
+        from nltk.tokenize.punkt import PunktTokenizer  # nltk >= 3.8.2 (punkt_tab)
+        return PunktTokenizer('english')
+    except (ImportError, LookupError):
+        pass
+    try:
+        return nltk.data.load('tokenizers/punkt/english.pickle')
+    except LookupError:
+        print("⚠️ punkt data not found, splitting sentences with an untrained Punkt tokenizer")
+        return PunktSentenceTokenizer()
+
+
+def pack_windows(sentences, budget, overlap):
+    """Token ranges of consecutive sentences, each at most budget tokens
+
+    sentences are (start, end) token ranges in order. A sentence longer than
+    the budget is cut into budget-sized pieces. Each window after the first
+    starts with the trailing sentences of the previous one that fit in
+    `overlap` tokens.
+    """
+    pieces = []
+    step = max(1, budget - overlap)
+    for start, end in sentences:
+        while end - start > budget:
+            pieces.append((start, start + budget))
+            start += step
+        pieces.append((start, end))
+
+    windows = []
+    i = 0
+    while i < len(pieces):
+        start = pieces[i][0]
+        j = i
+        while j + 1 < len(pieces) and pieces[j + 1][1] - start <= budget:
+            j += 1
+        end = pieces[j][1]
+        windows.append((start, end))
+        if j == len(pieces) - 1:
+            break
+        k = j + 1
+        while k - 1 > i and end - pieces[k - 1][0] <= overlap:
+            k -= 1
+        i = k
+    return windows
+
+
+def limit_windows(windows, max_windows):
+    """At most max_windows, evenly spaced and always including the first and last"""
+    if not max_windows or len(windows) <= max_windows:
+        return windows
+    keep = np.unique(np.linspace(0, len(windows) - 1, max_windows).round().astype(int))
+    return [windows[i] for i in keep]
+
+
+def special_tokens(tokenizer):
+    """(prefix, suffix) ids the tokenizer adds around a single sequence, e.g. ([<s>], [</s>])"""
+    with_special = tokenizer('a', add_special_tokens=True)['input_ids']
+    content = tokenizer('a', add_special_tokens=False)['input_ids']
+    for i in range(len(with_special) - len(content) + 1):
+        if with_special[i:i + len(content)] == content:
+            return with_special[:i], with_special[i + len(content):]
+    raise ValueError('Could not locate the content tokens inside the special-token template')
+
+
+class WindowBuilder:
+    """Turns a transcript into model-ready token windows with a fast (offset-mapping) tokenizer"""
+    def __init__(self, tokenizer, max_length=512, overlap=64, max_windows=8, splitter=None):
+        self.tokenizer = tokenizer
+        self.prefix, self.suffix = special_tokens(tokenizer)
+        self.budget = max_length - len(self.prefix) - len(self.suffix)
+        self.overlap = min(overlap, self.budget // 2)
+        self.max_windows = max_windows
+        self.splitter = splitter or load_sentence_splitter()
+
+    def sentence_ranges(self, text, offsets):
+        """(start, end) token ranges of the text's sentences"""
+        token_starts = [start for start, _ in offsets]
+        bounds = {0, len(offsets)}
+        for sentence_start, _ in self.splitter.span_tokenize(text):
+            bounds.add(bisect.bisect_left(token_starts, sentence_start))
+        bounds = sorted(bounds)
+        return [(start, end) for start, end in zip(bounds, bounds[1:]) if end > start]
+
+    def token_windows(self, text):
+        """(windows, weights): input id lists with special tokens, and content tokens per window"""
+        encoded = self.tokenizer(text, add_special_tokens=False, return_offsets_mapping=True)
+        ids = encoded['input_ids']
+        if len(ids) <= self.budget:
+            return [self.prefix + ids + self.suffix], [max(1, len(ids))]
+
+        ranges = pack_windows(self.sentence_ranges(text, encoded['offset_mapping']), self.budget, self.overlap)
+        ranges = limit_windows(ranges, self.max_windows)
+        windows = [self.prefix + ids[start:end] + self.suffix for start, end in ranges]
+        return windows, [end - start for start, end in ranges]
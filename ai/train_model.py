@@ -10,6 +10,9 @@ from sklearn.model_selection import train_test_split
 from sklearn.metrics import classification_report, confusion_matrix
 import matplotlib.pyplot as plt
 import seaborn as sns
+from body_roi import ROI_MODES, make_cropper
+from dataset_cache import CachedDataset, build_cache
+from video_frames import STRATEGIES, extract_frames_from_video
 
 np.random.seed(42)
 tf.random.set_seed(42)
@@ -25,31 +28,10 @@ strategy = tf.distribute.MirroredStrategy()
 print(f'Number of devices: {strategy.num_replicas_in_sync}')
 
 
-def extract_frames_from_video(video_path, max_frames=30):
-    cap = cv2.VideoCapture(video_path)
-    frames = []
-    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-    
-    skip = max(1, total_frames // max_frames)
-    frame_count = 0
-    
-    while cap.isOpened() and len(frames) < max_frames:
-        ret, frame = cap.read()
-        if not ret:
-            break
-        
-        if frame_count % skip == 0:
-            frames.append(frame)
-        
-        frame_count += 1
-    
-    cap.release()
-    return frames
-
-
-def load_dataset(data_folder='sorted_data', img_size=(96, 96)):
+def load_dataset(data_folder='sorted_data', img_size=(96, 96), roi='off'):
     X = []
     y = []
+    crop = make_cropper(roi)  # same subject crop as BODY_ROI at serving time
     
     image_exts = ['*.jpg', '*.jpeg', '*.png', '*.bmp', '*.JPG', '*.JPEG', '*.PNG']
     video_exts = ['*.mp4', '*.avi', '*.mov', '*.mkv', '*.MP4', '*.AVI', '*.MOV']
@@ -80,7 +62,7 @@ def load_dataset(data_folder='sorted_data', img_size=(96, 96)):
             try:
                 img = cv2.imread(img_path)
                 if img is not None:
-                    img = cv2.resize(img, img_size)
+                    img = cv2.resize(crop(img), img_size)
                     img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
                     X.append(img)
                     y.append(label_map[class_name])
@@ -100,7 +82,7 @@ def load_dataset(data_folder='sorted_data', img_size=(96, 96)):
                 frames = extract_frames_from_video(vid_path, max_frames=30)
                 if frames:
                     for frame in frames:
-                        frame_resized = cv2.resize(frame, img_size)
+                        frame_resized = cv2.resize(crop(frame), img_size)
                         frame_rgb = cv2.cvtColor(frame_resized, cv2.COLOR_BGR2RGB)
                         X.append(frame_rgb)
                         y.append(label_map[class_name])
@@ -147,24 +129,46 @@ def build_cnn_model(input_shape=(96, 96, 3)):
         layers.Dropout(0.5),
         layers.Dense(64, activation='relu'),
         layers.Dropout(0.3),
-        layers.Dense(1, activation='sigmoid')
+        layers.Dense(1, activation='sigmoid', dtype='float32')  # float32 output under mixed precision
     ])
     
     return model
 
 
-def train_model():
+PRECISIONS = ('float32', 'mixed_float16', 'mixed_bfloat16')
+
+
+def set_precision(precision='float32'):
+    """Global Keras dtype policy; mixed_bfloat16 suits recent CPUs, mixed_float16 GPUs"""
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown precision '{precision}' (expected one of {PRECISIONS})")
+    tf.keras.mixed_precision.set_global_policy(precision)
+
+
+def train_model(data_folder='sorted_data', cache_dir='dataset_cache', workers=None, batch_size=32,
+                sampling='uniform', augment=False, precision='float32', roi='off'):
+    """Train the CNN; with cache_dir, frames are decoded once into the dataset cache and streamed from it
+
+    batch_size is per replica. augment and precision apply to the cached (tf.data) path.
+    roi must match BODY_ROI wherever the model is served.
+    """
     print("\n" + "="*60)
     print(" "*15 + "CNN MODEL TRAINING")
     print("="*60)
     
-    if not os.path.exists('sorted_data'):
-        print("\n Error: 'sorted_data' folder not found!")
+    if not os.path.exists(data_folder):
+        print(f"\n Error: '{data_folder}' folder not found!")
         return None
     print("\nLoading dataset...")
-    X, y, stats = load_dataset('sorted_data')
-    
-    if len(X) == 0:
+    cache = None
+    if cache_dir:
+        build_cache(data_folder, cache_dir, sampling=sampling, workers=workers, roi=roi)
+        cache = CachedDataset(cache_dir)
+        X, y, stats = None, cache.labels, cache.stats()
+    else:
+        X, y, stats = load_dataset(data_folder, roi=roi)
+    
+    if len(y) == 0:
         print("\n No data loaded!")
         return None
     
@@ -188,28 +192,28 @@ def train_model():
     unconfident_count = np.sum(y == 0)
     
     print(f"\n{'='*60}")
-    print(f"Total samples: {len(X)}")
-    print(f"Image shape: {X.shape}")
+    print(f"Total samples: {len(y)}")
+    print(f"Image shape: {X.shape if X is not None else (len(y), *cache.img_size[::-1], 3)}")
     print(f"Confident: {confident_count} | Unconfident: {unconfident_count}")
     
-    X = X.astype('float32') / 255.0
-    
 
     print(f"\n{'='*60}")
     print(" Splitting dataset...")
+    # Split sample indices so the cached path never materialises the frames
+    indices = np.arange(len(y))
     try:
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=0.2, random_state=42, stratify=y
+        idx_train, idx_test, y_train, y_test = train_test_split(
+            indices, y, test_size=0.2, random_state=42, stratify=y
         )
         print("  Stratified split successful")
     except ValueError:
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=0.2, random_state=42
+        idx_train, idx_test, y_train, y_test = train_test_split(
+            indices, y, test_size=0.2, random_state=42
         )
         print(" Using regular split")
     
-    print(f"  Training: {len(X_train)} samples")
-    print(f"  Testing: {len(X_test)} samples")
+    print(f"  Training: {len(idx_train)} samples")
+    print(f"  Testing: {len(idx_test)} samples")
     
     class_weight = {
         0: len(y_train) / (2 * np.sum(y_train == 0)),
@@ -219,6 +223,11 @@ def train_model():
     
     print(f"\n{'='*60}")
     
+    if cache is not None:
+        set_precision(precision)
+    elif augment or precision != 'float32':
+        print(" Augmentation and mixed precision need the dataset cache, ignoring them")
+    
     with strategy.scope():
         model = build_cnn_model()
         model.compile(
@@ -237,24 +246,43 @@ def train_model():
     print(f"\n{'='*60}")
     print(" Training model...")
     
-    history = model.fit(
-        X_train, y_train,
-        validation_split=0.2,
-        epochs=30,
-        batch_size=32,
-        class_weight=class_weight,
-        callbacks=callbacks,
-        verbose=1
-    )
+    if cache is not None:
+        # Same 80/20 train/validation proportions as validation_split
+        idx_fit, idx_val = train_test_split(idx_train, test_size=0.2, random_state=42)
+        global_batch = batch_size * strategy.num_replicas_in_sync
+        history = model.fit(
+            cache.tf_dataset(idx_fit, global_batch, shuffle=True, augment=augment),
+            validation_data=cache.tf_dataset(idx_val, global_batch),
+            epochs=30,
+            class_weight=class_weight,
+            callbacks=callbacks,
+            verbose=1
+        )
+        test_inputs = cache.tf_dataset(idx_test, global_batch)
+    else:
+        X = X.astype('float32') / 255.0
+        history = model.fit(
+            X[idx_train], y_train,
+            validation_split=0.2,
+            epochs=30,
+            batch_size=batch_size,
+            class_weight=class_weight,
+            callbacks=callbacks,
+            verbose=1
+        )
+        test_inputs = X[idx_test]
     
 
     print(f"\n{'='*60}")
     print(" Evaluating on test set...")
     
-    y_pred_prob = model.predict(X_test, verbose=0)
+    y_pred_prob = model.predict(test_inputs, verbose=0)
     y_pred = (y_pred_prob > 0.5).astype(int).flatten()
     
-    test_loss, test_acc, test_precision, test_recall = model.evaluate(X_test, y_test, verbose=0)
+    if cache is not None:
+        test_loss, test_acc, test_precision, test_recall = model.evaluate(test_inputs, verbose=0)
+    else:
+        test_loss, test_acc, test_precision, test_recall = model.evaluate(test_inputs, y_test, verbose=0)
     
     print(f"\n TEST ACCURACY: {test_acc*100:.2f}%")
     print(f"   Precision: {test_precision*100:.2f}%")
@@ -316,4 +344,19 @@ def train_model():
 
 
 if __name__ == '__main__':
-    model, history = train_model()
\ No newline at end of file
+    import argparse
+    parser = argparse.ArgumentParser(description='Train the body language CNN')
+    parser.add_argument('--data', default='sorted_data', help='Dataset folder with confident/ and unconfident/')
+    parser.add_argument('--cache', default='dataset_cache', help='Preprocessed dataset cache directory')
+    parser.add_argument('--no-cache', action='store_true', help='Decode everything into memory (original path)')
+    parser.add_argument('--workers', type=int, default=None, help='Decode processes for the cache')
+    parser.add_argument('--sampling', choices=STRATEGIES, default='uniform', help='Video frame sampling strategy')
+    parser.add_argument('--batch-size', type=int, default=32, help='Batch size per replica')
+    parser.add_argument('--augment', action='store_true', help='Random flips, crops and colour jitter while training')
+    parser.add_argument('--precision', choices=PRECISIONS, default='float32', help='Keras dtype policy')
+    parser.add_argument('--roi', choices=ROI_MODES, default='off',
+                        help='Crop frames to the subject; serve the model with the same BODY_ROI')
+    args = parser.parse_args()
+    model, history = train_model(args.data, None if args.no_cache else args.cache, args.workers,
+                                 batch_size=args.batch_size, sampling=args.sampling,
+                                 augment=args.augment, precision=args.precision, roi=args.roi)
\ No newline at end of file
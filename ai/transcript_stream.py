@@ -0,0 +1,177 @@
+"""
+transcript_stream.py - Incremental voice tone analysis of streaming transcripts
+Speech-to-text delivers an answer as appended fragments. Each sentence is
+scored once, as soon as a later fragment shows it is complete: VADER inline,
+RoBERTa queued on the shared batcher without waiting for the result. Running
+per-question sums make the final score cheap: when the answer ends only the
+last sentence is still left to score.
+
+Aggregates are word-weighted means over sentences, so a streamed score can
+differ slightly from analysing the whole transcript at once (VADER's compound
+score is not additive across sentences).
+"""
+
+import threading
+import time
+
+from metrics import count_error
+
+VADER_KEYS = ('neg', 'neu', 'pos', 'compound')
+ROBERTA_KEYS = ('roberta_neg', 'roberta_neu', 'roberta_pos')
+
+
+def voice_tone_score(compound, roberta_positive):
+    """Same 0-100 combination as analyze_voice_tone in app.py"""
+    return round(((compound + 1) * 50 + roberta_positive * 100) / 2, 2)
+
+
+class QuestionStream:
+    """Running analysis of one answer
+
+    vader is a VADER analyser (or None); submit_roberta(sentence) returns a
+    Future of RoBERTa scores (or None when the model is unavailable).
+    """
+    def __init__(self, splitter, vader=None, submit_roberta=None):
+        self.splitter = splitter
+        self.vader = vader
+        self.submit_roberta = submit_roberta
+        self.text = ''
+        self.sentences = 0
+        self.updated_at = time.monotonic()
+        self._tail_start = 0  # offset of the sentence that may still be growing
+        self._words = 0
+        self._vader_sums = dict.fromkeys(VADER_KEYS, 0.0)
+        self._roberta = []  # (words, future) per scored sentence
+        self._lock = threading.Lock()
+
+    def append(self, fragment):
+        """Add text to the answer verbatim and score every sentence it completes"""
+        with self._lock:
+            self.updated_at = time.monotonic()
+            if not fragment:
+                return
+            self.text += fragment
+
+            tail = self.text[self._tail_start:]
+            spans = list(self.splitter.span_tokenize(tail))
+            for start, end in spans[:-1]:  # the last sentence may continue in the next fragment
+                self._score(tail[start:end])
+            if len(spans) > 1:
+                self._tail_start += spans[-1][0]
+
+    def _score(self, sentence):
+        words = len(sentence.split())
+        if not words:
+            return
+        scores = self.vader.polarity_scores(sentence) if self.vader is not None else None
+        for key in VADER_KEYS:
+            default = 1.0 if key == 'neu' else 0.0
+            self._vader_sums[key] += (scores[key] if scores else default) * words
+        self._words += words
+        self.sentences += 1
+        future = self.submit_roberta(sentence) if self.submit_roberta is not None else None
+        if future is not None:
+            self._roberta.append((words, future))
+
+    def snapshot(self, wait=False, timeout=30.0):
+        """Scores over the sentences completed so far (with wait, blocks for queued RoBERTa results)"""
+        with self._lock:
+            words = self._words
+            vader_sums = dict(self._vader_sums)
+            roberta = list(self._roberta)
+
+        vader = {key: round(vader_sums[key] / words, 4) if words else (1.0 if key == 'neu' else 0.0)
+                 for key in VADER_KEYS}
+
+        roberta_sums = dict.fromkeys(ROBERTA_KEYS, 0.0)
+        roberta_words = 0
+        pending = 0
+        for sentence_words, future in roberta:
+            if not wait and not future.done():
+                pending += 1
+                continue
+            try:
+                scores = future.result(timeout=timeout)
+            except Exception as e:
+                count_error('roberta')
+                print(f"RoBERTa error: {e}")
+                continue
+            for key in ROBERTA_KEYS:
+                roberta_sums[key] += scores[key] * sentence_words
+            roberta_words += sentence_words
+        roberta_scores = {key: roberta_sums[key] / roberta_words if roberta_words else 0 for key in ROBERTA_KEYS}
+
+        if pending and not roberta_words:
+            score = round((vader['compound'] + 1) * 50, 2)  # VADER-only estimate until RoBERTa catches up
+        else:
+            score = voice_tone_score(vader['compound'], roberta_scores['roberta_pos'])
+
+        return {
+            'voice_tone_score': score,
+            'vader': vader,
+            'roberta': roberta_scores,
+            'sentences': self.sentences,
+            'pending_sentences': pending
+        }
+
+    def finish(self, timeout=30.0):
+        """Score the trailing sentence and return the final analysis"""
+        with self._lock:
+            tail = self.text[self._tail_start:]
+            self._tail_start = len(self.text)
+            if tail.strip():
+                self._score(tail.strip())
+        return self.snapshot(wait=True, timeout=timeout)
+
+
+class TranscriptStreams:
+    """Open QuestionStreams of this process by (session, question); idle ones expire after ttl seconds"""
+    def __init__(self, make_stream, ttl=900.0, max_streams=10000):
+        self.make_stream = make_stream
+        self.ttl = ttl
+        self.max_streams = max_streams
+        self._streams = {}
+        self._lock = threading.Lock()
+        self.counters = {'opened': 0, 'finished': 0, 'expired': 0}
+
+    def get(self, session_id, question_id, create=True):
+        key = (session_id, str(question_id))
+        stream = self._streams.get(key)
+        if stream is not None or not create:
+            return stream
+        new_stream = self.make_stream()  # outside the lock: may wait for a model to load
+        with self._lock:
+            stream = self._streams.get(key)
+            if stream is None:
+                self._expire()
+                if len(self._streams) >= self.max_streams:
+                    oldest = min(self._streams, key=lambda k: self._streams[k].updated_at)
+                    del self._streams[oldest]
+                    self.counters['expired'] += 1
+                stream = self._streams[key] = new_stream
+                self.counters['opened'] += 1
+            return stream
+
+    def pop(self, session_id, question_id):
+        with self._lock:
+            stream = self._streams.pop((session_id, str(question_id)), None)
+            if stream is not None:
+                self.counters['finished'] += 1
+            return stream
+
+    def discard_session(self, session_id):
+        with self._lock:
+            for key in [key for key in self._streams if key[0] == session_id]:
+                del self._streams[key]
+
+    def _expire(self):
+        cutoff = time.monotonic() - self.ttl
+        for key in [key for key, stream in self._streams.items() if stream.updated_at < cutoff]:
+            del self._streams[key]
+            self.counters['expired'] += 1
+
+    def __len__(self):
+        return len(self._streams)
+
+    def stats(self):
+        return {'open': len(self._streams), 'ttl_seconds': self.ttl, **self.counters}
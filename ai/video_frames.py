@@ -0,0 +1,166 @@
+"""
+video_frames.py - Frame sampling from recorded videos without decoding every frame
+Used by the dataset cache (training) and offline scoring to pull max_frames
+frames out of long interview recordings.
+
+Strategies:
+    uniform   every (total // max_frames)-th frame from the start, the frames the
+              original sequential reader kept; distant targets are reached
+              with a seek, short gaps with grab() (no colour conversion)
+    keyframe  only the container's keyframes, evenly thinned; keyframe positions
+              come from demuxing (no decode). Needs PyAV, else falls back to uniform
+    scene     probes a thumbnail every few frames and keeps the frames with the
+              largest change from the previous probe
+"""
+
+import heapq
+
+import cv2
+import numpy as np
+
+from frame_sampler import THUMB_SIZE
+
+STRATEGIES = ('uniform', 'keyframe', 'scene')
+# A seek decodes forward from the previous keyframe, so for short gaps grabbing is cheaper
+SEEK_MIN_GAP = 30
+SCENE_PROBES_PER_FRAME = 8
+
+
+class FrameReader:
+    """Random access over a cv2.VideoCapture, choosing seek or grab per target"""
+    def __init__(self, cap):
+        self.cap = cap
+        self.position = 0  # index of the next frame read() would return
+        self.seeks = 0
+        self.grabs = 0
+
+    def read_at(self, index):
+        """BGR frame at index, or None past the real end of the video"""
+        gap = index - self.position
+        if gap < 0 or gap >= SEEK_MIN_GAP:
+            if self.cap.set(cv2.CAP_PROP_POS_FRAMES, index):
+                self.seeks += 1
+                gap = 0
+            elif gap < 0:
+                return None
+        for _ in range(gap):
+            if not self.cap.grab():
+                return None
+            self.grabs += 1
+        ok, frame = self.cap.read()
+        self.position = index + 1
+        return frame if ok else None
+
+
+def count_frames(cap, start=0):
+    """Count frames from start by grabbing to the end (containers with a missing or wrong count)"""
+    cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+    count = 0
+    while cap.grab():
+        count += 1
+    return start + count
+
+
+def frame_count(cap):
+    """Trustworthy frame count: the container's value, checked at the end. Leaves cap at frame 0"""
+    reported = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    if reported <= 0:
+        total = count_frames(cap)
+    elif cap.set(cv2.CAP_PROP_POS_FRAMES, reported) and cap.grab():
+        total = count_frames(cap, reported + 1)  # understated: frames exist past the reported end
+    else:
+        total = reported
+    cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+    return total
+
+
+def uniform_indices(total, max_frames):
+    """Frames 0, skip, 2*skip, ... with skip = total // max_frames, as the original sequential reader kept"""
+    skip = max(1, total // max(1, max_frames))
+    return list(range(0, min(total, skip * max_frames), skip))
+
+
+def sample_uniform(cap, max_frames):
+    total = frame_count(cap)
+    for attempt in range(2):
+        reader = FrameReader(cap)
+        frames = []
+        for index in uniform_indices(total, max_frames):
+            frame = reader.read_at(index)
+            if frame is None:
+                break
+            frames.append(frame)
+        else:
+            return frames
+        if attempt == 0:
+            # Overstated count: the video ended early, so count it and resample once
+            total = count_frames(cap)
+            cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+    return frames
+
+
+def sample_scene_changes(cap, max_frames, probes_per_frame=SCENE_PROBES_PER_FRAME):
+    total = frame_count(cap)
+    stride = max(1, total // max(1, max_frames * probes_per_frame))
+    reader = FrameReader(cap)
+    best = []  # min-heap of (change, index, frame), at most max_frames long
+    previous = None
+    for index in range(0, total, stride):
+        frame = reader.read_at(index)
+        if frame is None:
+            break
+        thumb = cv2.resize(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), THUMB_SIZE,
+                           interpolation=cv2.INTER_AREA).astype(np.int16)
+        change = float('inf') if previous is None else float(np.mean(np.abs(thumb - previous)))
+        previous = thumb
+        item = (change, index, frame)
+        if len(best) < max_frames:
+            heapq.heappush(best, item)
+        elif change > best[0][0]:
+            heapq.heapreplace(best, item)
+    return [frame for _, _, frame in sorted(best, key=lambda item: item[1])]
+
+
+def sample_keyframes(video_path, max_frames):
+    """Decode only the chosen keyframes with PyAV; None if PyAV is unavailable"""
+    try:
+        import av
+    except ImportError:
+        return None
+
+    with av.open(video_path) as container:
+        stream = container.streams.video[0]
+        keyframe_pts = [packet.pts for packet in container.demux(stream)
+                        if packet.is_keyframe and packet.pts is not None]
+        frames = []
+        for i in uniform_indices(len(keyframe_pts), max_frames):
+            container.seek(keyframe_pts[i], stream=stream, any_frame=False)
+            for frame in container.decode(stream):
+                frames.append(frame.to_ndarray(format='bgr24'))
+                break
+    return frames
+
+
+def extract_frames_from_video(video_path, max_frames=30, strategy='uniform'):
+    """Up to max_frames BGR frames from a video, chosen by strategy (see module docstring)"""
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown sampling strategy '{strategy}' (expected one of {STRATEGIES})")
+
+    if strategy == 'keyframe':
+        try:
+            frames = sample_keyframes(video_path, max_frames)
+        except Exception as e:
+            print(f" Warning: keyframe sampling failed for {video_path} ({e}), using uniform")
+            frames = None
+        if frames:
+            return frames
+
+    cap = cv2.VideoCapture(video_path)
+    try:
+        if not cap.isOpened():
+            return []
+        if strategy == 'scene':
+            return sample_scene_changes(cap, max_frames)
+        return sample_uniform(cap, max_frames)
+    finally:
+        cap.release()
@@ -0,0 +1,17 @@
+"""
+wsgi.py - Production entry point for the analysis server
+Run with: gunicorn -c gunicorn.conf.py wsgi:app
+
+Shareable model weights are loaded once in the gunicorn master (preload) and
+inherited copy-on-write by the workers; requests are routed to the worker
+that owns their session (see affinity.py).
+"""
+
+import os
+
+os.environ.setdefault('MODEL_LOADING', 'prefork')
+
+from app import app as flask_app  # noqa: E402
+from affinity import SessionAffinityMiddleware  # noqa: E402
+
+app = SessionAffinityMiddleware(flask_app, base_port=int(os.environ.get('AFFINITY_BASE_PORT', 5101)))